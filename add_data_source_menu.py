@@ -1,25 +1,20 @@
-import re
+from codemods import define, run
 
-# Read the file
-with open('/workspace/components/SettingsViewWithMenu.tsx', 'r') as f:
-    content = f.read()
+# Pattern to match the closing of permissions item, when it is the last one
+pattern = r"\{ id: 'permissions' as const, label: 'Permissions', icon: \([^}]+\)\},\n(?=\s+\];)"
 
-# Find the permissions menu item and add data-source after it
-# Pattern to match the closing of permissions item
-pattern = r"(\{ id: 'permissions' as const, label: 'Permissions', icon: \([^}]+\)\},)\n(\s+\];)"
-
-replacement = r"""\1
-           { id: 'data-source' as const, label: 'Data Source', icon: (
+entry = """           { id: 'data-source' as const, label: 'Data Source', icon: (
                <svg xmlns="http://www.w3.org/2000/svg" className="h-5 w-5" viewBox="0 0 20 20" fill="currentColor">
                    <path fillRule="evenodd" d="M4 3a2 2 0 00-2 2v10a2 2 0 002 2h12a2 2 0 002-2V5a2 2 0 00-2-2H4zm12 12H4l4-8 3 6 2-4 3 6z" clipRule="evenodd" />
                </svg>
            )},
-\2"""
+"""
 
-new_content = re.sub(pattern, replacement, content, flags=re.DOTALL)
+# Find the permissions menu item and add data-source after it
+define('components/SettingsViewWithMenu.tsx', 'add_data_source_menu', version=2,
+       pattern=pattern, action='insert_after', text=entry,
+       unless="id: 'data-source' as const", required=True)
 
-# Write the file back
-with open('/workspace/components/SettingsViewWithMenu.tsx', 'w') as f:
-    f.write(new_content)
 
-print("Data Source menu item added successfully!")
\ No newline at end of file
+if __name__ == '__main__':
+    run(__name__)
@@ -1,16 +1,15 @@
-# Read the file
-with open('/workspace/components/SettingsViewWithMenu.tsx', 'r') as f:
-    lines = f.readlines()
+from codemods import define, run
+from codemods.sections import section
+
+# The permissions title as the sections manifest reads it from the menu view
+permissions = f"activeSection === 'permissions' && '{section('permissions')['title']}'"
+title = "                               {activeSection === 'data-source' && 'Data Source'}\n"
 
 # Find the line with 'permissions' and add 'data-source' after it
-for i, line in enumerate(lines):
-    if "activeSection === 'permissions' && 'Permissions Manager'" in line:
-        # Insert data-source line after this one
-        lines.insert(i + 1, "                               {activeSection === 'data-source' && 'Data Source'}\n")
-        break
+define('components/SettingsViewWithMenu.tsx', 'add_data_source_title', version=2,
+       anchor=permissions, select='line', action='insert_after', text=title, count='first',
+       unless="activeSection === 'data-source' && 'Data Source'", required=True)
 
-# Write the file back
-with open('/workspace/components/SettingsViewWithMenu.tsx', 'w') as f:
-    f.writelines(lines)
 
-print("Data Source title added successfully!")
\ No newline at end of file
+if __name__ == '__main__':
+    run(__name__)
@@ -1,44 +1,37 @@
 #!/usr/bin/env python3
-import re
-
-with open('components/SettingsView.tsx', 'r') as f:
-    lines = f.readlines()
-
-# Find and remove header divs with h2 tags
-i = 0
-while i < len(lines):
-    line = lines[i]
-    
-    # Check if this is a header div with h2
-    if 'p-4 flex justify-between items-center border-b border-gray-700' in line:
-        # Check if next line has h2
-        if i + 1 < len(lines) and '<h2 className="text-lg font-semibold text-gray-200">' in lines[i + 1]:
-            # This is a section header we want to remove
-            # Find the closing </div> for this header
-            depth = 1
-            start = i
-            i += 1
-            
-            while i < len(lines) and depth > 0:
-                if '<div' in lines[i]:
-                    depth += 1
-                if '</div>' in lines[i]:
-                    depth -= 1
-                i += 1
-            
-            # Remove these lines
-            del lines[start:i]
-            i = start
+from codemods import rule, run
+from codemods.classes import classes
+
+HEADER_CLASSES = ('p-4', 'flex', 'justify-between', 'items-center', 'border-b', 'border-gray-700')
+TITLE_CLASSES = 'text-lg font-semibold text-gray-200'
+
+
+@rule('components/SettingsView.tsx', anchors=[TITLE_CLASSES])
+def clean_all_headers(doc):
+    if TITLE_CLASSES not in doc.anchors:
+        return 0
+    # Find header divs whose first child is a section h2
+    spans = []
+    for el in doc.tree.with_class(*HEADER_CLASSES):
+        if el.name != 'div' or not el.children:
+            continue
+        title = el.children[0]
+        if title.name != 'h2' or title.class_name != TITLE_CLASSES:
             continue
-    
-    i += 1
+        start, end = doc.line_start(el.start), doc.line_end(el.end)
+        # Skip headers nested inside one already being removed
+        if spans and start < spans[-1][1]:
+            continue
+        spans.append((start, end))
+
+    # Remove these lines
+    return doc.splice((start, end, '') for start, end in spans)
+
 
 # Also fix the inner div padding
-for i in range(len(lines)):
-    if '<div className="p-4 space-y-4">' in lines[i]:
-        lines[i] = lines[i].replace('<div className="p-4 space-y-4">', '<div className="space-y-4">')
+classes('components/SettingsView.tsx', 'clean_inner_padding', version=2,
+        element='div', when=('p-4', 'space-y-4'), exact=True, remove=('p-4',))
 
-with open('components/SettingsView.tsx', 'w') as f:
-    f.writelines(lines)
 
-print("All section headers cleaned")
\ No newline at end of file
+if __name__ == '__main__':
+    run(__name__)
@@ -0,0 +1,29 @@
+"""Codemod engine for the SettingsView / App.tsx rewrite scripts."""
+import importlib
+
+__all__ = [
+    'define',
+    'Document',
+    'Engine',
+    'FileResult',
+    'Rule',
+    'RuleError',
+    'load_plugins',
+    'register',
+    'registry',
+    'report',
+    'rule',
+    'run',
+]
+
+# Loaded on first use, so ``python3 -m codemods list`` never imports the engine
+_LAZY = {'define': 'dsl'}
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_LAZY.get(name, 'engine')}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,184 @@
+"""``python3 -m codemods <command>``.
+
+    list               registered rules, from the precomputed registry
+    apply [globs]      run the rules and write the results
+    dry-run [globs]    run the rules and report, writing nothing
+    bench, watch, validate, classes, symbols, sections, corpus, impact, fixtures
+                       the tool in the module of the same name
+
+Without a command it runs as ``apply`` (``-n`` for a dry run). Commands
+import only what they use: ``list``, and a run whose targets the result
+cache already records as fully rewritten, read the plugin registry and the
+cache and never load the plugins.
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+COMMANDS = ('list', 'apply', 'dry-run')
+TOOLS = ('bench', 'watch', 'validate', 'classes', 'symbols', 'sections', 'corpus', 'impact', 'fixtures')
+
+
+def run_parser(prog):
+    parser = argparse.ArgumentParser(
+        prog=prog, epilog=f"commands: {', '.join(COMMANDS + TOOLS)} (python3 -m codemods list -h)")
+    parser.add_argument('globs', nargs='*', help="files to rewrite, e.g. 'components/**/*.tsx', with the rules "
+                                                 "that target them; defaults to each rule's own target")
+    parser.add_argument('-r', '--rule', action='append', dest='rules', help='rule id to run (repeatable)')
+    parser.add_argument('-j', '--jobs', type=int, help='worker processes for glob runs')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='compute edits without writing')
+    parser.add_argument('--all-sources', action='store_true',
+                        help='run every rule on every matched file (every app source without globs), '
+                             'not only on its own target')
+    parser.add_argument('--stream', action='store_true',
+                        help='memory-map each file and decode only the regions rules edit (see codemods.stream)')
+    parser.add_argument('--diff', nargs='?', const='-', metavar='PATCH',
+                        help='write one unified diff of every change, to PATCH or stdout (the report goes to stderr)')
+    parser.add_argument('--impact', action='store_true',
+                        help='report what the rewrites add to each section and append it to impact_results.jsonl')
+    parser.add_argument('--no-cache', action='store_true', help='ignore and do not update the result cache')
+    parser.add_argument('--dedup', action='store_true',
+                        help='compute mirrored copies of a file (e.g. DFP---NEO/App.tsx) once and replay the edits')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='CSV',
+                        help='record per-rule timings and counters; print them, or write them to CSV')
+    parser.add_argument('--trace', metavar='JSON', help='write a Chrome trace of the run')
+    parser.add_argument('--cprofile', action='append', default=[], metavar='RULE',
+                        help='run RULE under cProfile, dumping stats to codemods-profile/ (repeatable)')
+    return parser
+
+
+def settled(rules, root='.'):
+    """Results of a run over ``rules`` (``RuleInfo``s) if the cache shows it would change nothing, else None."""
+    from .anchors import content_hash
+    from .cache import DEFAULT_DIR, ResultCache
+    from .engine import FileResult
+    cache = ResultCache(os.path.join(root, DEFAULT_DIR))
+    targets = {}
+    for r in rules:
+        targets.setdefault(r.path, []).append(r)
+    results = []
+    for path, group in targets.items():
+        start = time.perf_counter()
+        try:
+            with open(os.path.join(root, path), 'r') as f:
+                digest = content_hash(f.read())
+        except OSError:
+            return None
+        if not cache.settled(digest, group):
+            return None
+        res = FileResult(path, {r.id: 0 for r in group}, False, time.perf_counter() - start)
+        res.cached = len(group)
+        results.append(res)
+    return results
+
+
+def apply(argv, prog='python3 -m codemods', dry_run=False):
+    parser = run_parser(prog)
+    args = parser.parse_args(argv)
+    dry_run = dry_run or args.dry_run
+    profiling = args.profile or args.trace or args.cprofile
+    out = sys.stderr if args.diff == '-' else sys.stdout
+    if args.stream and (args.diff or args.dedup or profiling):
+        parser.error('--stream cannot be combined with --diff, --dedup or profiling')
+    if not (args.globs or args.all_sources or args.no_cache or args.dedup or profiling or args.stream):
+        from . import plugins
+        rules = plugins.load()
+        if args.rules:
+            rules = [r for r in rules if r.id in args.rules]
+        results = settled(rules)
+        if results is not None:
+            from .engine import report
+            report(results, out)
+            finish(args, rules, results, dry_run, out)
+            return
+
+    from .engine import Engine, load_plugins, open_cache, report
+    from .profiling import Profiler
+    cache = None if args.no_cache else open_cache()
+    profiler = Profiler(cprofile=args.cprofile) if profiling else None
+
+    rules = load_plugins()
+    if args.rules:
+        rules = [r for r in rules if r.id in args.rules]
+    if args.stream:
+        from .runner import summarize
+        from .stream import run as stream
+        results = stream(rules, args.globs, write=not dry_run, all_sources=args.all_sources, out=out)
+        report([res for res in results if res.changed or res.error], out)
+        summarize(results, out)
+    elif args.globs or args.all_sources:
+        from .runner import Runner, summarize
+        runner = Runner(rules, jobs=args.jobs, cache=cache, profiler=profiler, dedup=args.dedup,
+                        all_sources=args.all_sources)
+        results = runner.run(args.globs, write=not dry_run, out=out)
+        report([res for res in results if res.changed or res.error], out)
+        summarize(results, out)
+    else:
+        results = Engine(rules, cache=cache, profiler=profiler).run(write=not dry_run)
+        report(results, out)
+    finish(args, rules, results, dry_run, out)
+
+    if args.profile == '-':
+        profiler.write_table()
+    elif args.profile:
+        profiler.write_csv(args.profile)
+    if args.trace:
+        profiler.write_trace(args.trace)
+
+
+def finish(args, rules, results, dry_run, out):
+    """Write the combined diff and impact report, and name the rules that matched nothing."""
+    if args.diff:
+        from .patch import combined
+        text = combined(results)
+        if args.diff == '-':
+            sys.stdout.write(text)
+        else:
+            with open(args.diff, 'w') as f:
+                f.write(text)
+    if args.impact:
+        from .impact import report, write
+        write(report(results), out)
+    if dry_run or args.diff:
+        from .patch import unmatched
+        idle = unmatched(rules, results)
+        if idle:
+            print(f"matched nothing: {', '.join(idle)}", file=out)
+
+
+def list_rules(argv):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods list')
+    parser.add_argument('-r', '--rule', action='append', dest='rules', help='only these rule ids (repeatable)')
+    parser.add_argument('--anchors', action='store_true', help="also print each rule's markers")
+    args = parser.parse_args(argv)
+
+    from . import plugins
+    rules = plugins.load()
+    if args.rules:
+        rules = [r for r in rules if r.id in args.rules]
+    width = max((len(r.id) for r in rules), default=0)
+    for r in rules:
+        print(f"{r.id:<{width}}  {r.path}  ({r.plugin}, v{r.version})")
+        if args.anchors:
+            for anchor in r.anchors:
+                first = anchor.strip().splitlines()[0] if anchor.strip() else anchor
+                print(f"{'':<{width}}    {first[:72]!r}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv and argv[0] in COMMANDS + TOOLS else None
+    if command in TOOLS:
+        importlib.import_module(f'.{command}', __package__).main(argv[1:])
+    elif command == 'list':
+        list_rules(argv[1:])
+    elif command is not None:
+        apply(argv[1:], prog=f'python3 -m codemods {command}', dry_run=command == 'dry-run')
+    else:
+        apply(argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Multi-anchor index over a file.
+
+Every marker a rule declares (``@rule(..., anchors=[...])``) is found with
+one ``str.find`` sweep per marker when a file is first indexed. Edits then
+move the index forward (``update``): occurrences clear of the edits are
+shifted, and only the text around each edit is searched again. Scans are
+cached by content hash, so the same file seen again reuses the earlier one.
+"""
+import bisect
+import hashlib
+from collections import OrderedDict
+
+from .profiling import counters
+
+_CACHE_SIZE = 64
+# Characters hashed at a time by ``file_hash``
+_HASH_BLOCK = 1 << 20
+_scanners = {}
+_results = OrderedDict()
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def file_hash(path):
+    """``content_hash`` of the text of ``path``, read a block at a time."""
+    digest = hashlib.sha1()
+    with open(path, 'r') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), ''):
+            digest.update(block.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Scanner:
+    """Finds every occurrence of a fixed set of literal patterns.
+
+    Each pattern is searched for with ``str.find``, which runs at C speed, so
+    a scan costs a few passes over the text's memory rather than a Python
+    step per character.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = tuple(sorted(set(p for p in patterns if p)))
+        self.key = content_hash('\0'.join(self.patterns))
+        self.longest = max((len(p) for p in self.patterns), default=1)
+
+    def scan(self, text, start=0, end=None):
+        """Return ``{pattern: [start offsets]}`` for every pattern in ``text[start:end]``."""
+        end = len(text) if end is None else end
+        matches = {}
+        for p in self.patterns:
+            found = []
+            find = text.find
+            pos = find(p, start, end)
+            while pos >= 0:
+                found.append(pos)
+                pos = find(p, pos + 1, end)
+            matches[p] = found
+        return matches
+
+
+def scanner(patterns):
+    """Scanner for ``patterns``, shared between calls with the same set."""
+    patterns = tuple(sorted(set(p for p in patterns if p)))
+    compiled = _scanners.get(patterns)
+    if compiled is None:
+        compiled = _scanners[patterns] = Scanner(patterns)
+    return compiled
+
+
+class AnchorIndex:
+    """Sorted anchor offsets of one text."""
+
+    def __init__(self, text, matches, digest):
+        self.text = text
+        self.matches = matches
+        self.digest = digest
+
+    def __contains__(self, marker):
+        counters['probes'] += 1
+        found = bool(self._lookup(marker))
+        counters['matches'] += found
+        return found
+
+    def _lookup(self, marker):
+        found = self.matches.get(marker)
+        if found is None:
+            # Not compiled in: fall back to a direct search and remember it
+            found = []
+            pos = self.text.find(marker)
+            while marker and pos >= 0:
+                found.append(pos)
+                pos = self.text.find(marker, pos + 1)
+            self.matches[marker] = found
+        return found
+
+    def find(self, marker):
+        """Start offsets of every occurrence of ``marker``, overlaps included."""
+        counters['probes'] += 1
+        found = self._lookup(marker)
+        counters['matches'] += len(found)
+        return found
+
+    def first(self, marker, after=0):
+        """First occurrence of ``marker`` at or after ``after``, or -1."""
+        counters['probes'] += 1
+        found = self._lookup(marker)
+        i = bisect.bisect_left(found, after)
+        if i == len(found):
+            return -1
+        counters['matches'] += 1
+        return found[i]
+
+    def touches(self, marker, start, end):
+        """Whether an occurrence of ``marker`` overlaps ``[start, end)``, or spans ``start`` when empty."""
+        counters['probes'] += 1
+        found = self._lookup(marker)
+        i = bisect.bisect_left(found, start - len(marker) + 1)
+        hit = i < len(found) and found[i] < max(end, start + 1) and found[i] + len(marker) > start
+        counters['matches'] += hit
+        return hit
+
+    def distinct(self, marker):
+        """Non-overlapping occurrences, left to right, as ``str.replace`` sees them."""
+        offsets = []
+        end = 0
+        for pos in self.find(marker):
+            if pos >= end:
+                offsets.append(pos)
+                end = pos + len(marker)
+        return offsets
+
+
+def index(text, patterns, digest=None):
+    """Scan ``text`` for ``patterns`` once, reusing a cached scan of the same content."""
+    compiled = scanner(patterns)
+    digest = digest or content_hash(text)
+    key = (compiled.key, digest)
+    matches = _results.get(key)
+    if matches is None:
+        matches = compiled.scan(text)
+        counters['scanned'] += len(text)
+        _results[key] = matches
+        if len(_results) > _CACHE_SIZE:
+            _results.popitem(last=False)
+    else:
+        _results.move_to_end(key)
+    # Copy so fallback lookups on one index don't leak into the cache
+    return AnchorIndex(text, {p: list(v) for p, v in matches.items()}, digest)
+
+
+def update(previous, text, edits, patterns):
+    """Index of ``text``, the result of ``edits`` to ``previous.text``, searching only around them.
+
+    ``edits`` are sorted, non-overlapping ``(start, end, replacement)`` against
+    ``previous.text``. Occurrences clear of every edit are kept, shifted past
+    the edits before them; only the text within the longest pattern's length
+    of each edit is searched again.
+    """
+    compiled = scanner(patterns)
+    reach = compiled.longest - 1
+    ends = []
+    cumulative = []
+    # Each edit's span in ``text``, and the window searched around it
+    spans = []
+    delta = 0
+    for start, end, new in edits:
+        lo, hi = start + delta, start + delta + len(new)
+        spans.append((lo, hi, max(0, lo - reach), min(len(text), hi + reach)))
+        counters['scanned'] += spans[-1][3] - spans[-1][2]
+        delta += len(new) - (end - start)
+        ends.append(end)
+        cumulative.append(delta)
+
+    matches = {}
+    for p in compiled.patterns:
+        old = previous.matches.get(p)
+        if old is None:
+            old = previous.find(p)
+        size = len(p)
+        found = []
+        for o in old:
+            i = bisect.bisect_right(ends, o)
+            # Edits ending at or before ``o`` shift it; the next one must start past it
+            if i == len(edits) or edits[i][0] >= o + size:
+                found.append(o + (cumulative[i - 1] if i else 0))
+        for start, end, lo, hi in spans:
+            pos = text.find(p, lo, hi)
+            while pos >= 0:
+                if pos < end and pos + size > start:
+                    found.append(pos)
+                pos = text.find(p, pos + 1, hi)
+        matches[p] = sorted(set(found))
+    return AnchorIndex(text, matches, None)
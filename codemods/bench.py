@@ -0,0 +1,495 @@
+"""Codemod benchmarks on synthetic SettingsView.tsx and App.tsx workloads.
+
+Generates TSX files shaped like ``components/SettingsView.tsx`` (section
+windows with header blocks, padded bodies, data-source toggles, the permissions
+conditional and the markers every plugin looks for) at several sizes, and
+times each plugin script on its own, the scripts chained one after another,
+the single-pass engine, the engine with a warm result cache, the process
+pool runner and stream mode (``--stream``, see ``codemods.stream``).
+
+App.tsx workloads (state hooks, audit-logging handlers and effects, the
+``renderActiveView`` switch and the flyouts rendered at the bottom, plus a
+``DFP---NEO/App.tsx`` copy that differs in a few lines) time the runner over
+both copies with ``--all-sources``, the same with ``--dedup``, and the
+structural check.
+
+Every measurement runs in a fresh interpreter so its peak RSS is its own.
+The peak of traced allocations (the most live at once, not the total
+allocated) comes from a separate ``tracemalloc`` pass over the same work. Results are appended as JSON lines to ``bench_results.jsonl`` and
+compared with the previous run of the same workload and mode.
+
+    python3 -m codemods.bench
+    python3 -m codemods.bench --sizes 2000 20000 --modes engine scripts-chained
+    python3 -m codemods.bench --sizes --app-sizes 8000 --modes app:dedup
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from . import engine
+from .engine import Engine, load_plugins, open_cache
+from .runner import Runner
+from .stream import run as stream
+from .validate import check_files
+
+DEFAULT_SIZES = [2000, 20000, 200000]
+# App.tsx itself is about 8k lines
+DEFAULT_APP_SIZES = [8000, 80000]
+DEFAULT_OUTPUT = 'bench_results.jsonl'
+TARGET = 'components/SettingsView.tsx'
+MENU = 'components/SettingsViewWithMenu.tsx'
+APP = 'App.tsx'
+APP_MIRROR = 'DFP---NEO/App.tsx'
+
+_FIELD = '''                        <div>
+                            <label className="block text-sm font-medium text-gray-300 mb-2">{label}</label>
+                            <input type="number" value={{{state}}} onChange={{e => {setter}(Number(e.target.value))}} className="w-full bg-gray-700 border-gray-600 rounded-md py-1 px-2 text-white text-sm" />
+                        </div>
+'''
+
+_TOGGLE = '''                        {{/* {label} Toggle */}}
+                        <div className="flex justify-between items-center mb-4 pb-4 border-b border-gray-700">
+                            <div>
+                                <h4 className="text-white font-medium">{label} Data Source</h4>
+                                <p className="text-sm text-gray-400">Use database for {key}</p>
+                            </div>
+                            <button
+                                onClick={{() => {{
+                                    const newValue = !localStorage.getItem('dataSource_{key}');
+                                    localStorage.setItem('dataSource_{key}', newValue ? 'true' : 'false');
+                                    console.log('[Data Source] {label} data source set to:', newValue);
+                                    window.dispatchEvent(new Event('storage'));
+                                }}}}
+                                className={{`relative inline-flex h-6 w-11 items-center rounded-full ${{
+                                    localStorage.getItem('dataSource_{key}') === 'true' ? 'bg-green-600' : 'bg-gray-600'
+                                }}`}}
+                            >
+                                <span className={{`inline-block h-4 w-4 transform rounded-full bg-white ${{
+                                    localStorage.getItem('dataSource_{key}') === 'true' ? 'translate-x-6' : 'translate-x-1'
+                                }}`}} />
+                            </button>
+                        </div>
+'''
+
+# The Location section as it was before remove_section_headers, edit buttons and all
+_LOCATION = '''                       {/* Location Window */}
+                       <div className={`bg-gray-800 rounded-lg shadow-lg border border-gray-700 p-6 ${activeSection !== 'location' ? 'hidden' : ''}`}>
+                           <div className="p-4 flex justify-between items-center border-b border-gray-700">
+                               <h2 className="text-lg font-semibold text-gray-200">Location</h2>
+                               {isEditingLocations ? (
+                                   <div className="flex space-x-2">
+                                       <button onClick={handleSaveLocations} className="px-3 py-1 bg-sky-600 text-white rounded-md hover:bg-sky-700 text-xs font-semibold">Save</button>
+                                       <button onClick={handleCancelLocations} className="px-3 py-1 bg-gray-600 text-white rounded-md hover:bg-gray-700 text-xs font-semibold">Cancel</button>
+                                   </div>
+                               ) : (
+                                   <button 
+                                      onClick={handleEditLocations} 
+                                      disabled={!canEditSettings}
+                                      className={`px-3 py-1 rounded-md text-xs font-semibold ${
+                                          canEditSettings 
+                                              ? 'bg-gray-600 text-white hover:bg-gray-700 cursor-pointer' 
+                                              : 'bg-gray-700 text-gray-500 cursor-not-allowed'
+                                      }`}
+                                  >
+                                      Edit
+                                  </button>
+                               )}
+                           </div>
+                           <div className="p-4 space-y-4">'''
+
+_SECTION_OPEN = '''
+                {{/* {title} Window */}}
+                {{activeSection === '{id}' && (
+                <div className="bg-gray-800 rounded-lg shadow-lg border border-gray-700 p-6 w-96">
+                    <div className="p-4 flex justify-between items-center border-b border-gray-700">
+                        <h2 className="text-lg font-semibold text-gray-200">{title}</h2>
+                    </div>
+                    <div className="p-4 space-y-4">
+'''
+
+_SECTION_CLOSE = '''                    </div>
+                </div>
+                )}
+'''
+
+_HANDLERS = '''    const [{state}, {setter}] = useState<number>({value});
+    const handleSave{name} = () => {{
+        logAudit({{ page: 'Settings - {title}', action: 'update', description: `Saved ${{{state}}}` }});
+        onShowSuccess('{title} saved');
+    }};
+'''
+
+
+_APP_STATE = '''    const [{state}, {setter}] = useState<number>({value});
+    const [show{name}, setShow{name}] = useState(false);
+'''
+
+_APP_HANDLER = '''    const handle{name}Change = useCallback((value: number) => {{
+        {setter}(value);
+        debouncedAuditLog('{view}', 'update', `{label} changed to ${{value}}`);
+    }}, [{state}]);
+'''
+
+_APP_EFFECT = '''    useEffect(() => {{
+        if (activeView !== '{view}') return;
+        const timer = setTimeout(() => logAudit({{ page: '{view}', action: 'view', description: '{label}' }}), 500);
+        return () => clearTimeout(timer);
+    }}, [activeView, {state}]);
+'''
+
+_APP_CASE = '''            case '{view}':
+                return <{name}View
+                    {state}={{{state}}}
+                    on{name}Change={{handle{name}Change}}
+                    onOpenFlyout={{() => setShow{name}(true)}}
+                />;
+'''
+
+_APP_FLYOUT = '''            {{show{name} && (
+                <{name}Flyout
+                    value={{{state}}}
+                    onClose={{() => setShow{name}(false)}}
+                    onSave={{(value) => {{ handle{name}Change(value); setShow{name}(false); }}}}
+                />
+            )}}
+'''
+
+
+def _words(rng, count):
+    pool = ['Sortie', 'Limit', 'Crew', 'Duty', 'Brief', 'Wing', 'Flight', 'Range', 'Check', 'Window']
+    return ' '.join(rng.choice(pool) for _ in range(count))
+
+
+def generate_settings_view(lines, seed=0):
+    """Synthetic SettingsView.tsx of roughly ``lines`` lines."""
+    import fix_settings_layout
+
+    rng = random.Random(seed)
+    head = [
+        "import React, { useState } from 'react';\n",
+        "import PermissionsManagerWindow from './PermissionsManagerWindow';\n",
+        "import AuditButton from './AuditButton';\n",
+        "import { logAudit } from '../utils/auditLogger';\n",
+        "\n",
+        "export const SettingsView: React.FC<SettingsViewProps> = ({ activeSection, canEditSettings, onShowSuccess }) => {\n",
+        "    const [isEditingLocations, setIsEditingLocations] = useState(false);\n",
+    ]
+    sections = []
+    handlers = []
+    # One generic section with handlers is about 30 lines
+    count = max(1, (lines - 120) // 30)
+    for n in range(count):
+        title = f"{_words(rng, 2)} {n}"
+        name = f"Section{n}"
+        state, setter = f"value{n}", f"setValue{n}"
+        handlers.append(_HANDLERS.format(state=state, setter=setter, value=rng.randint(1, 99), name=name, title=title))
+        body = [_SECTION_OPEN.format(title=title, id=f'section-{n}')]
+        for f in range(rng.randint(1, 4)):
+            body.append(_FIELD.format(label=_words(rng, 3), state=state, setter=setter))
+        if n % 3 == 0:
+            key = f"source{n}"
+            body.append(_TOGGLE.format(label=f"Source {n}", key=key))
+        body.append(_SECTION_CLOSE)
+        sections.append(''.join(body))
+
+    markers = [
+        '\n                {/* Scoring Matrix Window */}\n',
+        '                       <div className="bg-gray-800 rounded-lg shadow-lg border border-gray-700 p-6">\n',
+        '                           ' + fix_settings_layout.old_scoring_header + '\n',
+        '                               <button onClick={() => onShowSuccess(\'Airmanship\')}>Airmanship</button>\n',
+        '                           </div>\n',
+        '                       </div>\n\n',
+        _LOCATION + '\n',
+        '                                <p className="text-sm text-gray-400">Configured operating locations.</p>\n',
+        '                           </div>\n',
+        '                       </div>\n',
+        '\n                {/* Permissions Manager Window */}\n',
+        "                {activeSection === 'permissions' && (\n",
+        '                <PermissionsManagerWindow onShowSuccess={onShowSuccess} />\n',
+        '                )}\n',
+    ]
+    body = [
+        '\n',
+        fix_settings_layout.old_structure + '\n',
+        '                       {!canEditSettings && (\n',
+        '                           <p className="text-sm text-yellow-200">Read only</p>\n',
+        fix_settings_layout.old_header_close + '\n',
+        ''.join(markers),
+        ''.join(sections),
+        '                </div>\n',
+        '              </div>\n',
+        '            </div>\n',
+        '        </>\n',
+        '    );\n',
+        '};\n',
+    ]
+    return ''.join(head) + ''.join(handlers) + ''.join(body)
+
+
+def generate_app(lines, seed=0):
+    """Synthetic App.tsx of roughly ``lines`` lines."""
+    rng = random.Random(seed)
+    imports = [
+        "import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';\n",
+        "import { logAudit } from './utils/auditLogger';\n",
+        "import { debouncedAuditLog } from './utils/auditDebounce';\n",
+        "import Sidebar from './components/Sidebar';\n",
+        "import Header from './components/Header';\n",
+    ]
+    states, handlers, effects, cases, flyouts = [], [], [], [], []
+    # One view with its state, handler, effect, case, flyout and imports is 26 lines
+    count = max(1, (lines - 30) // 26)
+    for n in range(count):
+        label = f"{_words(rng, 2)} {n}"
+        name = f"View{n}"
+        view = label.title()
+        fields = dict(state=f"value{n}", setter=f"setValue{n}", name=name, view=view, label=label,
+                      value=rng.randint(1, 99))
+        imports.append(f"import {name}View from './components/{name}View';\n")
+        imports.append(f"import {name}Flyout from './components/{name}Flyout';\n")
+        states.append(_APP_STATE.format(**fields))
+        handlers.append(_APP_HANDLER.format(**fields))
+        effects.append(_APP_EFFECT.format(**fields))
+        cases.append(_APP_CASE.format(**fields))
+        flyouts.append(_APP_FLYOUT.format(**fields))
+    body = [
+        '\n',
+        'const App: React.FC = () => {\n',
+        "    const [activeView, setActiveView] = useState<string>('Program Schedule');\n",
+        ''.join(states),
+        '\n',
+        ''.join(handlers),
+        '\n',
+        ''.join(effects),
+        '\n',
+        '    const renderActiveView = () => {\n',
+        '        switch (activeView) {\n',
+        ''.join(cases),
+        '            default:\n',
+        '                return null;\n',
+        '        }\n',
+        '    };\n',
+        '\n',
+        '    return (\n',
+        '        <div className="flex h-screen bg-gray-900 font-sans">\n',
+        '            <Sidebar activeView={activeView} onNavigate={setActiveView} />\n',
+        '            <div className="flex-1 flex flex-col overflow-hidden">\n',
+        '                <Header onNavigate={setActiveView} />\n',
+        '                {renderActiveView()}\n',
+        '            </div>\n',
+        ''.join(flyouts),
+        '        </div>\n',
+        '    );\n',
+        '};\n',
+        '\n',
+        'export default App;\n',
+    ]
+    return ''.join(imports) + ''.join(body)
+
+
+def _write(root, path, text):
+    os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+    for name in (path, path + '.orig'):
+        with open(os.path.join(root, name), 'w') as f:
+            f.write(text)
+
+
+def _name(kind, size):
+    return f"{kind}-{size // 1000}k" if size >= 1000 else f"{kind}-{size}"
+
+
+def workloads(sizes, directory, seed=0):
+    """Write one workload tree per size; returns ``[(name, root, lines, bytes)]``."""
+    out = []
+    for size in sizes:
+        name = _name('settings', size)
+        root = os.path.join(directory, name)
+        text = generate_settings_view(size, seed=seed)
+        _write(root, TARGET, text)
+        with open(MENU, 'r') as f:
+            _write(root, MENU, f.read())
+        out.append((name, root, text.count('\n'), len(text.encode('utf-8'))))
+    return out
+
+
+def app_workloads(sizes, directory, seed=0):
+    """Write one App.tsx workload tree per size; returns ``[(name, root, lines, bytes)]``."""
+    out = []
+    for size in sizes:
+        name = _name('app', size)
+        root = os.path.join(directory, name)
+        text = generate_app(size, seed=seed)
+        _write(root, APP, text)
+        # The copied tree keeps its own header component
+        _write(root, APP_MIRROR, text.replace("from './components/Header'", "from './components/NeoHeader'", 1))
+        out.append((name, root, text.count('\n'), len(text.encode('utf-8'))))
+    return out
+
+
+def modes():
+    return [f"script:{name}" for name in engine.PLUGINS] + [
+        'scripts-chained', 'engine', 'engine-cached', 'runner', 'stream']
+
+
+def app_modes():
+    return ['app:all-sources', 'app:dedup', 'app:validate']
+
+
+def _files(mode):
+    return (APP, APP_MIRROR) if mode.startswith('app:') else (TARGET, MENU)
+
+
+def _reset(root, files=(TARGET, MENU)):
+    for path in files:
+        shutil.copy(os.path.join(root, path + '.orig'), os.path.join(root, path))
+
+
+def _work(mode, root):
+    """Return a callable doing one run of ``mode`` against workload ``root``."""
+    rules = load_plugins()
+    if mode.startswith('script:'):
+        plugin = mode.split(':', 1)[1]
+        selected = [r for r in rules if r.plugin == plugin]
+        return lambda: Engine(selected, root=root).run()
+    if mode == 'scripts-chained':
+        # One read/scan/write cycle per script, as when they were run by hand
+        return lambda: [Engine([r for r in rules if r.plugin == p], root=root).run() for p in engine.PLUGINS]
+    if mode == 'engine':
+        return lambda: Engine(rules, root=root).run()
+    if mode == 'engine-cached':
+        cache_dir = os.path.join(root, '.codemods-cache')
+
+        def cached():
+            return Engine(rules, root=root, cache=open_cache(root)).run()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        _reset(root)
+        cached()
+        return cached
+    if mode == 'runner':
+        return lambda: Runner(rules, root=root).run([TARGET, MENU])
+    if mode == 'stream':
+        return lambda: stream(rules, [TARGET, MENU], root=root)
+    if mode == 'app:all-sources':
+        # No rule targets App.tsx: this is the cost of scanning it for every anchor
+        return lambda: Runner(rules, root=root, all_sources=True).run([APP, APP_MIRROR])
+    if mode == 'app:dedup':
+        return lambda: Runner(rules, root=root, all_sources=True, dedup=True).run([APP, APP_MIRROR])
+    if mode == 'app:validate':
+        return lambda: check_files([os.path.join(root, APP), os.path.join(root, APP_MIRROR)], jobs=1)
+    raise SystemExit(f"unknown mode {mode!r}; expected one of {', '.join(modes() + app_modes())}")
+
+
+def measure(mode, root, repeat):
+    """Time ``mode`` in this process; returns a result dict."""
+    work = _work(mode, root)
+    files = _files(mode)
+    times = []
+    for _ in range(repeat):
+        _reset(root, files)
+        start = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - start)
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    _reset(root, files)
+    tracemalloc.start()
+    work()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _reset(root, files)
+    return {
+        'mode': mode,
+        'wall_ms': round(min(times) * 1000, 3),
+        'wall_ms_mean': round(sum(times) / len(times) * 1000, 3),
+        'peak_rss_kb': rss_kb,
+        'alloc_peak_kb': round(alloc_peak / 1024, 1),
+    }
+
+
+def _measure_subprocess(mode, root, repeat):
+    proc = subprocess.run(
+        [sys.executable, '-m', 'codemods.bench', '--measure', mode, '--workdir', root, '--repeat', str(repeat)],
+        capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'mode': mode, 'error': proc.stderr.strip().splitlines()[-1] if proc.stderr else 'failed'}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _previous(output):
+    """Latest earlier result for each (workload, mode)."""
+    latest = {}
+    try:
+        with open(output, 'r') as f:
+            for line in f:
+                if line.strip():
+                    res = json.loads(line)
+                    latest[(res.get('workload'), res.get('mode'))] = res
+    except OSError:
+        pass
+    return latest
+
+
+def _delta(res, prev):
+    if not prev or 'wall_ms' not in prev or 'wall_ms' not in res or not prev['wall_ms']:
+        return ''
+    change = (res['wall_ms'] - prev['wall_ms']) / prev['wall_ms'] * 100
+    return f"{change:+.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods.bench')
+    parser.add_argument('--sizes', nargs='*', type=int, default=DEFAULT_SIZES,
+                        help='SettingsView.tsx workload sizes in lines')
+    parser.add_argument('--app-sizes', nargs='*', type=int, default=DEFAULT_APP_SIZES,
+                        help='App.tsx workload sizes in lines')
+    parser.add_argument('--modes', nargs='+', help='modes to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per measurement')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON lines file results are appended to')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.workdir, args.repeat)))
+        return
+
+    selected = args.modes or modes() + app_modes()
+    previous = _previous(args.output)
+    stamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+    results = []
+    with tempfile.TemporaryDirectory(prefix='codemods-bench-') as directory:
+        runs = [(w, [m for m in selected if not m.startswith('app:')])
+                for w in workloads(args.sizes, directory, seed=args.seed)]
+        runs += [(w, [m for m in selected if m.startswith('app:')])
+                 for w in app_workloads(args.app_sizes, directory, seed=args.seed)]
+        for (name, root, lines, size), workload_modes in runs:
+            if not workload_modes:
+                continue
+            print(f"{name}: {lines} lines, {size / 1024:.0f} KiB")
+            for mode in workload_modes:
+                res = _measure_subprocess(mode, root, args.repeat)
+                res.update(workload=name, lines=lines, bytes=size, run=stamp)
+                results.append(res)
+                if 'error' in res:
+                    print(f"    {mode:32} FAILED: {res['error']}")
+                    continue
+                print(f"    {mode:32} {res['wall_ms']:10.1f} ms  {res['peak_rss_kb'] / 1024:7.1f} MiB rss  "
+                      f"{res['alloc_peak_kb'] / 1024:7.1f} MiB alloc peak  {_delta(res, previous.get((name, mode)))}")
+
+    with open(args.output, 'a') as f:
+        for res in results:
+            f.write(json.dumps(res) + '\n')
+    print(f"results appended to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
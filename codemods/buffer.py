@@ -0,0 +1,201 @@
+"""Edit buffer that records edits against a base text.
+
+Rules splice a file through ``EditBuffer.replace`` instead of inserting into and
+deleting from a list of lines. Edits are kept as a sorted, non-overlapping list
+of ``(start, end, text)`` pieces over the unchanged base text, so recording one
+is a bisect and the file is rebuilt exactly once, in ``materialize``.
+
+Offsets handed to the buffer are always base offsets. ``position`` and ``line``
+map a base offset to where it ends up after the pending edits, using cumulative
+deltas and a bisect, so later lookups stay logarithmic in the number of edits.
+"""
+import bisect
+
+_CHUNK = 4096
+
+
+class EditBuffer:
+    def __init__(self, text):
+        self.base = text
+        self._starts = []
+        self._ends = []
+        self._edits = []
+        self._line_starts = None
+        # Cumulative (char delta, newline delta) after each edit, rebuilt lazily
+        self._deltas = None
+
+    def __len__(self):
+        return len(self.base) + (self._cumulative()[-1][0] if self._edits else 0)
+
+    @property
+    def dirty(self):
+        return bool(self._edits)
+
+    @property
+    def edits(self):
+        return list(self._edits)
+
+    def replace(self, start, end, text):
+        if not 0 <= start <= end <= len(self.base):
+            raise ValueError(f"edit {start}:{end} outside text of length {len(self.base)}")
+        # Inserts at an offset sort before a replacement starting there and
+        # after earlier inserts at the same offset
+        i = bisect.bisect_right(self._starts, start)
+        if start == end:
+            while i > 0 and self._starts[i - 1] == start and self._ends[i - 1] > start:
+                i -= 1
+        if i > 0 and self._ends[i - 1] > start:
+            raise ValueError(f"edit {start}:{end} overlaps edit {self._starts[i - 1]}:{self._ends[i - 1]}")
+        if i < len(self._edits) and self._starts[i] < end:
+            raise ValueError(f"edit {start}:{end} overlaps edit {self._starts[i]}:{self._ends[i]}")
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._edits.insert(i, (start, end, text))
+        self._deltas = None
+
+    def insert(self, offset, text):
+        self.replace(offset, offset, text)
+
+    def delete(self, start, end):
+        self.replace(start, end, '')
+
+    def _cumulative(self):
+        if self._deltas is None:
+            base = self.base
+            chars = lines = 0
+            deltas = []
+            for start, end, text in self._edits:
+                chars += len(text) - (end - start)
+                lines += text.count('\n') - base.count('\n', start, end)
+                deltas.append((chars, lines))
+            self._deltas = deltas
+        return self._deltas
+
+    def _before(self, offset):
+        """Number of edits that end at or before ``offset``."""
+        return bisect.bisect_right(self._ends, offset)
+
+    def position(self, offset):
+        """Offset in the edited text of base ``offset``.
+
+        Offsets inside a replaced range map to the start of its replacement.
+        """
+        i = self._before(offset)
+        if i < len(self._edits) and self._starts[i] < offset:
+            offset = self._starts[i]
+        return offset + (self._cumulative()[i - 1][0] if i else 0)
+
+    def line_starts(self):
+        if self._line_starts is None:
+            starts = [0]
+            find = self.base.find
+            pos = find('\n')
+            while pos >= 0:
+                starts.append(pos + 1)
+                pos = find('\n', pos + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def base_line(self, offset):
+        """0-based line of base ``offset`` in the base text."""
+        return bisect.bisect_right(self.line_starts(), offset) - 1
+
+    def line(self, offset):
+        """0-based line of base ``offset`` in the edited text."""
+        i = self._before(offset)
+        return self.base_line(offset) + (self._cumulative()[i - 1][1] if i else 0)
+
+    def line_offset(self, line):
+        """Base offset where 0-based base ``line`` starts."""
+        return self.line_starts()[line]
+
+    def materialize(self):
+        if not self._edits:
+            return self.base
+        base = self.base
+        out = []
+        pos = 0
+        for start, end, text in self._edits:
+            out.append(base[pos:start])
+            out.append(text)
+            pos = end
+        out.append(base[pos:])
+        return ''.join(out)
+
+    def commit(self):
+        """Fold pending edits into the base text and return it."""
+        if self._edits:
+            self.__init__(self.materialize())
+        return self.base
+
+
+def changed_span(old, new):
+    """``(start, old_end, new_end)``: ``old[start:old_end]`` became ``new[start:new_end]``."""
+    n = min(len(old), len(new))
+    start = 0
+    # Compare in chunks first; strings compare at C speed
+    while start + _CHUNK <= n and old[start:start + _CHUNK] == new[start:start + _CHUNK]:
+        start += _CHUNK
+    while start < n and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end - _CHUNK >= start and new_end - _CHUNK >= start and \
+            old[old_end - _CHUNK:old_end] == new[new_end - _CHUNK:new_end]:
+        old_end -= _CHUNK
+        new_end -= _CHUNK
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return start, old_end, new_end
+
+
+def compose(first, second, text):
+    """Edits against the original text that apply ``first`` and then ``second``.
+
+    ``first`` is against the original and produced ``text``; ``second`` is
+    against ``text``. Both are sorted and non-overlapping, and so is the
+    result. Overlapping or touching edits are merged, reading the text between
+    them from ``text``. Linear in the number of edits.
+    """
+    if not first:
+        return list(second)
+    # Every edit as its span in ``text``; the first list's also keep their length change
+    items = []
+    delta = 0
+    for start, end, new in first:
+        items.append((start + delta, start + delta + len(new), new, len(new) - (end - start)))
+        delta += len(new) - (end - start)
+    items.extend((start, end, new, None) for start, end, new in second)
+    # Inserts before replacements at the same offset, as in EditBuffer
+    items.sort(key=lambda item: (item[0], item[1] > item[0]))
+
+    out = []
+    delta = 0
+    i = 0
+    while i < len(items):
+        lo, hi = items[i][0], items[i][1]
+        j = i + 1
+        while j < len(items) and items[j][0] <= hi:
+            hi = max(hi, items[j][1])
+            j += 1
+        group = items[i:j]
+        grown = sum(item[3] for item in group if item[3] is not None)
+        later = [item for item in group if item[3] is None]
+        if not later:
+            # Untouched edits of the first list
+            for start, end, new, change in group:
+                out.append((start - delta, start - delta + len(new) - change, new))
+                delta += change
+        else:
+            # Apply the second list's edits to this stretch of ``text``
+            pieces = []
+            pos = lo
+            for start, end, new, _ in later:
+                pieces.append(text[pos:start])
+                pieces.append(new)
+                pos = end
+            pieces.append(text[pos:hi])
+            out.append((lo - delta, hi - delta - grown, ''.join(pieces)))
+            delta += grown
+        i = j
+    return out
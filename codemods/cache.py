@@ -0,0 +1,110 @@
+"""Persistent rule result cache keyed by content hash.
+
+An entry maps ``(input hash, rule id, rule version, rule source)`` to the
+number of edits the rule made and the hash of the text it produced. The
+source digest (``engine.fingerprint``) covers the plugin and every module it
+imports, so editing a rule or the data it reads is never a cache hit.
+Produced texts are kept as compressed blobs, so a chain of cached rules can
+be replayed without running any of them. After the rules rewrite a file they
+are run once more over the result, and what they do there is recorded too.
+Usually that shows the result is a fixed point of every rule, so running the
+same rules over an already rewritten file is a cache hit that costs one hash
+and changes nothing.
+"""
+import json
+import os
+import tempfile
+import zlib
+
+DEFAULT_DIR = '.codemods-cache'
+
+
+def rule_key(rule):
+    if not rule.source:
+        return f"{rule.id}@{rule.version}"
+    return f"{rule.id}@{rule.version}#{rule.source[:16]}"
+
+
+class ResultCache:
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self.entries = self._load()
+        self.added = {}
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, digest, rule):
+        """``(hits, output hash)`` recorded for ``rule`` on ``digest``, or None."""
+        entry = self.entries.get(f"{digest}:{rule_key(rule)}")
+        return tuple(entry) if entry else None
+
+    def settled(self, digest, rules):
+        """Whether ``digest`` is recorded as a fixed point of every one of ``rules``."""
+        return all(self.get(digest, r) == (0, digest) for r in rules)
+
+    def put(self, digest, rule, hits, output):
+        key = f"{digest}:{rule_key(rule)}"
+        self.entries[key] = self.added[key] = [hits, output]
+
+    def update(self, entries):
+        """Merge entries recorded elsewhere, e.g. by pool workers."""
+        self.entries.update(entries)
+        self.added.update(entries)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, 'blobs', digest[:2], digest[2:])
+
+    def load_blob(self, digest):
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error):
+            return None
+
+    def store_blob(self, digest, text):
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Blobs are content addressed, so concurrent writers can race harmlessly
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(zlib.compress(text.encode('utf-8')))
+        os.replace(tmp, path)
+
+    def save(self):
+        if not self.added:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Merge with whatever another run saved in the meantime
+        entries = self._load()
+        entries.update(self.added)
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entries, f, separators=(',', ':'))
+        os.replace(tmp, self.index_path)
+        self.entries = entries
+        self.added = {}
+
+
+def replay(cache, digest, rules):
+    """Follow cached entries from ``digest``.
+
+    Returns ``(hits, current hash, number of rules replayed)``; replay stops at
+    the first rule without an entry.
+    """
+    hits = {}
+    current = digest
+    for done, r in enumerate(rules):
+        entry = cache.get(current, r)
+        if entry is None:
+            return hits, current, done
+        hits[r.id], current = entry
+    return hits, current, len(rules)
+
@@ -0,0 +1,273 @@
+"""Order-insensitive rewrites of className tokens.
+
+``classes`` registers a rule that works on className values as token lists
+rather than as strings::
+
+    classes('components/SettingsView.tsx', 'clean_inner_padding',
+            element='div', when=('p-4', 'space-y-4'), exact=True, remove=('p-4',))
+
+An element matches when its className holds every ``when`` token, in any
+order and with any spacing (and, with ``exact``, nothing else). Then
+``remove`` drops tokens, ``replace`` swaps one token for another and ``add``
+appends tokens that are missing. Tokens come from the quoted value, or from
+the string and template literals of a ``{...}`` value (see
+``jsx.class_literals``). Only the tokens that change are edited, so the
+surrounding spacing, line breaks and ``${...}`` parts stay as they were. A
+rule is idempotent: it reports an element only when it changed it.
+
+Class rules run like any other rule. ``rewrite`` also applies any number of
+them to a text in one pass over its element tree, and
+``python3 -m codemods.classes`` does that over the whole tree, with hit
+counts per rule:
+
+    python3 -m codemods.classes -n
+    python3 -m codemods.classes -n 'components/**/*.tsx'
+"""
+import argparse
+import os
+import sys
+import time
+
+from .engine import Engine, FileResult, Rule, RuleError, load_plugins, register
+from .jsx import class_literals, parse
+
+
+class ClassRewrite:
+    """A compiled class rule; call it with a Document like any rule function."""
+
+    def __init__(self, when=(), remove=(), add=(), replace=None, element=None, exact=False):
+        self.replace = dict(replace or {})
+        self.when = frozenset(when) or frozenset(remove) | frozenset(self.replace)
+        if not self.when:
+            raise ValueError('a class rule needs tokens to match: when, remove or replace')
+        if not (remove or add or self.replace):
+            raise ValueError('a class rule needs remove, add or replace')
+        self.remove = frozenset(remove)
+        self.add = tuple(add)
+        self.element = element
+        self.exact = exact
+
+    @property
+    def anchors(self):
+        return tuple(sorted(self.when))
+
+    def matches(self, name, tokens):
+        if self.element is not None and name != self.element:
+            return False
+        present = {tok for run in tokens for _, tok in run}
+        if self.exact:
+            return present == self.when
+        return self.when.issubset(present)
+
+    def apply_tokens(self, runs):
+        """Rewrite ``runs`` in place; returns whether anything changed.
+
+        Each run is a list of ``[separator, token]`` pairs.
+        """
+        changed = False
+        present = {tok for run in runs for _, tok in run}
+        for run in runs:
+            i = 0
+            while i < len(run):
+                tok = run[i][1]
+                new = self.replace.get(tok, tok)
+                if tok in self.remove or (new != tok and new in present):
+                    if i == 0 and len(run) > 1:
+                        # The next token takes over the leading separator
+                        run[1][0] = run[0][0]
+                    del run[i]
+                    changed = True
+                    continue
+                if new != tok:
+                    run[i][1] = new
+                    present.add(new)
+                    changed = True
+                i += 1
+        missing = [tok for tok in self.add if tok not in {t for run in runs for _, t in run}]
+        if missing and runs:
+            first = runs[0]
+            for tok in missing:
+                first.append([' ' if first else '', tok])
+            changed = True
+        return changed
+
+    def __call__(self, doc):
+        if not all(tok in doc.anchors for tok in self.when):
+            return 0
+        edits, hits = rewrite_tree(doc.text, doc.tree, [self])
+        doc.splice(edits)
+        return hits[0]
+
+
+def _runs(text, start, end):
+    """``[separator, token]`` pairs of ``text[start:end]`` and its trailing whitespace."""
+    run = []
+    i = start
+    while i < end:
+        j = i
+        while j < end and text[j].isspace():
+            j += 1
+        if j == end:
+            break
+        k = j
+        while k < end and not text[k].isspace():
+            k += 1
+        run.append([text[i:j], text[j:k]])
+        i = k
+    return run, text[i:end]
+
+
+def rewrite_tree(text, tree, rewrites):
+    """Apply ``rewrites`` in order to every className in ``tree``, in one pass.
+
+    Returns ``(edits, hits)``: splice edits against ``text`` and, per rewrite,
+    the number of elements it changed.
+    """
+    return rewrite_elements(text, tree.elements, rewrites)
+
+
+def rewrite_elements(text, elements, rewrites):
+    """``rewrite_tree`` over just ``elements``, e.g. ones a rule picked by structure."""
+    hits = [0] * len(rewrites)
+    edits = []
+    for el in elements:
+        attr = el.attrs.get('className')
+        if attr is None:
+            continue
+        spans = class_literals(text, attr)
+        parsed = [_runs(text, start, end) for start, end in spans]
+        runs = [run for run, _ in parsed]
+        changed = False
+        for k, rw in enumerate(rewrites):
+            if rw.matches(el.name, runs) and rw.apply_tokens(runs):
+                hits[k] += 1
+                changed = True
+        if not changed:
+            continue
+        for (start, end), run, (_, trailing) in zip(spans, runs, parsed):
+            new = ''.join(sep + tok for sep, tok in run) + trailing
+            if new != text[start:end]:
+                edits.append((start, end, new))
+    return edits, hits
+
+
+def rewrite(text, rewrites, path=''):
+    """``(new text, hits per rewrite)`` after applying ``rewrites`` to ``text``."""
+    tree = parse(text, jsx=not path.endswith('.ts'))
+    edits, hits = rewrite_tree(text, tree, rewrites)
+    out = []
+    pos = 0
+    for start, end, new in sorted(edits):
+        out.append(text[pos:start])
+        out.append(new)
+        pos = end
+    out.append(text[pos:])
+    return ''.join(out), hits
+
+
+def classes(path, id, version=1, **spec):
+    """Compile ``spec`` into a ``ClassRewrite`` and register it as rule ``id``."""
+    rw = ClassRewrite(**spec)
+    plugin = sys._getframe(1).f_globals.get('__name__')
+    return register(Rule(id, path, rw, plugin=plugin, anchors=rw.anchors, version=version))
+
+
+def class_rules(rules):
+    # Not isinstance: under ``python3 -m`` this module is loaded twice
+    return [r for r in rules if hasattr(r.apply, 'apply_tokens')]
+
+
+def _rewrite_files(args):
+    from .validate import check
+    root, rules, paths = args
+    results = []
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            with open(os.path.join(root, path), 'r') as f:
+                text = f.read()
+            new, hits = rewrite(text, [r.apply for r in rules], path)
+            res = FileResult(path, {r.id: n for r, n in zip(rules, hits)}, new != text,
+                             time.perf_counter() - start)
+            if res.changed:
+                problem = check(new, path)
+                if problem is not None and check(text, path) is None:
+                    raise RuleError(f"rewrite breaks the file at {problem}")
+                res.text = new
+                res.original = text
+        except (OSError, RuleError) as e:
+            res = FileResult(path, {}, False, 0.0, error=str(e))
+        results.append(res)
+    return results
+
+
+def run_all(rules, paths=None, root='.', jobs=None, write=True):
+    """Apply class ``rules`` in one pass per file; returns the ``FileResult``s.
+
+    With ``paths`` every rule runs on every one of them, otherwise each rule
+    runs on its own target. Changed files are written together, and only if
+    none failed.
+    """
+    # Imported here so plugins that only declare class rules load quickly
+    from concurrent.futures import ProcessPoolExecutor
+    from .rebase import publish
+    from .runner import shard
+    jobs = jobs or os.cpu_count() or 1
+    if paths is None:
+        groups = {}
+        for r in rules:
+            groups.setdefault(r.path, []).append(r)
+        work = [(root, group, [path]) for path, group in groups.items()]
+    else:
+        work = [(root, rules, chunk) for chunk in shard(paths, jobs * 4, root=root)]
+    if jobs <= 1 or len(work) <= 1:
+        done = map(_rewrite_files, work)
+    else:
+        with ProcessPoolExecutor(jobs) as pool:
+            done = list(pool.map(_rewrite_files, work))
+    results = [res for chunk in done for res in chunk]
+
+    if write and not any(res.error for res in results):
+        by_path = {path: group for _, group, chunk in work for path in chunk}
+        results = publish(Engine(rules, root=root), results, by_path.get)
+    return results
+
+
+def totals(rules, results):
+    """Hits per rule id across ``results``, in rule order."""
+    out = {r.id: 0 for r in rules}
+    for res in results:
+        for id, n in res.hits.items():
+            out[id] += n
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods.classes')
+    parser.add_argument('globs', nargs='*', help="files to rewrite with every class rule, e.g. 'components/**/*.tsx'")
+    parser.add_argument('-r', '--rule', action='append', dest='rules', help='rule id to run (repeatable)')
+    parser.add_argument('-j', '--jobs', type=int, help='worker processes')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='count edits without writing')
+    parser.add_argument('--all-sources', action='store_true', help='rewrite every app source file')
+    args = parser.parse_args(argv)
+    from .runner import DEFAULT_GLOBS, expand, summarize
+
+    rules = class_rules(load_plugins())
+    if args.rules:
+        rules = [r for r in rules if r.id in args.rules]
+    if not rules:
+        parser.error('no class rules selected')
+    paths = None
+    if args.globs or args.all_sources:
+        paths = expand(args.globs or DEFAULT_GLOBS)
+    results = run_all(rules, paths, jobs=args.jobs, write=not args.dry_run)
+
+    summarize(results)
+    verb = 'changed' if not args.dry_run and not any(res.error for res in results) else 'would change'
+    for id, n in totals(rules, results).items():
+        print(f"    {id}: {verb} {n} element(s)" if n else f"    {id}: no matches")
+    sys.exit(1 if any(res.error for res in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
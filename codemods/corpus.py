@@ -0,0 +1,293 @@
+"""Regression corpus: every rule over historical versions of its inputs.
+
+The corpus is every committed revision of each rule's target file (and of
+``SOURCES``), read from git history, plus the ``.backup*`` copies beside
+them (``App.tsx.backup``, ``App.tsx.backup_before_v2``,
+``components/SettingsView.tsx.backup``). Each input goes through all the
+rules in a process pool, and its output is compared by hash with the golden
+snapshot in ``codemods/golden/``. Snapshots are keyed by the input's content
+hash, so a new commit that leaves a file as it was reuses the snapshot of
+that content; an input never seen before is reported as new without failing
+the check. A snapshot stores the edits the rules made to that input, so the
+golden text is only rebuilt, and diffed against the output, when the hashes
+differ.
+
+Results are cached in ``.codemods-cache/corpus/`` under the same keys as a
+normal run, which cover each rule's source digest: the plugin module and every
+module it imports. An input whose rules are unchanged since the last run is
+checked without running anything.
+
+    python3 -m codemods.corpus              # check every input against its snapshot
+    python3 -m codemods.corpus --update     # record the current outputs as golden
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .anchors import content_hash
+from .buffer import EditBuffer
+from .cache import DEFAULT_DIR as CACHE_DIR, ResultCache, replay
+from .engine import Engine, FileResult, load_plugins
+
+# Sources no rule targets whose history and backups still belong in the corpus
+SOURCES = ('App.tsx',)
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+CORPUS_CACHE = os.path.join(CACHE_DIR, 'corpus')
+
+Case = namedtuple('Case', 'name text digest')
+
+_engine = None
+
+
+def _git(root, *args, input=None):
+    return subprocess.run(('git', '-C', root) + args, input=input, capture_output=True, check=True).stdout
+
+
+def history(path, root='.'):
+    """``(path@commit, text)`` for every committed revision of ``path``, newest first."""
+    try:
+        log = _git(root, 'log', '--format=%H', '--raw', '--no-abbrev', '--no-renames', '--', path)
+    except (OSError, subprocess.CalledProcessError):
+        return []
+    revisions = []
+    commit = None
+    for line in log.decode().splitlines():
+        if line.startswith(':'):
+            blob = line.split('\t', 1)[0].split()[3]
+            if blob.strip('0'):
+                revisions.append((f"{path}@{commit}", blob))
+        elif line:
+            commit = line[:10]
+    if not revisions:
+        return []
+
+    # One cat-file for every blob
+    out = _git(root, 'cat-file', '--batch', input=''.join(f"{blob}\n" for _, blob in revisions).encode())
+    texts = []
+    pos = 0
+    for name, _ in revisions:
+        header_end = out.index(b'\n', pos)
+        size = int(out[pos:header_end].split()[2])
+        start = header_end + 1
+        texts.append((name, out[start:start + size].decode('utf-8')))
+        pos = start + size + 1
+    return texts
+
+
+def backups(path, root='.'):
+    """``(name, text)`` for the ``path.backup*`` copies in the work tree."""
+    found = []
+    for copy in sorted(glob.glob(os.path.join(root, glob.escape(path) + '.backup*'))):
+        with open(copy, 'r') as f:
+            found.append((os.path.relpath(copy, root), f.read()))
+    return found
+
+
+def inputs(rules, root='.'):
+    """The corpus for ``rules``: one ``Case`` per distinct text."""
+    paths = list(dict.fromkeys([r.path for r in rules] + list(SOURCES)))
+    cases = []
+    seen = set()
+    for path in paths:
+        for name, text in history(path, root) + backups(path, root):
+            digest = content_hash(text)
+            if digest not in seen:
+                seen.add(digest)
+                cases.append(Case(name, text, digest))
+    return cases
+
+
+class CorpusEngine(Engine):
+    """Engine over in-memory texts: paths are case names."""
+
+    texts = {}
+
+    def read(self, path):
+        return self.texts[path]
+
+
+def _init_worker(rules, cache):
+    global _engine
+    _engine = CorpusEngine(rules, cache=cache)
+
+
+def _process(engine, items):
+    engine.texts = dict(items)
+    results = []
+    for name, _ in items:
+        try:
+            doc, res = engine.process(name, engine.rules)
+        except Exception as e:
+            res = FileResult(name, {}, False, 0.0, error=f"{type(e).__name__}: {e}")
+        results.append(res)
+    return results
+
+
+def _process_shard(items):
+    return _process(_engine, items)
+
+
+def compute(cases, rules, cache=None, jobs=None):
+    """``FileResult`` for each case, named after it."""
+    jobs = jobs or os.cpu_count() or 1
+    items = [(case.name, case.text) for case in cases]
+    if jobs <= 1 or len(items) <= 1:
+        return _process(CorpusEngine(rules, cache=cache), items)
+
+    shards = [[] for _ in range(min(jobs, len(items)))]
+    for i, item in enumerate(sorted(items, key=lambda item: len(item[1]), reverse=True)):
+        shards[i % len(shards)].append(item)
+    by_name = {}
+    with ProcessPoolExecutor(len(shards), initializer=_init_worker, initargs=(rules, cache)) as pool:
+        for results in pool.map(_process_shard, shards):
+            for res in results:
+                by_name[res.path] = res
+                if cache is not None:
+                    cache.update(res.cache_entries)
+    return [by_name[case.name] for case in cases]
+
+
+def _golden_path(digest):
+    return os.path.join(GOLDEN_DIR, digest + '.json')
+
+
+def load_golden(digest):
+    try:
+        with open(_golden_path(digest), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def snapshot(case, res):
+    """Golden record of ``res``, the rules' result on ``case``."""
+    data = {'name': case.name, 'input': case.digest}
+    if res.error:
+        data['error'] = res.error
+        return data
+    data['output'] = content_hash(res.text) if res.changed else case.digest
+    data['hits'] = res.hits
+    return data
+
+
+def save_golden(case, res, data):
+    """Write ``data`` as the snapshot of ``case``, with the edits that rebuild its output."""
+    # Imported here: only updates need it
+    from .mirror import edits
+    if res.changed and not res.error:
+        data = dict(data, edits=[list(edit) for edit in edits(case.text, res.text)])
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with open(_golden_path(case.digest), 'w') as f:
+        json.dump(data, f, indent=1)
+        f.write('\n')
+
+
+def golden_text(case, golden):
+    """The output ``golden`` records for ``case``."""
+    buffer = EditBuffer(case.text)
+    for start, end, text in golden.get('edits', ()):
+        buffer.replace(start, end, text)
+    return buffer.materialize()
+
+
+def _outcome(golden, data):
+    if golden is None:
+        return 'new'
+    same = golden.get('error') == data.get('error') and golden.get('output') == data.get('output')
+    return 'ok' if same else 'CHANGED'
+
+
+def explain(case, golden, res):
+    """Why ``res`` differs from ``golden``: the errors, per-rule edit counts and a diff."""
+    # Imported here: only mismatches need them
+    from .mirror import edits
+    from .patch import unified
+    lines = []
+    if golden.get('error') or res.error:
+        lines.append(f"    error: {golden.get('error')} -> {res.error}")
+    before = golden.get('hits', {})
+    for rule_id in dict.fromkeys(list(before) + list(res.hits)):
+        if before.get(rule_id) != res.hits.get(rule_id):
+            lines.append(f"    {rule_id}: {before.get(rule_id)} -> {res.hits.get(rule_id)} edits")
+    if not golden.get('error') and not res.error:
+        expected = golden_text(case, golden)
+        actual = res.text if res.changed else case.text
+        lines.append(unified(case.name, expected, edits(expected, actual)).rstrip('\n'))
+    return '\n'.join(lines)
+
+
+def check(rules, root='.', cache=None, jobs=None, update=False, out=None):
+    """Run the corpus; returns the number of cases that differ from their snapshot.
+
+    Cases with no snapshot yet are reported as new but do not count.
+    """
+    out = out or sys.stdout
+    cases = inputs(rules, root)
+    goldens = {case.name: load_golden(case.digest) for case in cases}
+
+    pending = []
+    outcomes = {}
+    for case in cases:
+        golden = goldens[case.name]
+        if cache is not None and golden is not None:
+            _, output, done = replay(cache, case.digest, rules)
+            if done == len(rules) and golden.get('output') == output:
+                outcomes[case.name] = 'ok (cached)'
+                continue
+        pending.append(case)
+
+    failed = 0
+    for case, res in zip(pending, compute(pending, rules, cache=cache, jobs=jobs)):
+        golden = goldens[case.name]
+        data = snapshot(case, res)
+        outcome = _outcome(golden, data)
+        outcomes[case.name] = outcome
+        if outcome == 'ok':
+            continue
+        if update:
+            save_golden(case, res, data)
+            outcomes[case.name] = f"{outcome}, updated"
+            continue
+        if outcome == 'new':
+            outcomes[case.name] = 'new (no snapshot; --update records it)'
+            continue
+        failed += 1
+        if outcome == 'CHANGED':
+            outcomes[case.name] += '\n' + explain(case, golden, res)
+
+    if update:
+        current = {_golden_path(case.digest) for case in cases}
+        for path in glob.glob(os.path.join(GOLDEN_DIR, '*.json')):
+            if path not in current:
+                os.remove(path)
+    if cache is not None:
+        cache.save()
+
+    for case in cases:
+        print(f"{case.name}: {outcomes[case.name]}", file=out)
+    cached = sum(1 for outcome in outcomes.values() if outcome == 'ok (cached)')
+    new = sum(1 for outcome in outcomes.values() if outcome.startswith('new ('))
+    print(f"{len(cases)} inputs, {cached} cached, {new} new, {failed} differing from their snapshot", file=out)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods.corpus')
+    parser.add_argument('-j', '--jobs', type=int, help='worker processes')
+    parser.add_argument('--update', action='store_true', help='record new and changed outputs as golden')
+    parser.add_argument('--no-cache', action='store_true', help='run every input again')
+    args = parser.parse_args(argv)
+
+    rules = load_plugins()
+    cache = None if args.no_cache else ResultCache(CORPUS_CACHE)
+    failed = check(rules, cache=cache, jobs=args.jobs, update=args.update)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
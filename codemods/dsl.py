@@ -0,0 +1,209 @@
+"""Declarative rules: anchor, structural selector, action.
+
+``define`` compiles a rule spec once into a ``Matcher`` and registers it like
+any ``@rule`` function::
+
+    define('components/SettingsViewWithMenu.tsx', 'add_data_source_title',
+           anchor="activeSection === 'permissions' && 'Permissions Manager'",
+           select='line', action='insert_after', text=title,
+           unless="activeSection === 'data-source' && 'Data Source'", count='first')
+
+Every rule is keyed on a literal anchor. Files without it are rejected by the
+engine's single anchor pass before any selector runs. An optional ``pattern``
+regex is only tried with ``re.match`` at anchor offsets (its literal prefix is
+the anchor), so it never scans or backtracks across the whole file.
+
+Selectors (``select``):
+    match       the anchor, or the pattern match
+    line        the full line(s) holding the match
+    element     the next JSX element starting at or after the match
+    expression  the ``{...}`` container the next element is rendered in
+    block       the balanced ``{...}``/``(...)``/``[...]`` opened at or after the match
+
+Actions (``action``): replace, remove, insert_before, insert_after, wrap
+(``text`` goes before and ``after`` after the selection). ``lines=True``
+widens the selection to whole lines first.
+"""
+import re
+import sys
+
+from .engine import Rule, RuleError, register
+
+SELECTORS = ('match', 'line', 'element', 'expression', 'block')
+ACTIONS = ('replace', 'remove', 'insert_before', 'insert_after', 'wrap')
+
+_REGEX_META = set('.^$*+?{}[]\\|()')
+_CLOSERS = {'(': ')', '[': ']', '{': '}'}
+
+
+def literal_prefix(pattern):
+    """Longest literal text every match of ``pattern`` starts with."""
+    # Any alternation could start with something else entirely
+    if re.search(r'(?<!\\)\|', pattern):
+        return ''
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            if nxt.isalnum():
+                break
+            out.append(nxt)
+            i += 2
+            continue
+        if c in _REGEX_META:
+            # A quantifier applies to the previous character, so drop it
+            if c in '*?{' and out:
+                out.pop()
+            break
+        out.append(c)
+        i += 1
+    return ''.join(out)
+
+
+def balanced_end(text, i):
+    """Offset just past the bracket group opened at ``text[i]``, skipping strings and comments."""
+    stack = [_CLOSERS[text[i]]]
+    n = len(text)
+    i += 1
+    while i < n and stack:
+        c = text[i]
+        if c in '"\'`':
+            end = i + 1
+            while end < n and text[end] != c:
+                end += 2 if text[end] == '\\' else 1
+            i = end + 1
+            continue
+        if text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if c in _CLOSERS:
+            stack.append(_CLOSERS[c])
+        elif c == stack[-1]:
+            stack.pop()
+        i += 1
+    if stack:
+        raise RuleError(f"unbalanced '{stack[0]}' group")
+    return i
+
+
+class Matcher:
+    """A compiled rule spec; call it with a Document like any rule function."""
+
+    def __init__(self, anchor=None, pattern=None, select='match', action='replace', text='',
+                 after='', unless=None, count='all', lines=False, required=False):
+        if select not in SELECTORS:
+            raise ValueError(f"unknown selector {select!r}; expected one of {SELECTORS}")
+        if action not in ACTIONS:
+            raise ValueError(f"unknown action {action!r}; expected one of {ACTIONS}")
+        if count not in ('all', 'first'):
+            raise ValueError(f"count must be 'all' or 'first', not {count!r}")
+        self.pattern = re.compile(pattern) if pattern else None
+        self.anchor = anchor or (literal_prefix(pattern) if pattern else '')
+        if not self.anchor:
+            raise ValueError('a rule needs a literal anchor or a pattern with a literal prefix')
+        if pattern and not literal_prefix(pattern).startswith(self.anchor):
+            raise ValueError(f"anchor {self.anchor!r} is not a prefix of every match of {pattern!r}")
+        self.select = select
+        self.action = action
+        self.text = text
+        self.after = after
+        self.unless = unless
+        self.count = count
+        self.lines = lines
+        self.required = required
+
+    @property
+    def anchors(self):
+        return tuple(a for a in (self.anchor, self.unless) if a)
+
+    @property
+    def spec(self):
+        """Everything the edits depend on, for ``engine.fingerprint``."""
+        return repr((self.anchor, self.pattern and self.pattern.pattern, self.select, self.action,
+                     self.text, self.after, self.unless, self.count, self.lines, self.required))
+
+    def matches(self, doc):
+        """``(start, end)`` spans of the anchor or pattern, left to right."""
+        if self.pattern is None:
+            offsets = doc.anchors.distinct(self.anchor)
+            return [(pos, pos + len(self.anchor)) for pos in offsets]
+        spans = []
+        end = 0
+        text = doc.text
+        for pos in doc.anchors.find(self.anchor):
+            if pos < end:
+                continue
+            m = self.pattern.match(text, pos)
+            if m:
+                spans.append(m.span())
+                end = m.end()
+        return spans
+
+    def selection(self, doc, start, end):
+        if self.select == 'line':
+            return doc.line_start(start), doc.line_end(max(start, end - 1))
+        if self.select in ('element', 'expression'):
+            el = doc.tree.next_element(start)
+            if el is None:
+                return None
+            if self.select == 'element':
+                return el.start, el.end
+            if el.expr is None:
+                return None
+            return el.expr.start, el.expr.end
+        if self.select == 'block':
+            text = doc.text
+            opener = min((i for i in (text.find(c, start) for c in _CLOSERS) if i >= 0), default=-1)
+            if opener < 0:
+                return None
+            return opener, balanced_end(text, opener)
+        return start, end
+
+    def edits(self, start, end):
+        action = self.action
+        if action == 'replace':
+            return [(start, end, self.text)]
+        if action == 'remove':
+            return [(start, end, '')]
+        if action == 'insert_before':
+            return [(start, start, self.text)]
+        if action == 'insert_after':
+            return [(end, end, self.text)]
+        return [(start, start, self.text), (end, end, self.after)]
+
+    def __call__(self, doc):
+        if self.unless and self.unless in doc.anchors:
+            return 0
+        spans = self.matches(doc)
+        if not spans:
+            if self.required:
+                raise RuleError(f"{doc.path}: anchor {self.anchor!r} not found")
+            return 0
+        if self.count == 'first':
+            spans = spans[:1]
+
+        edits = []
+        for start, end in spans:
+            selected = self.selection(doc, start, end)
+            if selected is None:
+                continue
+            start, end = selected
+            if self.lines:
+                start, end = doc.line_start(start), doc.line_end(max(start, end - 1))
+            edits.extend(self.edits(start, end))
+        return doc.splice(edits)
+
+
+def define(path, id, version=1, **spec):
+    """Compile ``spec`` into a ``Matcher`` and register it as rule ``id``."""
+    matcher = Matcher(**spec)
+    # Attribute the rule to the module that defined it
+    plugin = sys._getframe(1).f_globals.get('__name__')
+    return register(Rule(id, path, matcher, plugin=plugin, anchors=matcher.anchors, version=version))
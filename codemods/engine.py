@@ -0,0 +1,500 @@
+"""Single-pass codemod engine.
+
+Each rewrite script registers its rules as a plugin. The engine groups the
+rules by target file, reads every file once, runs all of its rules over one
+in-memory Document and writes the result back once.
+"""
+import importlib
+import importlib.util
+import os
+import re
+import sys
+import time
+
+from .anchors import content_hash, index as anchor_index, update as anchor_update
+from .buffer import EditBuffer, changed_span, compose
+from .cache import DEFAULT_DIR as CACHE_DIR, ResultCache, replay, rule_key
+from .jsx import parse, update as tree_update
+from .profiling import counters
+
+# Plugin scripts in the order they were originally chained by hand
+PLUGINS = [
+    'fix_settings_layout',
+    'add_conditional_rendering',
+    'remove_section_headers',
+    'clean_all_headers',
+    'insert_data_source',
+    'add_data_source_menu',
+    'add_data_source_title',
+]
+
+_registry = []
+
+
+class RuleError(Exception):
+    """A rule could not be applied to a file, e.g. a required anchor is missing."""
+
+
+class Rule:
+    """A named rewrite applied to one target file.
+
+    ``apply(doc)`` edits ``doc`` in place and returns the number of edits made.
+    ``anchors`` are the literal markers it looks up through ``doc.anchors``.
+    ``source`` is set by ``fingerprint`` to a digest of the code the rule
+    runs (and of a declared rule's spec); cached results are keyed by it and
+    ``version``, so editing the plugin or anything it imports never replays
+    the old output.
+    """
+
+    def __init__(self, id, path, apply, plugin=None, anchors=(), version=1):
+        self.id = id
+        self.path = path
+        self.apply = apply
+        self.plugin = plugin
+        self.anchors = tuple(anchors)
+        self.version = version
+        self.source = ''
+
+    def __repr__(self):
+        return f"Rule({self.id!r}, {self.path!r})"
+
+
+class Document:
+    """In-memory contents of one target file shared by every rule.
+
+    ``splice`` records edits in an ``EditBuffer`` against the text the rule
+    started from; ``line_start``/``line_end``/``indent`` answer in that same
+    coordinate space. Reading ``text`` or ``tree`` folds pending edits in.
+    The element tree and the anchor index are built once per file and moved
+    forward over the edits made since they were last read; ``index`` and
+    ``tree`` pass in ones already built for ``text``.
+    """
+
+    def __init__(self, path, text, anchors=(), index=None, tree=None):
+        self.path = path
+        self.original = text
+        self.buffer = EditBuffer(text)
+        self.patterns = tuple(anchors)
+        self._tree = tree
+        self._anchors = index
+        # Edits from the texts the tree and anchor index were built for to ``text``
+        self._tree_edits = []
+        self._anchors_edits = []
+        # Edits recorded through ``splice`` so far, for profiling
+        self.spliced = 0
+        # Every change so far as edits against ``original``, for previews
+        self.changes = []
+
+    def _moved(self, edits, old):
+        """Note that ``edits`` turned ``old``, the current text, into the next one."""
+        self.changes = compose(self.changes, edits, old)
+        if self._tree is not None:
+            self._tree_edits = compose(self._tree_edits, edits, old)
+        if self._anchors is not None:
+            self._anchors_edits = compose(self._anchors_edits, edits, old)
+
+    @property
+    def text(self):
+        buffer = self.buffer
+        if buffer.dirty:
+            self._moved(buffer.edits, buffer.base)
+        return buffer.commit()
+
+    @text.setter
+    def text(self, text):
+        if self.buffer.dirty:
+            raise ValueError(f"{self.path}: text replaced with spliced edits pending")
+        old = self.buffer.base
+        if text != old:
+            start, old_end, new_end = changed_span(old, text)
+            self._moved([(start, old_end, text[start:new_end])], old)
+        self.buffer = EditBuffer(text)
+
+    @property
+    def changed(self):
+        return self.text != self.original
+
+    @property
+    def tree(self):
+        """Element tree of the current text, reparsed only around edits."""
+        text = self.text
+        jsx = not self.path.endswith('.ts')
+        if self._tree is None:
+            self._tree = parse(text, jsx=jsx)
+            counters['parsed'] += len(text)
+        elif self._tree_edits:
+            self._tree = tree_update(self._tree, text, self._tree_edits, jsx=jsx)
+            self._tree_edits = []
+        return self._tree
+
+    @property
+    def anchors(self):
+        """``AnchorIndex`` of every registered marker in the current text."""
+        text = self.text
+        if self._anchors is None:
+            self._anchors = anchor_index(text, self.patterns)
+        elif self._anchors_edits:
+            self._anchors = anchor_update(self._anchors, text, self._anchors_edits, self.patterns)
+            self._anchors_edits = []
+        return self._anchors
+
+    def resident(self):
+        """``(anchor index, element tree)`` of the current text, None for either never built.
+
+        The tree is moved forward in place, so it no longer describes any
+        earlier text.
+        """
+        return (self.anchors if self._anchors is not None else None,
+                self.tree if self._tree is not None else None)
+
+    def line_start(self, offset):
+        return self.buffer.line_offset(self.buffer.base_line(offset))
+
+    def line_end(self, offset):
+        """Offset just past the newline ending the line that holds ``offset``."""
+        starts = self.buffer.line_starts()
+        line = self.buffer.base_line(offset)
+        return starts[line + 1] if line + 1 < len(starts) else len(self.buffer.base)
+
+    def line_number(self, offset):
+        """1-based line ``offset`` will be on once pending edits are applied."""
+        return self.buffer.line(offset) + 1
+
+    def indent(self, offset):
+        start = self.line_start(offset)
+        line = self.buffer.base[start:offset]
+        return line[:len(line) - len(line.lstrip())]
+
+    def splice(self, edits):
+        """Record ``(start, end, replacement)`` edits; returns the number recorded.
+
+        Edits at the same offset keep their order.
+        """
+        count = 0
+        for start, end, new in edits:
+            self.buffer.replace(start, end, new)
+            count += 1
+        self.spliced += count
+        return count
+
+    @property
+    def lines(self):
+        return self.text.splitlines(keepends=True)
+
+    @lines.setter
+    def lines(self, lines):
+        self.text = ''.join(lines)
+
+    def replace(self, old, new):
+        """Replace every occurrence of ``old`` and return how many there were."""
+        return self.splice((pos, pos + len(old), new) for pos in self.anchors.distinct(old))
+
+
+class FileResult:
+    def __init__(self, path, hits, changed, elapsed, error=None):
+        self.path = path
+        self.hits = hits
+        self.changed = changed
+        self.elapsed = elapsed
+        self.error = error
+        self.written = False
+        # New contents for changed files, the text the rules started from and,
+        # where known, the edits between the two
+        self.text = None
+        self.original = None
+        self.changes = None
+        # Rules answered from the result cache, and cache entries recorded
+        self.cached = 0
+        self.cache_entries = {}
+        # Profiling records made for this file
+        self.profile = []
+        # Leader path when the result was replayed from a mirrored copy
+        self.mirror = None
+
+    @property
+    def edits(self):
+        return sum(self.hits.values())
+
+
+def register(rule):
+    _registry.append(rule)
+    return rule
+
+
+def rule(path, id=None, anchors=(), version=1):
+    """Decorator registering ``fn(doc)`` as a rule for ``path``."""
+    def decorator(fn):
+        register(Rule(id or fn.__name__, path, fn, plugin=fn.__module__, anchors=anchors, version=version))
+        return fn
+    return decorator
+
+
+def registry():
+    return list(_registry)
+
+
+def _module_file(name):
+    module = sys.modules.get(name)
+    path = getattr(module, '__file__', None)
+    if module is None and name.partition('.')[0] in sys.modules:
+        # Imported lazily, e.g. inside a function: locate it without running it
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError, AttributeError):
+            spec = None
+        path = spec.origin if spec else None
+    return os.path.abspath(path) if path and path.endswith('.py') else None
+
+
+_IMPORT = re.compile(r'^[ \t]*(?:from[ \t]+(\.*)([\w.]*)[ \t]+import[ \t]+(\([^)]*\)|[^\n#;]*)'
+                     r'|import[ \t]+([^\n#;]*))', re.M)
+
+
+def _imported(text, package):
+    """Names of the modules ``text`` imports anywhere, resolved against ``package``."""
+    names = []
+    # A regex rather than ``ast``: stray matches in strings name no module and drop out
+    for m in _IMPORT.finditer(text):
+        dots, base, members, plain = m.groups()
+        if plain is not None:
+            names.extend(part.split()[0] for part in plain.split(',') if part.strip())
+            continue
+        if dots:
+            try:
+                base = importlib.util.resolve_name(dots + base, package)
+            except (ImportError, ValueError):
+                continue
+        names.append(base)
+        # ``from package import module`` imports a module too
+        names.extend(f"{base}.{part.split()[0]}" for part in members.strip('()').split(',') if part.strip())
+    return names
+
+
+def fingerprint(rules, root='.'):
+    """Set each rule's ``source`` to a digest of the code it runs.
+
+    That is its plugin module and every module under ``root`` the plugin
+    imports, directly or not: ``data_sources.py``, the ``codemods`` modules
+    and so on. Editing one of them therefore changes the cache keys of
+    exactly the rules that depend on it. A declared rule's ``spec`` is mixed
+    in as well, since a plugin may build it from data outside the code (the
+    sections manifest). Returns the paths that were read.
+    """
+    base = os.path.abspath(root) + os.sep
+    files = {}
+
+    def read(name):
+        path = _module_file(name)
+        if path is None or not path.startswith(base):
+            return None
+        if path not in files:
+            with open(path, 'r') as f:
+                text = f.read()
+            files[path] = (content_hash(text), set())
+            module = sys.modules.get(name)
+            package = getattr(module, '__package__', None)
+            if package is None:
+                package = name if path.endswith('__init__.py') else name.rpartition('.')[0]
+            files[path][1].update(p for p in map(read, _imported(text, package)) if p and p != path)
+        return path
+
+    sources = {}
+    for r in rules:
+        if r.plugin not in sources:
+            path = read(r.plugin) if r.plugin else None
+            seen = set()
+            stack = [path] if path else []
+            while stack:
+                p = stack.pop()
+                if p not in seen:
+                    seen.add(p)
+                    stack.extend(files[p][1])
+            sources[r.plugin] = content_hash(''.join(files[p][0] for p in sorted(seen))) if seen else ''
+        spec = getattr(r.apply, 'spec', '')
+        r.source = content_hash(sources[r.plugin] + spec) if spec else sources[r.plugin]
+    return sorted(files)
+
+
+def load_plugins(names=None):
+    for name in names or PLUGINS:
+        importlib.import_module(name)
+    rules = registry()
+    fingerprint(rules)
+    return rules
+
+
+class Engine:
+    def __init__(self, rules=None, root='.', cache=None, profiler=None, validate=True):
+        self.rules = registry() if rules is None else list(rules)
+        self.root = root
+        self.cache = cache
+        self.profiler = profiler
+        self.validate = validate
+        # One index of the markers of every rule in the run
+        self.anchors = tuple(sorted({a for r in self.rules for a in r.anchors}))
+
+    def targets(self):
+        """Group rules by target path, keeping registration order."""
+        grouped = {}
+        for r in self.rules:
+            grouped.setdefault(r.path, []).append(r)
+        return grouped
+
+    def read(self, path):
+        with open(os.path.join(self.root, path), 'r') as f:
+            return f.read()
+
+    def write(self, path, text, expect=None):
+        # Imported here so commands that never write start faster
+        from .transaction import Transaction
+        with Transaction(self.root) as txn:
+            txn.write(path, text, expect=expect)
+
+    def call(self, r, doc):
+        """Apply one rule, through the profiler when there is one."""
+        if self.profiler is None:
+            return r.apply(doc) or 0
+        return self.profiler.call(r, doc)
+
+    def apply(self, doc, rules):
+        hits = {}
+        for r in rules:
+            hits[r.id] = self.call(r, doc)
+        return hits
+
+    def apply_cached(self, doc, rules):
+        """Replay cached results where possible; run and record the rest.
+
+        Returns ``(hits, rules replayed, entries recorded)``.
+        """
+        cache = self.cache
+        digest = content_hash(doc.original)
+        hits, current, done = replay(cache, digest, rules)
+        if current != digest:
+            text = cache.load_blob(current)
+            if text is None:
+                # Blob missing: fall back to running everything
+                hits, current, done = {}, digest, 0
+            else:
+                doc.text = text
+
+        entries = {}
+        for r in rules[done:]:
+            hits[r.id] = self.call(r, doc)
+            output = content_hash(doc.text)
+            if output != current:
+                cache.store_blob(output, doc.text)
+            entries[f"{current}:{rule_key(r)}"] = [hits[r.id], output]
+            current = output
+
+        if done < len(rules) and current != digest:
+            # Run the rules once more over the result, so that running them
+            # over the rewritten file is a cache hit; a fixed point records
+            # [0, current] for every rule
+            again = Document(doc.path, doc.text, anchors=self.anchors)
+            for r in rules:
+                found = r.apply(again) or 0
+                output = content_hash(again.text)
+                if output != current:
+                    cache.store_blob(output, again.text)
+                entries.setdefault(f"{current}:{rule_key(r)}", [found, output])
+                current = output
+        cache.update(entries)
+        return hits, done, entries
+
+    def check(self, doc):
+        """Raise ``RuleError`` if the rules left ``doc`` structurally broken."""
+        if self.validate and doc.changed:
+            # Imported here so ``python3 -m codemods.validate`` runs cleanly
+            from .validate import check_document
+            problem = check_document(doc)
+            if problem is not None:
+                raise RuleError(f"rewrite breaks the file at {problem}")
+
+    def process(self, path, rules):
+        """Run ``rules`` over ``path`` without writing; returns ``(doc, FileResult)``.
+
+        Raises ``RuleError`` if the result does not balance (see ``check``).
+        """
+        profiler = self.profiler
+        mark = profiler.mark() if profiler is not None else None
+        start = time.perf_counter()
+        doc = Document(path, self.read(path), anchors=self.anchors)
+        if self.cache is None:
+            hits, cached, entries = self.apply(doc, rules), 0, {}
+        else:
+            hits, cached, entries = self.apply_cached(doc, rules)
+        self.check(doc)
+        res = FileResult(path, hits, doc.changed, time.perf_counter() - start)
+        if res.changed:
+            res.text = doc.text
+            res.original = doc.original
+            res.changes = doc.changes
+        res.cached = cached
+        res.cache_entries = entries
+        if profiler is not None:
+            profiler.file(res, mark)
+            res.profile = profiler.records[mark[1]:]
+        return doc, res
+
+    def run_file(self, path, rules, write=True):
+        doc, res = self.process(path, rules)
+        if write and res.changed:
+            self.write(path, doc.text, expect=content_hash(doc.original))
+            res.written = True
+        return res
+
+    def run(self, write=True):
+        """Run every target; changed files are written together, and only if none failed.
+
+        Files changed on disk during the run are rebased rather than
+        overwritten (see ``rebase``).
+        """
+        results = []
+        targets = self.targets()
+        for path, rules in targets.items():
+            try:
+                doc, res = self.process(path, rules)
+            except (OSError, RuleError) as e:
+                res = FileResult(path, {}, False, 0.0, error=str(e))
+            results.append(res)
+        if write and not any(res.error for res in results):
+            # rebase builds on this module
+            from .rebase import publish
+            results = publish(self, results, targets.get)
+        if self.cache is not None:
+            self.cache.save()
+        return results
+
+
+def report(results, out=None):
+    out = out or sys.stdout
+    if any(res.error for res in results) and any(res.changed for res in results):
+        print("nothing written: every file must succeed before any write", file=out)
+    for res in results:
+        if res.error:
+            print(f"{res.path}: FAILED ({res.error})", file=out)
+            continue
+        status = 'unchanged'
+        if res.changed:
+            status = 'modified' if res.written else 'would modify'
+        cached = ' (cached)' if res.cached and res.cached == len(res.hits) else ''
+        print(f"{res.path}: {status}, {res.edits} edits, {res.elapsed * 1000:.1f} ms{cached}", file=out)
+        for rule_id, count in res.hits.items():
+            print(f"    {rule_id}: {count}", file=out)
+
+
+def open_cache(root='.'):
+    return ResultCache(os.path.join(root, CACHE_DIR))
+
+
+def run(plugin=None, root='.', write=True, cache=True, profiler=None):
+    """Run the rules of one plugin module, or of every plugin when omitted."""
+    rules = registry() if plugin else load_plugins()
+    if plugin:
+        rules = [r for r in rules if r.plugin == plugin]
+        fingerprint(rules, root)
+    engine = Engine(rules, root=root, cache=open_cache(root) if cache else None, profiler=profiler)
+    results = engine.run(write=write)
+    report(results)
+    return results
@@ -0,0 +1,439 @@
+"""Seeded DFP datasets shaped like ``mockData.ts``, at any size.
+
+``generateDataSet`` in ``mockData.ts`` builds a few dozen trainees and
+their history. ``generate`` builds the same shapes from a seed for hundreds
+to hundreds of thousands of trainees:
+
+- ``Instructor`` and ``Trainee`` records with the fields, ranks, services,
+  flights and contact details ``mockData.ts`` gives them
+- a ``Course`` per 25 trainees, counting the services on it
+- a ``ScheduleEvent`` history of several weeks, in which each trainee works
+  through the flying and FTD items of the syllabus in order, repeating some.
+  A trainee often has more than one event on a day, so the ELCE lookup
+  (``getEffectiveLastCompletedEvent`` in ``buildAlgorithmV2.ts``) has to
+  choose between them.
+
+Names, syllabus codes and durations are read from ``mockData.ts``.
+Attributes are sampled a batch at a time, with numpy when it is installed
+and with ``random`` otherwise. The two give different, equally reproducible
+datasets for a seed. Ids and names are not sampled: each is a bijection of
+the record's number, so they are unique without any set of used values.
+Records are written as they are made, as JSON lines or as TypeScript
+modules typed from ``types.ts``, so memory does not grow with the dataset:
+
+    python3 -m codemods.fixtures --trainees 100000 --weeks 12 --format ts
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+import uuid
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SOURCE = 'mockData.ts'
+TYPES = 'types.ts'
+DEFAULT_DIR = 'fixtures'
+DEFAULT_START = '2025-07-07'
+FORMATS = ('jsonl', 'ts')
+KINDS = ('instructors', 'trainees', 'events', 'courses')
+# Records sampled per batch
+BATCH = 4096
+COURSE_SIZE = 25
+# Weeks a course runs; progress through the syllabus is spread over them
+COURSE_WEEKS = 30
+
+LOCATIONS = {'ESL': ('East Sale', ('1FTS', 'CFS')), 'PEA': ('Pearce', ('2FTS',))}
+FLIGHTS = ('A', 'B', 'C', 'D')
+SERVICES = ('RAAF', 'RAN', 'ARA')
+TRAINEE_RANKS = {'RAAF': ('PLTOFF', 'OCDT'), 'RAN': ('MIDN', 'SBLT'), 'ARA': ('2LT',)}
+INSTRUCTOR_RANKS = ('SQNLDR', 'FLTLT', 'FLGOFF', 'Mr')
+CATEGORIES = ('UnCat', 'D', 'C', 'B', 'A')
+COLORS = ('bg-sky-400/50', 'bg-purple-400/50', 'bg-yellow-400/50', 'bg-pink-400/50',
+          'bg-teal-400/50', 'bg-indigo-400/50', 'bg-cyan-400/50')
+SOLO = ('BGF11', 'BGF18')
+
+# Ids step through their space by a stride coprime with its size
+_ID_BASE, _ID_SPACE, _ID_STRIDE = 1000000, 9000000, 7654321
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+_ITEM = re.compile(r"createSyllabusItem\(\s*'([^']+)'")
+_NAMES = re.compile(r"const\s+(firstNames|lastNames)\s*=\s*\[([^\]]*)\]")
+
+
+class Source:
+    """Names and the flying and FTD syllabus items ``mockData.ts`` declares."""
+
+    def __init__(self, text):
+        lists = {name: re.findall(r"'([^']*)'", body) for name, body in _NAMES.findall(text)}
+        self.first = lists.get('firstNames', [])
+        self.last = lists.get('lastNames', [])
+        # ``(code, type, duration)`` in syllabus order, as ``createSyllabusItem`` types them
+        self.items = []
+        seen = set()
+        for code in _ITEM.findall(text):
+            code = code.replace('*', '')
+            if code in seen or any(mark in code for mark in ('CPT', 'MB', 'TUT', 'QUIZ', 'Lec')):
+                continue
+            seen.add(code)
+            if 'FTD' in code:
+                self.items.append((code, 'ftd', 1.5))
+            else:
+                self.items.append((code, 'flight', 1.0 if code.startswith('BNF') else 1.5))
+        if not self.first or not self.last or not self.items:
+            raise ValueError(f"{SOURCE} declares no names or no flying syllabus items")
+
+    @classmethod
+    def load(cls, root='.'):
+        with open(os.path.join(root, SOURCE), 'r') as f:
+            return cls(f.read())
+
+
+class Sampler:
+    """Batched draws from one seeded stream: numpy's generator, or ``random.Random``.
+
+    Every draw returns a list, so callers do not depend on the backend.
+    """
+
+    def __init__(self, seed, stream, use_numpy=True):
+        self.numpy = numpy is not None and use_numpy
+        if self.numpy:
+            self._rng = numpy.random.default_rng([seed, stream])
+        else:
+            # Imported here: only the fallback needs it
+            import random
+            self._rng = random.Random(f"{seed}:{stream}")
+
+    def integers(self, low, high, size):
+        """``size`` integers in ``[low, high)``."""
+        if self.numpy:
+            return self._rng.integers(low, high, size).tolist()
+        # Scaled floats: ``randrange`` per draw costs several times as much
+        draw, span = self._rng.random, high - low
+        return [low + int(draw() * span) for _ in range(size)]
+
+    def random(self, size):
+        if self.numpy:
+            return self._rng.random(size).tolist()
+        draw = self._rng.random
+        return [draw() for _ in range(size)]
+
+    def choice(self, options, size, p=None):
+        if self.numpy:
+            return [options[i] for i in self._rng.choice(len(options), size, p=p).tolist()]
+        return self._rng.choices(options, weights=p, k=size)
+
+
+class Dataset:
+    """A seeded dataset of ``trainees`` trainees and their instructors and history."""
+
+    def __init__(self, source, trainees, instructors=None, weeks=8, seed=0,
+                 location='ESL', start=DEFAULT_START, use_numpy=True):
+        self.source = source
+        self.trainees = trainees
+        self.instructors = instructors or max(8, trainees // 2)
+        if self.trainees + self.instructors > _ID_SPACE:
+            raise ValueError(f"at most {_ID_SPACE} people have distinct 7-digit ids")
+        self.weeks = weeks
+        self.seed = seed
+        self.location = location
+        self.place, self.units = LOCATIONS[location]
+        day = datetime.date.fromisoformat(start)
+        # Events fall on the first five days of each week: start on a Monday
+        self.start = day - datetime.timedelta(days=day.weekday())
+        self.use_numpy = use_numpy
+        offsets = self.sampler('offsets').integers(0, _ID_SPACE, 2)
+        self._id_offset = offsets[0]
+        pairs = len(source.first) * len(source.last)
+        self._name_offset = offsets[1] % pairs
+        self._name_stride = next(k for k in range(997, 997 + pairs) if math.gcd(k, pairs) == 1)
+
+    def sampler(self, kind):
+        stream = ('offsets',) + KINDS
+        return Sampler(self.seed, stream.index(kind), self.use_numpy)
+
+    @property
+    def backend(self):
+        return 'numpy' if numpy is not None and self.use_numpy else 'random'
+
+    def id_number(self, person):
+        """7-digit id of person ``person``: instructors first, then trainees."""
+        return _ID_BASE + (person * _ID_STRIDE + self._id_offset) % _ID_SPACE
+
+    def name(self, person):
+        """``'Last, First'``; past every pair of names a round number follows the first name."""
+        first, last = self.source.first, self.source.last
+        pairs = len(first) * len(last)
+        k = (person * self._name_stride + self._name_offset) % pairs
+        lap = person // pairs
+        given = first[k % len(first)] + (f" {lap + 1}" if lap else '')
+        return f"{last[k // len(first)]}, {given}"
+
+    def _contact(self, name, phone):
+        family, given = name.split(', ')
+        return f"04{phone}", f"{given}.{family}@flightschool.mil".lower().replace(' ', '')
+
+    def instructor_batches(self):
+        """Lists of ``Instructor`` records, ``BATCH`` at a time."""
+        sampler = self.sampler('instructors')
+        for lo in range(0, self.instructors, BATCH):
+            n = min(BATCH, self.instructors - lo)
+            ranks = sampler.choice(INSTRUCTOR_RANKS, n, p=(0.1, 0.6, 0.15, 0.15))
+            categories = sampler.choice(CATEGORIES, n)
+            services = sampler.choice(SERVICES, n, p=(0.9, 0.05, 0.05))
+            units = sampler.choice(self.units, n, p=(0.8, 0.2) if len(self.units) == 2 else None)
+            flights = sampler.choice(FLIGHTS, n)
+            phones = sampler.integers(10000000, 100000000, n)
+            draws = sampler.random(2 * n)
+            batch = []
+            for i in range(n):
+                person = lo + i
+                name = self.name(person)
+                # The first instructor commands the unit, as in ``generateInstructors``
+                rank = 'WGCDR' if person == 0 else ranks[i]
+                qfi = rank != 'Mr'
+                executive = rank in ('WGCDR', 'SQNLDR')
+                category = 'A' if executive else categories[i] if qfi else 'UnCat'
+                phone, email = self._contact(name, phones[i])
+                batch.append({
+                    'idNumber': self.id_number(person),
+                    'name': name,
+                    'rank': rank,
+                    'role': 'QFI' if qfi else 'SIM IP',
+                    'callsignNumber': 10 + person if qfi else 0,
+                    'service': services[i],
+                    'category': category,
+                    'isTestingOfficer': category in ('A', 'B') and draws[2 * i] < 0.5,
+                    'seatConfig': 'Normal',
+                    'isExecutive': executive,
+                    'isFlyingSupervisor': category in ('A', 'B', 'C'),
+                    'isIRE': qfi and draws[2 * i + 1] < 0.2,
+                    'isCommandingOfficer': person == 0,
+                    'location': self.place,
+                    'unit': units[i],
+                    'flight': 'EXEC' if person == 0 else flights[i],
+                    'phoneNumber': phone,
+                    'email': email,
+                    'unavailability': [],
+                    'permissions': ['Staff', 'Course Supervisor', 'Admin'] if executive else ['Staff'],
+                })
+            yield batch
+
+    def course(self, index, counts):
+        """``Course`` record of course ``index``, whose trainees' services are ``counts``."""
+        # Courses start a week apart, so the history catches each at a different stage
+        start = self.start - datetime.timedelta(weeks=index % COURSE_WEEKS)
+        return {
+            'name': self.course_name(index),
+            'color': COLORS[index % len(COLORS)],
+            'startDate': start.isoformat(),
+            'gradDate': (start + datetime.timedelta(weeks=COURSE_WEEKS)).isoformat(),
+            'raafStart': counts.get('RAAF', 0),
+            'navyStart': counts.get('RAN', 0),
+            'armyStart': counts.get('ARA', 0),
+        }
+
+    def course_name(self, index):
+        return f"CSE {301 + index}"
+
+    def trainee_batches(self):
+        """Lists of ``Trainee`` records, ``BATCH`` at a time, in course order."""
+        sampler = self.sampler('trainees')
+        for lo in range(0, self.trainees, BATCH):
+            n = min(BATCH, self.trainees - lo)
+            services = sampler.choice(SERVICES, n, p=(0.8, 0.12, 0.08))
+            picks = sampler.random(n)
+            flights = sampler.choice(FLIGHTS, n)
+            paused = sampler.random(n)
+            phones = sampler.integers(10000000, 100000000, n)
+            primary = sampler.integers(0, self.instructors, n)
+            batch = []
+            for i in range(n):
+                person = self.instructors + lo + i
+                name = self.name(person)
+                course = self.course_name((lo + i) // COURSE_SIZE)
+                ranks = TRAINEE_RANKS[services[i]]
+                phone, email = self._contact(name, phones[i])
+                batch.append({
+                    'idNumber': self.id_number(person),
+                    'fullName': f"{name} – {course}",
+                    'name': name,
+                    'rank': ranks[int(picks[i] * len(ranks))],
+                    'course': course,
+                    'seatConfig': 'Normal',
+                    'isPaused': paused[i] < 0.05,
+                    'unit': self.units[0],
+                    'flight': flights[i],
+                    'service': services[i],
+                    'location': self.place,
+                    'phoneNumber': phone,
+                    'email': email,
+                    'primaryInstructor': self.name(primary[i]),
+                    'unavailability': [],
+                    'permissions': ['Trainee'],
+                })
+            yield batch
+
+    def events(self, trainees, sampler, first):
+        """``ScheduleEvent`` history of one batch of ``trainees``, the first being trainee ``first``.
+
+        Each week a trainee has up to three events on weekdays, in date and
+        time order, taking the syllabus items in order from where their
+        course had got to; one in ten repeats the item before it.
+        """
+        items = self.source.items
+        weeks = self.weeks
+        per_week = sampler.integers(0, 4, len(trainees) * weeks)
+        total = sum(per_week)
+        days = sampler.integers(0, 5, total)
+        times = sampler.integers(8, 21, total)
+        repeats = sampler.random(total)
+        own = sampler.random(total)
+        others = sampler.integers(0, self.instructors, total)
+        resources = sampler.integers(1, 21, total)
+        dates = [(self.start + datetime.timedelta(days=day)).isoformat() for day in range(7 * weeks)]
+        out = []
+        e = 0
+        for t, trainee in enumerate(trainees):
+            counts = per_week[t * weeks:(t + 1) * weeks]
+            if trainee['isPaused']:
+                # Paused trainees have no history, as in ``generateHistoricalEvents``
+                e += sum(counts)
+                continue
+            course = (first + t) // COURSE_SIZE
+            following = (course % COURSE_WEEKS) * len(items) // COURSE_WEEKS
+            done = None
+            for week, count in enumerate(counts):
+                slots = sorted(zip(days[e:e + count], times[e:e + count]))
+                for day, hour in slots:
+                    if done is None or repeats[e] >= 0.1:
+                        done, following = following, following + 1
+                    if done >= len(items):
+                        e += 1
+                        continue
+                    code, kind, duration = items[done]
+                    flight = kind == 'flight'
+                    out.append({
+                        'id': self._event_id(first + t, e),
+                        'date': dates[7 * week + day],
+                        'type': kind,
+                        'instructor': trainee['primaryInstructor'] if own[e] < 0.6 else self.name(others[e]),
+                        'student': trainee['fullName'],
+                        'flightNumber': code,
+                        'duration': duration,
+                        'startTime': hour,
+                        'resourceId': f"PC-21 {resources[e]}" if flight else f"FTD {(resources[e] - 1) % 5 + 1}",
+                        'color': 'bg-gray-500',
+                        'flightType': 'Solo' if code in SOLO else 'Dual',
+                        'locationType': 'Local',
+                        'origin': self.location,
+                        'destination': self.location,
+                    })
+                    e += 1
+        return out
+
+    def _event_id(self, trainee, n):
+        digest = hashlib.blake2b(f"{self.seed}:{trainee}:{n}".encode(), digest_size=16).digest()
+        return str(uuid.UUID(bytes=digest, version=4))
+
+
+class _Output:
+    """One record file: JSON lines, or a TypeScript module exporting an array."""
+
+    def __init__(self, directory, kind, fmt, type_name, types):
+        self.path = os.path.join(directory, f"{kind}.{fmt}")
+        self.fmt = fmt
+        self.count = 0
+        self._f = open(self.path, 'w', encoding='utf-8')
+        if fmt == 'ts':
+            self._f.write(f"import type {{ {type_name} }} from '{types}';\n\n"
+                          f"export const {kind}: {type_name}[] = [\n")
+
+    def write(self, records):
+        if self.fmt == 'ts':
+            self._f.writelines(f"  {_encode(r)},\n" for r in records)
+        else:
+            self._f.writelines(_encode(r) + '\n' for r in records)
+        self.count += len(records)
+
+    def close(self):
+        if self.fmt == 'ts':
+            self._f.write('];\n')
+        self._f.close()
+
+
+def _types_import(directory, root):
+    path = os.path.relpath(os.path.join(root, os.path.splitext(TYPES)[0]), directory).replace(os.sep, '/')
+    return path if path.startswith('.') else f"./{path}"
+
+
+def generate(dataset, directory=DEFAULT_DIR, fmt='jsonl', root='.'):
+    """Write ``dataset`` to ``directory``, one file per kind; returns the record counts."""
+    os.makedirs(directory, exist_ok=True)
+    types = _types_import(directory, root)
+    names = {'instructors': 'Instructor', 'trainees': 'Trainee', 'events': 'ScheduleEvent', 'courses': 'Course'}
+    outputs = {kind: _Output(directory, kind, fmt, names[kind], types) for kind in KINDS}
+    try:
+        for batch in dataset.instructor_batches():
+            outputs['instructors'].write(batch)
+
+        # Course totals are known once their trainees are; one dict per course
+        courses = {}
+        sampler = dataset.sampler('events')
+        first = 0
+        for batch in dataset.trainee_batches():
+            outputs['trainees'].write(batch)
+            outputs['events'].write(dataset.events(batch, sampler, first))
+            for t, trainee in enumerate(batch):
+                counts = courses.setdefault((first + t) // COURSE_SIZE, {})
+                counts[trainee['service']] = counts.get(trainee['service'], 0) + 1
+            first += len(batch)
+        outputs['courses'].write([dataset.course(index, counts) for index, counts in courses.items()])
+    finally:
+        for output in outputs.values():
+            output.close()
+
+    if fmt == 'ts':
+        with open(os.path.join(directory, 'index.ts'), 'w') as f:
+            f.writelines(f"export {{ {kind} }} from './{kind}';\n" for kind in KINDS)
+    return {kind: output.count for kind, output in outputs.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods.fixtures')
+    parser.add_argument('-o', '--output', default=DEFAULT_DIR, help=f'directory to write (default {DEFAULT_DIR})')
+    parser.add_argument('--trainees', type=int, default=1000, help='trainees (default 1000)')
+    parser.add_argument('--instructors', type=int, help='instructors (default half the trainees, at least 8)')
+    parser.add_argument('--weeks', type=int, default=8, help='weeks of event history (default 8)')
+    parser.add_argument('--start', default=DEFAULT_START,
+                        help=f'a day in the first week of history, which starts on its Monday (default {DEFAULT_START})')
+    parser.add_argument('--location', choices=sorted(LOCATIONS), default='ESL')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=FORMATS, default='jsonl')
+    parser.add_argument('--no-numpy', action='store_true',
+                        help='sample with the random module even if numpy is installed (a different dataset)')
+    args = parser.parse_args(argv)
+
+    try:
+        dataset = Dataset(Source.load(), args.trainees, args.instructors, args.weeks, args.seed,
+                          args.location, args.start, use_numpy=not args.no_numpy)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    begin = time.perf_counter()
+    counts = generate(dataset, args.output, args.format)
+    print(', '.join(f"{count} {kind}" for kind, count in counts.items())
+          + f" in {args.output}/ ({dataset.backend}, seed {args.seed}, {time.perf_counter() - begin:.1f}s)",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""What a run's rewrites add to each Settings section.
+
+For every file a run changed, ``report`` splits the changed lines by the
+section they fall in (``codemods.sections``: a body in ``SettingsView.tsx``,
+a ``menuItems`` entry in ``SettingsViewWithMenu.tsx``; everything else is
+``(rest of file)``). For each section touched it records:
+
+- lines and bytes added and removed
+- synchronous ``localStorage`` and ``console.log`` calls on render paths,
+  before and after; calls inside event handlers (``on*={...}``), effect and
+  callback hooks, timers and named helper functions are not on a render path
+- the deepest JSX nesting in the section, before and after
+
+``python3 -m codemods apply --impact`` prints the report and appends it to
+``impact_results.jsonl``, so bloat from rewrites can be followed across runs:
+
+    python3 -m codemods.impact --section data-source
+"""
+import argparse
+import bisect
+import json
+import re
+import sys
+import time
+from collections import Counter
+
+from .dsl import balanced_end
+from .engine import RuleError
+from .jsx import parse
+from .patch import changes
+from .sections import MENU, VIEW, extract
+
+DEFAULT_OUTPUT = 'impact_results.jsonl'
+REST = '(rest of file)'
+KINDS = ('localStorage', 'console.log')
+
+_CALL = re.compile(r"\b(?:(localStorage)\s*\.\s*(?:getItem|setItem|removeItem|clear)|console\s*\.\s*log)\s*\(")
+# Code that runs later than the render it is defined in
+_DEFERRED_CALL = re.compile(r"\b(?:useEffect|useLayoutEffect|useCallback|setTimeout|setInterval"
+                            r"|addEventListener|requestAnimationFrame)\s*\(")
+_HELPER = re.compile(r"\b(?:const|let|var)\s+[a-z_$][\w$]*\s*=\s*(?:async\s*)?"
+                     r"(?:\([^()]*\)|[\w$]+)\s*(?::\s*[^=;{}]+)?=>\s*\{"
+                     r"|\bfunction\s+[a-z_$][\w$]*\s*\([^()]*\)\s*(?::\s*[^{;]+)?\{")
+
+
+def section_spans(path, text):
+    """Sorted ``(start, end, id)`` of the sections ``text`` holds as ``path``."""
+    if path not in (VIEW, MENU):
+        return []
+    spans = []
+    for s in extract({path: text}):
+        place = s.body if path == VIEW else s.menu
+        if place is not None:
+            spans.append((place['start'], place['end'], s.id))
+    return sorted(spans)
+
+
+def _find(spans, start, end):
+    """Id of the span in ``spans`` that overlaps ``start:end`` most (holds ``start`` if empty)."""
+    if start == end:
+        i = bisect.bisect_right(spans, (start, float('inf'))) - 1
+        if i >= 0 and spans[i][0] <= start < spans[i][1]:
+            return spans[i][2]
+        return None
+    best, most = None, 0
+    for lo, hi, id in spans:
+        if lo >= end:
+            break
+        overlap = min(hi, end) - max(lo, start)
+        if overlap > most:
+            best, most = id, overlap
+    return best
+
+
+def _merged(spans):
+    out = []
+    for start, end in sorted(spans):
+        if out and start <= out[-1][1]:
+            out[-1][1] = max(out[-1][1], end)
+        else:
+            out.append([start, end])
+    return out
+
+
+class Shape:
+    """Render-path calls and JSX depth of one text, queried by span."""
+
+    def __init__(self, text, path):
+        self.text = text
+        tree = parse(text, jsx=not path.endswith('.ts'))
+        skipped = [(c.start, c.end) for c in tree.comments]
+        for el in tree.elements:
+            for name, attr in el.attrs.items():
+                if name[:2] == 'on' and name[2:3].isupper():
+                    skipped.append((attr.start, attr.end))
+        for m in _DEFERRED_CALL.finditer(text):
+            skipped.append(self._group(m.end() - 1))
+        for m in _HELPER.finditer(text):
+            skipped.append(self._group(m.end() - 1))
+        skipped = _merged(s for s in skipped if s is not None)
+        self._skip_starts = [s[0] for s in skipped]
+        self._skip = skipped
+
+        self.calls = []
+        for m in _CALL.finditer(text):
+            if not self._skipped(m.start()):
+                self.calls.append((m.start(), 'localStorage' if m.group(1) else 'console.log'))
+        depths = {}
+        self.depths = []
+        for el in tree.elements:
+            depth = depths[el] = depths.get(el.parent, 0) + 1
+            self.depths.append((el.start, depth))
+
+    def _group(self, i):
+        try:
+            return i, balanced_end(self.text, i)
+        except RuleError:
+            return None
+
+    def _skipped(self, offset):
+        i = bisect.bisect_right(self._skip_starts, offset) - 1
+        return i >= 0 and offset < self._skip[i][1]
+
+    def count(self, start=0, end=None):
+        end = len(self.text) if end is None else end
+        return Counter(kind for pos, kind in self.calls if start <= pos < end)
+
+    def depth(self, start=0, end=None):
+        end = len(self.text) if end is None else end
+        return max((d for pos, d in self.depths if start <= pos < end), default=0)
+
+
+def file_impact(path, old, new, edits):
+    """Impact of ``edits`` (turning ``old`` into ``new``) on each section of ``path``."""
+    before, after = section_spans(path, old), section_spans(path, new)
+    touched = {}
+    delta = 0
+    for line, start, end, removed, added in changes(old, edits):
+        size = sum(map(len, added))
+        id = _find(after, start + delta, start + delta + size) or _find(before, start, end) or REST
+        delta += size - (end - start)
+        entry = touched.setdefault(id, {'section': id, 'lines_added': 0, 'lines_removed': 0,
+                                        'bytes_added': 0, 'bytes_removed': 0})
+        entry['lines_added'] += len(added)
+        entry['lines_removed'] += len(removed)
+        entry['bytes_added'] += sum(len(piece.encode('utf-8')) for piece in added)
+        entry['bytes_removed'] += sum(len(piece.encode('utf-8')) for piece in removed)
+    if not touched:
+        return []
+
+    shapes = Shape(old, path), Shape(new, path)
+    for id, entry in touched.items():
+        counts = []
+        depths = []
+        for shape, spans in zip(shapes, (before, after)):
+            found = [(start, end) for start, end, sid in spans if sid == id]
+            if id == REST:
+                count = shape.count()
+                for start, end, _ in spans:
+                    count -= shape.count(start, end)
+                depth = shape.depth()
+            elif found:
+                count, depth = shape.count(*found[0]), shape.depth(*found[0])
+            else:
+                count, depth = Counter(), 0
+            counts.append(count)
+            depths.append(depth)
+        entry['render_calls'] = {kind: [counts[0][kind], counts[1][kind]] for kind in KINDS}
+        entry['depth'] = depths
+    return list(touched.values())
+
+
+def report(results):
+    """Impact record of a run's ``FileResult``s; files without their texts are left out."""
+    # Imported here: only results without recorded edits need it
+    from .mirror import edits as chunk_edits
+    files = []
+    for res in results:
+        if not res.changed or res.error or res.text is None:
+            continue
+        found = res.changes if res.changes is not None else chunk_edits(res.original, res.text)
+        sections = file_impact(res.path, res.original, res.text, found)
+        if sections:
+            files.append({'path': res.path, 'sections': sections})
+    hit = sorted({id for res in results for id, count in res.hits.items() if count})
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'rules': hit, 'files': files}
+
+
+def describe(entry):
+    parts = [f"+{entry['lines_added']} -{entry['lines_removed']} lines",
+             f"+{entry['bytes_added']} -{entry['bytes_removed']} bytes"]
+    for kind, (before, after) in entry['render_calls'].items():
+        if after != before:
+            parts.append(f"{kind} {after - before:+d} in render ({before} -> {after})")
+    before, after = entry['depth']
+    if after != before:
+        parts.append(f"depth {before} -> {after}")
+    return ', '.join(parts)
+
+
+def write(record, out=None, path=DEFAULT_OUTPUT):
+    """Print ``record`` and append it to ``path``."""
+    out = out or sys.stdout
+    for f in record['files']:
+        print(f"impact: {f['path']}", file=out)
+        for entry in f['sections']:
+            print(f"    {entry['section']}: {describe(entry)}", file=out)
+    if record['files']:
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def history(path=DEFAULT_OUTPUT):
+    try:
+        with open(path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods.impact')
+    parser.add_argument('--section', help='only this section id')
+    parser.add_argument('--last', type=int, default=20, metavar='N', help='runs to show (default 20)')
+    parser.add_argument('--input', default=DEFAULT_OUTPUT, help='JSON lines file written by --impact runs')
+    args = parser.parse_args(argv)
+
+    for record in history(args.input)[-args.last:]:
+        for f in record['files']:
+            for entry in f['sections']:
+                if args.section and entry['section'] != args.section:
+                    continue
+                print(f"{record['time']}  {f['path']}  {entry['section']}: {describe(entry)}")
+
+
+if __name__ == '__main__':
+    main()
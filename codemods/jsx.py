@@ -0,0 +1,735 @@
+"""Linear-time JSX/TSX tokenizer and element index.
+
+``parse(text)`` walks the source once and builds a tree of JSX elements with
+their offsets into ``text``. The resulting ``ElementTree`` answers "where does
+this element close" and "which elements use className X" with dictionary
+lookups, and "what encloses this offset" with a bisect, so rules never have to
+rescan the file counting ``<div`` and ``</div>`` substrings.
+
+``update(tree, text, edits)`` moves a tree forward over edits, reparsing only
+the children of the elements they fall in.
+
+Offsets are indices into the decoded text, not raw bytes.
+"""
+import bisect
+
+from .profiling import counters
+
+_IDENT_START = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_$')
+_IDENT = _IDENT_START | set('0123456789')
+_NAME = _IDENT | set('.-:')
+_SPACE = set(' \t\r\n')
+_CLOSERS = {'(': ')', '[': ']', '{': '}'}
+
+# Keywords after which "<" starts JSX and "/" starts a regex literal
+_EXPR_KEYWORDS = {'return', 'yield', 'await', 'case', 'default', 'else', 'do', 'typeof', 'void', 'in', 'of'}
+
+
+class Element:
+    """One JSX element (or fragment, when ``name`` is empty)."""
+
+    __slots__ = ('name', 'start', 'open_end', 'close_start', 'end', 'attrs',
+                 'parent', 'children', 'self_closing', 'expr')
+
+    def __init__(self, name, start, parent):
+        self.name = name
+        self.start = start
+        self.open_end = None
+        self.close_start = None
+        self.end = None
+        self.attrs = {}
+        self.parent = parent
+        self.children = []
+        self.self_closing = False
+        # Innermost {...} expression container the element sits in, if any
+        self.expr = None
+
+    @property
+    def class_name(self):
+        attr = self.attrs.get('className')
+        return attr.static if attr else ''
+
+    @property
+    def classes(self):
+        return self.class_name.split()
+
+    def contains(self, offset):
+        return self.start <= offset < (self.end if self.end is not None else self.start + 1)
+
+    def __repr__(self):
+        return f"<{self.name} {self.start}:{self.end}>"
+
+
+class Attribute:
+    """A JSX attribute; ``start``/``end`` span the value including quotes or braces."""
+
+    __slots__ = ('name', 'start', 'end', 'static', 'dynamic')
+
+    def __init__(self, name, start, end, static, dynamic):
+        self.name = name
+        self.start = start
+        self.end = end
+        # Literal text of the value; for {`...`} only the template's literal chunks
+        self.static = static
+        self.dynamic = dynamic
+
+
+class Expression:
+    """A ``{...}`` expression container inside JSX children or attributes."""
+
+    __slots__ = ('start', 'end', 'parent', 'outer')
+
+    def __init__(self, start, parent, outer):
+        self.start = start
+        self.end = None
+        self.parent = parent
+        # Enclosing expression container, if any
+        self.outer = outer
+
+    def __repr__(self):
+        return f"Expression({self.start}:{self.end})"
+
+
+class Comment:
+    __slots__ = ('start', 'end', 'text')
+
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self):
+        return f"Comment({self.start}:{self.end}, {self.text!r})"
+
+
+class ElementTree:
+    def __init__(self, text):
+        self.text = text
+        self.roots = []
+        self.elements = []
+        self.expressions = []
+        self.comments = []
+        self.errors = []
+        # (offset, name) of every identifier in JS code, when asked for
+        self.identifiers = None
+        self.by_start = {}
+        self.by_name = {}
+        self.by_class = {}
+        self._starts = []
+        self._expr_starts = []
+
+    def _index(self):
+        self.elements.sort(key=lambda el: el.start)
+        self.expressions.sort(key=lambda ex: ex.start)
+        self._starts = [el.start for el in self.elements]
+        self._expr_starts = [ex.start for ex in self.expressions]
+        for el in self.elements:
+            self.by_start[el.start] = el
+            self.by_name.setdefault(el.name, []).append(el)
+            for token in el.classes:
+                self.by_class.setdefault(token, []).append(el)
+
+    def element_at(self, offset):
+        """Element whose opening ``<`` is at ``offset``."""
+        return self.by_start.get(offset)
+
+    def matching_close(self, offset):
+        """``(close_start, end)`` of the element opened at ``offset``."""
+        el = self.by_start.get(offset)
+        if el is None or el.end is None:
+            return None
+        return (el.close_start if el.close_start is not None else el.open_end, el.end)
+
+    def named(self, name):
+        return self.by_name.get(name, [])
+
+    def with_class(self, *tokens):
+        """Elements whose className contains every token, in document order."""
+        if not tokens:
+            return []
+        candidates = min((self.by_class.get(t, []) for t in tokens), key=len)
+        if len(tokens) == 1:
+            return list(candidates)
+        wanted = set(tokens)
+        return [el for el in candidates if wanted.issubset(el.classes)]
+
+    def next_element(self, offset):
+        """First element starting at or after ``offset``."""
+        i = bisect.bisect_left(self._starts, offset)
+        return self.elements[i] if i < len(self.elements) else None
+
+    def enclosing(self, offset):
+        """Innermost element containing ``offset``."""
+        i = bisect.bisect_right(self._starts, offset) - 1
+        el = self.elements[i] if i >= 0 else None
+        while el is not None and not el.contains(offset):
+            el = el.parent
+        return el
+
+    def enclosing_expression(self, offset):
+        """Innermost ``{...}`` container strictly around ``offset``."""
+        i = bisect.bisect_right(self._expr_starts, offset - 1) - 1
+        ex = self.expressions[i] if i >= 0 else None
+        while ex is not None and not ex.start < offset < ex.end:
+            ex = ex.outer
+        return ex
+
+    def comments_matching(self, needle):
+        return [c for c in self.comments if needle in c.text]
+
+
+def class_literals(text, attr):
+    """``(start, end)`` of each run of literal class names in a className value.
+
+    That is the quoted value itself, or the string literals and template
+    chunks inside a ``{...}`` value. Strings that are compared against
+    (``active === 'x'``) are not class names and are left out.
+    """
+    if not attr.dynamic:
+        return [(attr.start + 1, attr.end - 1)]
+    out = []
+    _literals(text, attr.start + 1, attr.end - 1, out)
+    return [(start, end) for start, end in out if end > start]
+
+
+def _literals(text, i, end, out):
+    """Collect literals in the JS from ``i`` up to an unmatched ``}``; returns the offset after it."""
+    depth = 0
+    while i < end:
+        c = text[i]
+        if c == '"' or c == "'":
+            j = i + 1
+            while j < end and text[j] != c:
+                j += 2 if text[j] == '\\' else 1
+            if not _compared(text, i, j + 1):
+                out.append((i + 1, j))
+            i = j + 1
+        elif c == '`':
+            i += 1
+            start = i
+            while i < end and text[i] != '`':
+                if text[i] == '\\':
+                    i += 2
+                elif text.startswith('${', i):
+                    out.append((start, i))
+                    i = _literals(text, i + 2, end, out)
+                    start = i
+                else:
+                    i += 1
+            out.append((start, i))
+            i += 1
+        elif c == '{':
+            depth += 1
+            i += 1
+        elif c == '}':
+            if not depth:
+                return i + 1
+            depth -= 1
+            i += 1
+        else:
+            i += 1
+    return end
+
+
+def _compared(text, start, end):
+    j = start - 1
+    while j > 0 and text[j] in _SPACE:
+        j -= 1
+    if text[j - 1:j + 1] in ('==', '!='):
+        return True
+    while end < len(text) and text[end] in _SPACE:
+        end += 1
+    return text.startswith(('==', '!='), end)
+
+
+class _Parser:
+    def __init__(self, text, jsx=True, identifiers=False):
+        self.text = text
+        self.n = len(text)
+        self.jsx = jsx
+        self.tree = ElementTree(text)
+        if identifiers:
+            self.tree.identifiers = []
+        # Last significant character and word seen in JS code
+        self.prev = ''
+        self.prev_word = ''
+        self.exprs = []
+
+    # -- JS ---------------------------------------------------------------
+
+    def js(self, i, parent, closing=None):
+        """Scan JS from ``i``; stop after the unmatched ``closing`` char."""
+        text, n = self.text, self.n
+        # Offsets of the brackets opened in this scan, innermost last
+        opened = []
+        self.prev, self.prev_word = '(', ''
+        while i < n:
+            c = text[i]
+            if c in _SPACE:
+                i += 1
+            elif c == '/' and i + 1 < n and text[i + 1] in '/*':
+                i = self.js_comment(i)
+            elif c == '"' or c == "'":
+                i = self.string(i)
+                self._mark('"')
+            elif c == '`':
+                i = self.template(i, parent)[0]
+                self._mark('"')
+            elif c == '/' and self._expr_position():
+                i = self.regex(i)
+                self._mark('"')
+            elif c == '<' and self.jsx and self._jsx_start(i):
+                i = self.element(i, parent)
+                self._mark(')')
+            elif c in '({[':
+                opened.append(i)
+                i += 1
+                self._mark(c)
+            elif c in ')}]':
+                if not opened:
+                    if c == closing:
+                        return i + 1
+                    self.tree.errors.append((i, f"unmatched {c!r}"))
+                else:
+                    start = opened.pop()
+                    if _CLOSERS[text[start]] != c:
+                        self.tree.errors.append((i, f"{c!r} closes {text[start]!r} opened at {start}"))
+                i += 1
+                self._mark(c)
+            elif c in _IDENT_START:
+                j = i + 1
+                while j < n and text[j] in _IDENT:
+                    j += 1
+                self.prev, self.prev_word = 'a', text[i:j]
+                if self.tree.identifiers is not None:
+                    self.tree.identifiers.append((i, self.prev_word))
+                i = j
+            else:
+                i += 1
+                self._mark(c)
+        for start in opened:
+            self.tree.errors.append((start, f"unclosed {text[start]!r}"))
+        if closing:
+            self.tree.errors.append((self.n, f"unterminated '{closing}'"))
+        return n
+
+    def _mark(self, c):
+        self.prev, self.prev_word = c, ''
+
+    def _expr_position(self):
+        prev = self.prev
+        if prev == 'a':
+            return self.prev_word in _EXPR_KEYWORDS
+        return prev not in (')', ']', '}', '"') and not prev.isdigit()
+
+    def _jsx_start(self, i):
+        nxt = self.text[i + 1] if i + 1 < self.n else ''
+        if not (nxt in _IDENT_START or nxt == '>'):
+            return False
+        if not self._expr_position():
+            return False
+        # Generic arrow functions in .tsx: <T,>(...) and <T extends X>(...)
+        text, n = self.text, self.n
+        j = i + 1
+        while j < n and text[j] in _NAME:
+            j += 1
+        while j < n and text[j] in _SPACE:
+            j += 1
+        return not (text.startswith(',', j) or text.startswith('extends ', j))
+
+    def string(self, i, multiline=False):
+        text, n, quote = self.text, self.n, self.text[i]
+        start = i
+        i += 1
+        while i < n:
+            c = text[i]
+            if c == '\\':
+                i += 2
+            elif c == quote:
+                return i + 1
+            elif c == '\n' and not multiline:
+                self.tree.errors.append((start, 'unterminated string literal'))
+                return i + 1
+            else:
+                i += 1
+        self.tree.errors.append((start, 'unterminated string literal'))
+        return n
+
+    def template(self, i, parent):
+        """Skip a template literal; return (end, literal chunks)."""
+        text, n = self.text, self.n
+        i += 1
+        chunks = []
+        chunk_start = i
+        while i < n:
+            c = text[i]
+            if c == '\\':
+                i += 2
+            elif c == '`':
+                chunks.append(text[chunk_start:i])
+                return i + 1, chunks
+            elif c == '$' and i + 1 < n and text[i + 1] == '{':
+                chunks.append(text[chunk_start:i])
+                i = self.js(i + 2, parent, closing='}')
+                chunk_start = i
+            else:
+                i += 1
+        self.tree.errors.append((n, 'unterminated template literal'))
+        return n, chunks
+
+    def regex(self, i):
+        text, n = self.text, self.n
+        i += 1
+        in_class = False
+        while i < n:
+            c = text[i]
+            if c == '\\':
+                i += 2
+                continue
+            if c == '\n':
+                return i
+            if c == '[':
+                in_class = True
+            elif c == ']':
+                in_class = False
+            elif c == '/' and not in_class:
+                i += 1
+                while i < n and text[i] in _IDENT:
+                    i += 1
+                return i
+            i += 1
+        return n
+
+    def open_expression(self, i, element):
+        ex = Expression(i, element, self.exprs[-1] if self.exprs else None)
+        self.tree.expressions.append(ex)
+        self.exprs.append(ex)
+        return ex
+
+    def close_expression(self, ex, end):
+        ex.end = end
+        self.exprs.pop()
+        return end
+
+    def expression(self, i, element):
+        """``{...}`` container starting at ``i``; returns the offset after ``}``."""
+        ex = self.open_expression(i, element)
+        return self.close_expression(ex, self.js(i + 1, element, closing='}'))
+
+    # -- JSX --------------------------------------------------------------
+
+    def element(self, i, parent):
+        text, n = self.text, self.n
+        j = i + 1
+        while j < n and text[j] in _NAME:
+            j += 1
+        el = Element(text[i + 1:j], i, parent)
+        el.expr = self.exprs[-1] if self.exprs else None
+        self.tree.elements.append(el)
+        if parent is None:
+            self.tree.roots.append(el)
+        else:
+            parent.children.append(el)
+        i = self.attributes(j, el)
+        if el.self_closing or el.open_end is None:
+            el.end = el.open_end if el.open_end is not None else i
+            return i
+        return self.children(i, el)
+
+    def attributes(self, i, el):
+        text, n = self.text, self.n
+        while i < n:
+            c = text[i]
+            if c in _SPACE:
+                i += 1
+            elif c == '/' and i + 1 < n and text[i + 1] == '>':
+                el.self_closing = True
+                el.open_end = i + 2
+                return i + 2
+            elif c == '>':
+                el.open_end = i + 1
+                return i + 1
+            elif c == '{':
+                # Spread attribute
+                i = self.expression(i, el)
+            elif c == '/' and i + 1 < n and text[i + 1] in '/*':
+                i = self.js_comment(i)
+            elif c in _NAME:
+                j = i
+                while j < n and text[j] in _NAME:
+                    j += 1
+                name = text[i:j]
+                while j < n and text[j] in _SPACE:
+                    j += 1
+                if j < n and text[j] == '=':
+                    j += 1
+                    while j < n and text[j] in _SPACE:
+                        j += 1
+                    i = self.attribute_value(j, name, el)
+                else:
+                    el.attrs[name] = Attribute(name, i, j, '', False)
+                    i = j
+            else:
+                self.tree.errors.append((i, f"unexpected {c!r} in <{el.name}> tag"))
+                i += 1
+        self.tree.errors.append((el.start, f"unterminated <{el.name}> tag"))
+        return n
+
+    def js_comment(self, i):
+        text = self.text
+        if text[i + 1] == '/':
+            end = text.find('\n', i)
+            end = self.n if end < 0 else end
+        else:
+            end = text.find('*/', i + 2)
+            end = self.n if end < 0 else end + 2
+        self.tree.comments.append(Comment(i, end, text[i:end]))
+        return end
+
+    def attribute_value(self, i, name, el):
+        text = self.text
+        c = text[i] if i < self.n else ''
+        if c == '"' or c == "'":
+            end = self.string(i, multiline=True)
+            el.attrs[name] = Attribute(name, i, end, text[i + 1:end - 1], False)
+            return end
+        if c == '{':
+            ex = self.open_expression(i, el)
+            j = i + 1
+            while j < self.n and text[j] in _SPACE:
+                j += 1
+            static = ''
+            if j < self.n and text[j] in '`"\'':
+                # className={`...`} or className={"..."}: keep the literal parts
+                if text[j] == '`':
+                    after, chunks = self.template(j, el)
+                    static = ' '.join(chunks)
+                else:
+                    after = self.string(j)
+                    static = text[j + 1:after - 1]
+                end = self.js(after, el, closing='}')
+            else:
+                end = self.js(j, el, closing='}')
+            self.close_expression(ex, end)
+            el.attrs[name] = Attribute(name, i, end, static, True)
+            return end
+        if c == '<':
+            end = self.element(i, el)
+            el.attrs[name] = Attribute(name, i, end, '', True)
+            return end
+        self.tree.errors.append((i, f"bad value for attribute {name!r}"))
+        return i
+
+    def children(self, i, el, stop=None):
+        """Children of ``el`` from ``i``; returns the offset after its close tag.
+
+        With ``stop``, only the children starting before ``stop`` are read, and
+        the offset after the last of them is returned instead.
+        """
+        text, n = self.text, self.n
+        limit = n if stop is None else stop
+        while i < n:
+            lt = text.find('<', i, limit)
+            br = text.find('{', i, limit)
+            if lt < 0 and br < 0:
+                if stop is not None:
+                    return i
+                break
+            if br >= 0 and (lt < 0 or br < lt):
+                i = self.expression(br, el)
+                continue
+            i = lt
+            if text.startswith('</', i):
+                j = i + 2
+                while j < n and text[j] in _NAME:
+                    j += 1
+                name = text[i + 2:j]
+                end = text.find('>', j)
+                end = n if end < 0 else end + 1
+                if name == el.name:
+                    el.close_start = i
+                    el.end = end
+                    return end
+                # Mismatched close tag: let an ancestor with that name claim it
+                anc = el.parent
+                while anc is not None and anc.name != name:
+                    anc = anc.parent
+                self.tree.errors.append((i, f"</{name}> closes <{el.name}> opened at {el.start}"))
+                if anc is not None:
+                    el.end = i
+                    return i
+                i = end
+            elif i + 1 < n and (text[i + 1] in _IDENT_START or text[i + 1] == '>'):
+                i = self.element(i, el)
+            else:
+                i += 1
+        self.tree.errors.append((el.start, f"unclosed <{el.name}>"))
+        el.end = n
+        return n
+
+
+def parse(text, jsx=True, identifiers=False):
+    """Tokenize ``text`` once and return its indexed ``ElementTree``.
+
+    Pass ``jsx=False`` for plain ``.ts`` files, where ``<T>(...)`` is a generic.
+    With ``identifiers=True`` the tree also lists every identifier in JS code
+    (not in strings, comments, JSX text or tag and attribute names).
+    """
+    parser = _Parser(text, jsx=jsx, identifiers=identifiers)
+    parser.js(0, None)
+    tree = parser.tree
+    tree._index()
+    return tree
+
+
+def _child_at(tree, el, offset):
+    """Child of ``el`` (element or ``{...}`` container) with ``offset`` strictly inside, or None."""
+    child = tree.enclosing(offset)
+    while child is not None and child is not el and child.parent is not el:
+        child = child.parent
+    if child is el or (child is not None and child.start == offset):
+        child = None
+    ex = tree.enclosing_expression(offset)
+    while ex is not None and not (ex.parent is el and ex.start >= el.open_end):
+        ex = ex.outer
+    if ex is not None and (child is None or ex.start < child.start):
+        return ex
+    return child
+
+
+def _region(tree, start, end):
+    """``(element, lo, hi)``: the run of an element's children covering ``[start, end)``.
+
+    ``lo`` and ``hi`` lie between children, so the children can be read again
+    from ``lo`` and stop at ``hi``. None when the edit is not inside the
+    children of any element.
+    """
+    el = tree.enclosing(start)
+    while el is not None and not (el.close_start is not None and el.open_end <= start
+                                  and end <= el.close_start):
+        el = el.parent
+    if el is None:
+        return None
+    child = _child_at(tree, el, start)
+    lo = child.start if child is not None else start
+    child = _child_at(tree, el, end)
+    if child is not None:
+        end = child.end
+    hi = el.close_start
+    nxt = tree.next_element(end)
+    if nxt is not None and nxt.start < hi:
+        hi = nxt.start
+    i = bisect.bisect_left(tree._expr_starts, end)
+    if i < len(tree.expressions) and tree.expressions[i].start < hi:
+        hi = tree.expressions[i].start
+    return el, lo, hi
+
+
+def update(tree, text, edits, jsx=True):
+    """Move ``tree`` forward to ``text``, the result of ``edits`` to ``tree.text``.
+
+    ``edits`` are sorted, non-overlapping ``(start, end, replacement)`` against
+    ``tree.text``. The children of the elements the edits fall in are read
+    again, from the child before each edit to the child after it; everything
+    else is kept and shifted in place. Falls back to ``parse`` for edits
+    outside any element's children, or when either text does not balance.
+    Returns the updated tree.
+    """
+    if tree.errors or tree.identifiers is not None:
+        return _reparse(text, jsx)
+    # Merge the edits of each element into one run of its children
+    found = {}
+    for k, (start, end, _) in enumerate(edits):
+        region = _region(tree, start, end)
+        if region is None:
+            return _reparse(text, jsx)
+        el, lo, hi = region
+        if el in found:
+            _, lo0, hi0, k0, _ = found[el]
+            found[el] = (el, min(lo, lo0), max(hi, hi0), k0, k + 1)
+        else:
+            found[el] = (el, lo, hi, k, k + 1)
+    # Runs inside a wider run are read again with it
+    regions = []
+    for region in sorted(found.values(), key=lambda r: (r[1], -r[2])):
+        if regions and region[1] < regions[-1][2]:
+            el, lo, hi, k0, k1 = regions[-1]
+            if region[2] > hi:
+                return _reparse(text, jsx)
+            regions[-1] = (el, lo, hi, min(k0, region[3]), max(k1, region[4]))
+        else:
+            regions.append(region)
+
+    grown = [0]
+    for start, end, new in edits:
+        grown.append(grown[-1] + len(new) - (end - start))
+    los = [r[1] for r in regions]
+    his = [r[2] for r in regions]
+    after = [grown[r[4]] for r in regions]
+
+    def inside(o):
+        i = bisect.bisect_right(los, o) - 1
+        return i >= 0 and o < his[i]
+
+    def moved(o, end=False):
+        # An end offset at a run's start stays before what is inserted there
+        i = (bisect.bisect_left if end else bisect.bisect_right)(his, o)
+        return o + after[i - 1] if i else o
+
+    for el, lo, hi, _, _ in regions:
+        el.children = [c for c in el.children if c.start < lo or c.start >= hi]
+    elements = []
+    for el in tree.elements:
+        if inside(el.start):
+            continue
+        el.start = moved(el.start)
+        if el.open_end is not None:
+            el.open_end = moved(el.open_end, end=True)
+        if el.close_start is not None:
+            el.close_start = moved(el.close_start)
+        if el.end is not None:
+            el.end = moved(el.end, end=True)
+        for attr in el.attrs.values():
+            attr.start = moved(attr.start)
+            attr.end = moved(attr.end, end=True)
+        elements.append(el)
+    expressions = []
+    for ex in tree.expressions:
+        if not inside(ex.start):
+            ex.start = moved(ex.start)
+            ex.end = moved(ex.end, end=True)
+            expressions.append(ex)
+    comments = []
+    for c in tree.comments:
+        if not inside(c.start):
+            c.start = moved(c.start)
+            c.end = moved(c.end, end=True)
+            comments.append(c)
+
+    parser = _Parser(text, jsx=jsx)
+    for el, lo, hi, k0, k1 in regions:
+        start, stop = lo + grown[k0], hi + grown[k1]
+        kept = [c for c in el.children if c.start >= stop]
+        el.children = [c for c in el.children if c.start < stop]
+        close = (el.close_start, el.end)
+        parser.exprs = [el.expr] if el.expr is not None else []
+        end = parser.children(start, el, stop=stop)
+        if parser.tree.errors or end > stop or (el.close_start, el.end) != close:
+            return _reparse(text, jsx)
+        el.children.extend(kept)
+        counters['parsed'] += stop - start
+
+    tree.text = text
+    tree.elements = elements + parser.tree.elements
+    tree.expressions = expressions + parser.tree.expressions
+    comments.extend(parser.tree.comments)
+    comments.sort(key=lambda c: c.start)
+    tree.comments = comments
+    tree.by_start, tree.by_name, tree.by_class = {}, {}, {}
+    tree._index()
+    return tree
+
+
+def _reparse(text, jsx):
+    counters['parsed'] += len(text)
+    return parse(text, jsx=jsx)
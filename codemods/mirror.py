@@ -0,0 +1,199 @@
+"""Deduplicated runs over mirrored copies of the same sources.
+
+``App.tsx`` and ``DFP---NEO/App.tsx`` (and the other copied trees) differ in
+a handful of lines. Files are fingerprinted by content-defined chunks: a
+chunk ends after any line whose CRC falls on a boundary value, so an edit in
+one copy only changes the chunks around it and both copies still share the
+rest. Files sharing most of their chunks form a family. The rules run once,
+on the family's largest file; the edits they made are mapped through the
+chunk alignment onto every other copy.
+
+A copy is only replayed when that is exactly what running the rules on it
+would do: every rule declares its markers, no marker occurs in or across a
+region where the copies diverge, and every edit lies inside a shared run of
+chunks. Anything else, including a copy whose diverging lines hold a
+marker, is processed individually as before.
+"""
+import bisect
+import hashlib
+import os
+import time
+import zlib
+from difflib import SequenceMatcher
+
+from .anchors import scanner
+from .buffer import EditBuffer, changed_span
+from .engine import FileResult
+
+# Boundary every ~16 lines on average, with chunk lengths kept to 2..256 lines
+BOUNDARY = 16
+MIN_LINES = 2
+MAX_LINES = 256
+# Share of a file's bytes that must be in chunks shared with the family leader
+SHARED = 0.5
+
+
+class Fingerprint:
+    """Content-defined chunks of one text: start offsets and digests."""
+
+    def __init__(self, text):
+        self.text = text
+        starts = [0]
+        digests = []
+        pos = 0
+        count = 0
+        start = 0
+        for line in text.splitlines(keepends=True):
+            pos += len(line)
+            count += 1
+            if count >= MAX_LINES or (count >= MIN_LINES and zlib.crc32(line.encode('utf-8')) % BOUNDARY == 0):
+                digests.append(hashlib.sha1(text[start:pos].encode('utf-8')).digest())
+                starts.append(pos)
+                start = pos
+                count = 0
+        if start < len(text):
+            digests.append(hashlib.sha1(text[start:].encode('utf-8')).digest())
+            starts.append(len(text))
+        self.starts = starts
+        self.digests = digests
+
+    def size(self, i, j):
+        """Characters in chunks ``i`` to ``j``."""
+        return self.starts[j] - self.starts[i]
+
+
+def align(a, b):
+    """Shared runs of ``Fingerprint`` a and b as ``(a offset, b offset, length)`` in characters."""
+    matcher = SequenceMatcher(None, a.digests, b.digests, autojunk=False)
+    return [(a.starts[i], b.starts[j], a.size(i, i + n))
+            for i, j, n in matcher.get_matching_blocks() if n]
+
+
+def _gaps(blocks, length, side):
+    """Regions of one side not covered by ``blocks`` (empty ones included)."""
+    gaps = []
+    pos = 0
+    for block in blocks:
+        start = block[side]
+        gaps.append((pos, start))
+        pos = start + block[2]
+    gaps.append((pos, length))
+    return gaps
+
+
+class Family:
+    def __init__(self, leader, fingerprint):
+        self.leader = leader
+        self.fingerprint = fingerprint
+        self.digests = set(fingerprint.digests)
+        self.mirrors = {}
+
+    def shared(self, fingerprint):
+        """Alignment with ``fingerprint`` if it shares enough of its bytes with the leader."""
+        if not fingerprint.text:
+            return None
+        # Cheap upper bound on the shared bytes before aligning
+        common = sum(fingerprint.size(i, i + 1) for i, d in enumerate(fingerprint.digests) if d in self.digests)
+        if common < SHARED * len(fingerprint.text):
+            return None
+        blocks = align(self.fingerprint, fingerprint)
+        if sum(n for _, _, n in blocks) < SHARED * len(fingerprint.text):
+            return None
+        return blocks
+
+
+def families(paths, texts):
+    """Group ``paths`` into families, largest file of each first."""
+    out = []
+    for path in sorted(paths, key=lambda p: len(texts[p]), reverse=True):
+        fingerprint = Fingerprint(texts[path])
+        for family in out:
+            blocks = family.shared(fingerprint)
+            if blocks is not None:
+                family.mirrors[path] = (fingerprint, blocks)
+                break
+        else:
+            out.append(Family(path, fingerprint))
+    return out
+
+
+def edits(old, new):
+    """Minimal ``(start, end, text)`` edits turning ``old`` into ``new``, via their chunks."""
+    a, b = Fingerprint(old), Fingerprint(new)
+    matcher = SequenceMatcher(None, a.digests, b.digests, autojunk=False)
+    out = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        start, end = a.starts[i1], a.starts[i2]
+        segment = new[b.starts[j1]:b.starts[j2]]
+        lo, old_end, new_end = changed_span(old[start:end], segment)
+        out.append((start + lo, start + old_end, segment[lo:new_end]))
+    return out
+
+
+def _clear(text, regions, patterns):
+    """Whether no pattern occurs in or across any of ``regions``."""
+    compiled = scanner(patterns)
+    if not compiled.patterns:
+        return True
+    reach = compiled.longest - 1
+    for lo, hi in regions:
+        for p, found in compiled.scan(text, max(0, lo - reach), min(len(text), hi + reach)).items():
+            if any(q < hi and q + len(p) > lo for q in found):
+                return False
+    return True
+
+
+def replay(family, path, old, new, rules):
+    """Contents of mirror ``path`` after the edits that turned the leader's ``old`` into ``new``.
+
+    Returns None when the edits cannot be shown to carry over.
+    """
+    fingerprint, blocks = family.mirrors[path]
+    text = fingerprint.text
+    if not all(r.anchors for r in rules):
+        # Rules without markers may act anywhere, diverging lines included
+        return None
+    patterns = {a for r in rules for a in r.anchors}
+    if not _clear(old, _gaps(blocks, len(old), 0), patterns) or \
+            not _clear(text, _gaps(blocks, len(text), 1), patterns):
+        return None
+
+    buffer = EditBuffer(text)
+    starts = [a for a, _, _ in blocks]
+    for start, end, replacement in edits(old, new):
+        i = bisect.bisect_right(starts, start) - 1
+        if i < 0:
+            return None
+        a, b, n = blocks[i]
+        if end > a + n:
+            return None
+        # An insert on the edge of a shared run could belong on either side of the gap
+        if start == end and (start == a and a + b > 0 or start == a + n and (a + n < len(old) or b + n < len(text))):
+            return None
+        buffer.replace(b + start - a, b + end - a, replacement)
+    return buffer.materialize()
+
+
+def mirrored(family, path, lead, old, new, rules):
+    """``FileResult`` for mirror ``path`` replayed from the leader's result ``lead``, or None."""
+    start = time.perf_counter()
+    text = replay(family, path, old, new, rules)
+    if text is None:
+        return None
+    res = FileResult(path, dict(lead.hits), text != family.mirrors[path][0].text,
+                     time.perf_counter() - start)
+    res.mirror = family.leader
+    if res.changed:
+        res.text = text
+        res.original = family.mirrors[path][0].text
+    return res
+
+
+def read_all(paths, root='.'):
+    texts = {}
+    for path in paths:
+        with open(os.path.join(root, path), 'r') as f:
+            texts[path] = f.read()
+    return texts
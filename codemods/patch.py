@@ -0,0 +1,172 @@
+"""Unified diffs built from a run's edit lists.
+
+Every ``Document`` keeps the changes the rules made as edits against the
+text it was read from (``doc.changes``). ``unified`` turns those into a
+unified diff without comparing the two texts: each edit is widened to the
+lines it touches, edits on shared lines are merged, and only the lines inside
+an edited region are aligned to find the lines that really changed. The cost
+grows with the edits, not with the files, so a preview of hundreds of files
+is cheap, and the hunks are as small as a full diff's.
+
+    python3 -m codemods dry-run --diff - > preview.patch
+    git apply --check preview.patch
+"""
+from difflib import SequenceMatcher
+
+CONTEXT = 3
+# Edited regions longer than this (in lines) are shown as one replacement
+_ALIGN_LINES = 2000
+
+
+def _regions(text, edits):
+    """``(line, start, end, new lines)`` for each run of edits sharing lines.
+
+    ``start:end`` spans the whole lines the edits touch and ``line`` is the
+    0-based number of the first. Line numbers are counted forward from the
+    previous region, so nothing is split or indexed outside the edits.
+    """
+    regions = []
+    group = []
+    lo = hi = 0
+    line = counted = 0
+
+    def flush():
+        pieces = []
+        pos = lo
+        for start, stop, new in group:
+            pieces.append(text[pos:start])
+            pieces.append(new)
+            pos = stop
+        pieces.append(text[pos:hi])
+        regions.append((line, lo, hi, ''.join(pieces).splitlines(keepends=True)))
+
+    for start, stop, new in edits:
+        begin = text.rfind('\n', 0, start) + 1
+        if group and begin < hi:
+            hi = max(hi, _line_end(text, start, stop))
+        else:
+            if group:
+                flush()
+            group = []
+            lo, hi = begin, _line_end(text, start, stop)
+            line += text.count('\n', counted, lo)
+            counted = lo
+        group.append((start, stop, new))
+    if group:
+        flush()
+    return regions
+
+
+def _line_end(text, start, stop):
+    """End of the last line an edit of ``start:stop`` touches, past its newline."""
+    end = text.find('\n', max(start, stop - 1))
+    return len(text) if end < 0 else end + 1
+
+
+def changes(text, edits):
+    """Changed lines ``(line, start, end, old lines, new lines)`` made by ``edits`` to ``text``."""
+    out = []
+    for line, lo, hi, new in _regions(text, edits):
+        old = text[lo:hi].splitlines(keepends=True)
+        if len(old) > _ALIGN_LINES or len(new) > _ALIGN_LINES:
+            if old != new:
+                out.append((line, lo, hi, old, new))
+            continue
+        offsets = [lo]
+        for piece in old:
+            offsets.append(offsets[-1] + len(piece))
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+            if tag != 'equal':
+                out.append((line + i1, offsets[i1], offsets[i2], old[i1:i2], new[j1:j2]))
+    return out
+
+
+def _before(text, offset, count):
+    lines = []
+    while count and offset > 0:
+        start = text.rfind('\n', 0, offset - 1) + 1
+        lines.append(text[start:offset])
+        offset = start
+        count -= 1
+    lines.reverse()
+    return lines
+
+
+def _after(text, offset, count):
+    lines = []
+    while count and offset < len(text):
+        end = text.find('\n', offset)
+        end = len(text) if end < 0 else end + 1
+        lines.append(text[offset:end])
+        offset = end
+        count -= 1
+    return lines
+
+
+def _line(prefix, line):
+    if line.endswith('\n'):
+        return prefix + line
+    return f"{prefix}{line}\n\\ No newline at end of file\n"
+
+
+def unified(path, text, edits, context=CONTEXT):
+    """Unified diff of ``path`` for ``edits`` against ``text``; empty if they change nothing."""
+    found = changes(text, edits)
+    if not found:
+        return ''
+    out = [f"--- a/{path}\n", f"+++ b/{path}\n"]
+    delta = 0
+    i = 0
+    while i < len(found):
+        # Changes whose context would overlap share a hunk
+        j = i + 1
+        while j < len(found) and found[j][0] - (found[j - 1][0] + len(found[j - 1][3])) <= 2 * context:
+            j += 1
+        before = _before(text, found[i][1], context)
+        body = [_line(' ', line) for line in before]
+        old_len = len(before)
+        added = 0
+        pos = found[i][1]
+        for line, start, end, old, new in found[i:j]:
+            gap = text[pos:start].splitlines(keepends=True)
+            body.extend(_line(' ', piece) for piece in gap)
+            body.extend(_line('-', piece) for piece in old)
+            body.extend(_line('+', piece) for piece in new)
+            old_len += len(gap) + len(old)
+            added += len(new) - len(old)
+            pos = end
+        after = _after(text, pos, context)
+        body.extend(_line(' ', line) for line in after)
+        old_len += len(after)
+        new_len = old_len + added
+        first = found[i][0] - len(before)
+        # An empty range names the line before it
+        old_start = first + 1 if old_len else first
+        new_start = first + delta + 1 if new_len else first + delta
+        out.append(f"@@ -{old_start},{old_len} +{new_start},{new_len} @@\n")
+        out.extend(body)
+        delta += added
+        i = j
+    return ''.join(out)
+
+
+def combined(results):
+    """One patch for every changed result, in order."""
+    # Imported here: only results without recorded edits need it
+    from .mirror import edits as chunk_edits
+    out = []
+    for res in results:
+        if not res.changed or res.error:
+            continue
+        found = res.changes
+        if found is None:
+            # Replayed or rebased results carry no edit list
+            found = chunk_edits(res.original, res.text)
+        out.append(unified(res.path, res.original, found))
+    return ''.join(out)
+
+
+def unmatched(rules, results):
+    """Ids of ``rules`` that made no edit in any of ``results``."""
+    hit = {id for res in results for id, count in res.hits.items() if count}
+    return [r.id for r in rules if r.id not in hit]
@@ -0,0 +1,66 @@
+"""Precomputed plugin registry.
+
+Importing every plugin module, and the engine modules they pull in, is most
+of the cost of a short run. ``load`` returns the registered rules' metadata
+(id, target path, plugin, version, source digest and anchors) from
+``.codemods-cache/registry.json`` instead. The registry records the mtime
+and size of every source file that was loaded or fingerprinted while
+building it. When any of them changes, the plugins are imported once more
+and the registry is rebuilt.
+"""
+import json
+import os
+import sys
+from collections import namedtuple
+
+# Same directory as the result cache (codemods.cache.DEFAULT_DIR)
+REGISTRY = os.path.join('.codemods-cache', 'registry.json')
+# Bump when the registry's shape changes
+VERSION = 2
+
+RuleInfo = namedtuple('RuleInfo', 'id path plugin version source anchors')
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def build(root='.'):
+    """Import the plugins and write the registry; returns the ``RuleInfo`` list."""
+    from .engine import fingerprint, load_plugins
+    rules = load_plugins()
+    base = os.path.abspath(root) + os.sep
+    paths = [getattr(module, '__file__', None) for module in list(sys.modules.values())]
+    # Modules the rules import lazily are part of their source digest too
+    paths += fingerprint(rules, root)
+    sources = {}
+    for path in paths:
+        if path and os.path.abspath(path).startswith(base):
+            sources[os.path.relpath(path, root)] = _stamp(path)
+    infos = [RuleInfo(r.id, r.path, r.plugin, r.version, r.source, list(r.anchors)) for r in rules]
+    data = {'version': VERSION, 'sources': sources, 'rules': [info._asdict() for info in infos]}
+
+    path = os.path.join(root, REGISTRY)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+    return infos
+
+
+def load(root='.'):
+    """``RuleInfo`` for every registered rule, from the registry while it is current."""
+    try:
+        with open(os.path.join(root, REGISTRY), 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return build(root)
+    if data.get('version') != VERSION or any(
+            _stamp(os.path.join(root, path)) != stamp for path, stamp in data['sources'].items()):
+        return build(root)
+    return [RuleInfo(**r) for r in data['rules']]
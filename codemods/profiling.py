@@ -0,0 +1,145 @@
+"""Per-rule instrumentation for codemod runs.
+
+A ``Profiler`` handed to the engine records, for every rule on every file, the
+time it took, how much text was scanned for anchors or parsed into an element
+tree, how many anchor lookups it made, how many anchor occurrences those
+lookups returned and the edits it spliced. Records export as a flat table (aligned text or CSV) and as a Chrome
+trace (load it in ``chrome://tracing`` or Perfetto) with one lane per process.
+
+Rules named in ``cprofile`` additionally run under ``cProfile``; their stats
+are dumped to ``<directory>/<rule id>.<pid>.prof``.
+"""
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+# Hot-path counters bumped by the anchor index and the element tree
+counters = Counter()
+
+COLUMNS = ('path', 'rule', 'plugin', 'ms', 'scanned', 'parsed', 'probes', 'matches', 'edits')
+
+
+class Record:
+    """Measurements of one rule (or, with ``rule=None``, one file) in one run."""
+
+    __slots__ = ('path', 'rule', 'plugin', 'start', 'elapsed', 'scanned', 'parsed', 'probes',
+                 'matches', 'edits', 'pid')
+
+    def __init__(self, path, rule, plugin, start, elapsed, counts, edits):
+        self.path = path
+        self.rule = rule
+        self.plugin = plugin
+        self.start = start
+        self.elapsed = elapsed
+        self.scanned = counts['scanned']
+        self.parsed = counts['parsed']
+        self.probes = counts['probes']
+        self.matches = counts['matches']
+        self.edits = edits
+        self.pid = os.getpid()
+
+    def row(self):
+        return (self.path, self.rule or '', self.plugin or '', round(self.elapsed * 1000, 3),
+                self.scanned, self.parsed, self.probes, self.matches, self.edits)
+
+
+class Profiler:
+    def __init__(self, cprofile=(), directory='codemods-profile'):
+        self.records = []
+        self.cprofile = set(cprofile)
+        self.directory = directory
+
+    def _snapshot(self):
+        return Counter(counters)
+
+    def call(self, rule, doc):
+        """Run ``rule`` on ``doc`` and record it; returns its hit count."""
+        before = self._snapshot()
+        spliced = doc.spliced
+        start = time.perf_counter()
+        if rule.id in self.cprofile:
+            hits = self._cprofile(rule, doc)
+        else:
+            hits = rule.apply(doc) or 0
+        elapsed = time.perf_counter() - start
+        counts = Counter(counters)
+        counts.subtract(before)
+        self.records.append(Record(doc.path, rule.id, rule.plugin, start, elapsed, counts,
+                                   doc.spliced - spliced))
+        return hits
+
+    def _cprofile(self, rule, doc):
+        import cProfile
+
+        prof = cProfile.Profile()
+        hits = prof.runcall(rule.apply, doc) or 0
+        os.makedirs(self.directory, exist_ok=True)
+        prof.dump_stats(os.path.join(self.directory, f"{rule.id}.{os.getpid()}.prof"))
+        return hits
+
+    def mark(self):
+        """Where a file starts: pass the result to ``file`` once it is done."""
+        return time.perf_counter(), len(self.records), self._snapshot()
+
+    def file(self, res, mark):
+        """Record the whole of one file's processing since ``mark``."""
+        start, first, before = mark
+        counts = Counter(counters)
+        counts.subtract(before)
+        edits = sum(r.edits for r in self.records[first:])
+        self.records.append(Record(res.path, None, None, start, res.elapsed, counts, edits))
+
+    def extend(self, records):
+        """Merge records made elsewhere, e.g. by pool workers."""
+        self.records.extend(records)
+
+    def rows(self, files=False):
+        return [r.row() for r in self.records if files or r.rule is not None]
+
+    def by_plugin(self):
+        """Total seconds per plugin, slowest first."""
+        totals = Counter()
+        for r in self.records:
+            if r.rule is not None:
+                totals[r.plugin] += r.elapsed
+        return totals.most_common()
+
+    def write_table(self, out=None):
+        out = out or sys.stdout
+        rows = self.rows()
+        widths = [max(len(str(v)) for v in col) for col in zip(COLUMNS, *rows)]
+        for row in [COLUMNS] + rows:
+            print('  '.join(str(v).rjust(w) if isinstance(v, (int, float)) else str(v).ljust(w)
+                            for v, w in zip(row, widths)).rstrip(), file=out)
+        for plugin, seconds in self.by_plugin():
+            print(f"{plugin}: {seconds * 1000:.1f} ms", file=out)
+
+    def write_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(self.rows(files=True))
+
+    def trace(self):
+        """Chrome trace event dict; files and rules nest as complete events."""
+        events = []
+        for r in self.records:
+            name = r.rule or r.path
+            events.append({
+                'name': name,
+                'cat': r.plugin or 'file',
+                'ph': 'X',
+                'ts': round(r.start * 1e6, 1),
+                'dur': round(r.elapsed * 1e6, 1),
+                'pid': r.pid,
+                'tid': r.pid,
+                'args': dict(zip(COLUMNS, r.row())),
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
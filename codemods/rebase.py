@@ -0,0 +1,118 @@
+"""Publishing a run's results when files change underneath it.
+
+Runs read their inputs without any lock, so ``git-sync.sh`` (stash, pull,
+pop) or another run may rewrite a target between the read and the write.
+``publish`` stages every changed file as a compare-and-swap on the content
+hash it was read with. For each target that changed anyway, ``rebase``
+carries the run's edits over onto the new contents. When the other writer
+touched none of the rules' markers and none of the run's edits, the run's
+edits are replayed as they are. Otherwise all of the file's rules are run
+on the new contents: the recorded edits are not split by rule, and replaying
+them before running a rule again would apply it twice. Then the commit is
+retried.
+"""
+import time
+
+from .anchors import content_hash, index as anchor_index
+from .buffer import EditBuffer
+from .engine import Document, FileResult, RuleError
+from .mirror import edits
+from .transaction import Conflict, Transaction
+
+RETRIES = 3
+
+
+def _overlaps(a, b):
+    (s1, e1, _), (s2, e2, _) = a, b
+    if s1 == e1 or s2 == e2:
+        # An insert touching the other edit could go on either side of it
+        return s1 <= e2 and s2 <= e1
+    return s1 < e2 and s2 < e1
+
+
+def _shifted(changes):
+    """``changes`` (against the original) with their start offsets in the changed text."""
+    delta = 0
+    out = []
+    for start, end, text in changes:
+        out.append((start + delta, start + delta + len(text)))
+        delta += len(text) - (end - start)
+    return out
+
+
+def rebase(engine, path, rules, res):
+    """``FileResult`` for ``path`` as it is on disk now, with ``res``'s edits carried over."""
+    begin = time.perf_counter()
+    theirs = engine.read(path)
+    mine = edits(res.original, res.text)
+    changes = edits(res.original, theirs)
+    doc = Document(path, theirs, anchors=engine.anchors)
+
+    before = anchor_index(res.original, engine.anchors)
+    after = anchor_index(theirs, engine.anchors)
+    spans = list(zip(changes, _shifted(changes)))
+    affected = any(not r.anchors or any(
+        before.touches(m, start, end) or after.touches(m, new_start, new_end)
+        for (start, end, _), (new_start, new_end) in spans for m in r.anchors) for r in rules)
+
+    if affected or any(_overlaps(m, c) for m in mine for c in changes):
+        hits = engine.apply(doc, rules)
+    else:
+        buffer = EditBuffer(theirs)
+        i = delta = 0
+        for start, end, text in mine:
+            while i < len(changes) and changes[i][1] <= start:
+                delta += len(changes[i][2]) - (changes[i][1] - changes[i][0])
+                i += 1
+            buffer.replace(start + delta, end + delta, text)
+        doc.text = buffer.materialize()
+        hits = dict(res.hits)
+    engine.check(doc)
+
+    out = FileResult(path, hits, doc.changed, res.elapsed + time.perf_counter() - begin)
+    if out.changed:
+        out.text = doc.text
+        out.original = doc.original
+        out.changes = doc.changes
+    return out
+
+
+def publish(engine, results, rules_for):
+    """Write every changed result in one transaction, rebasing those changed on disk meanwhile.
+
+    ``rules_for(path)`` gives the rules that produced a path's result. Sets
+    ``written`` on the results; on failure nothing is written and the
+    affected results carry the error.
+    """
+    position = {res.path: i for i, res in enumerate(results)}
+    txn = Transaction(engine.root)
+    for res in results:
+        if res.changed:
+            txn.write(res.path, res.text, expect=content_hash(res.original))
+
+    for attempt in range(RETRIES + 1):
+        try:
+            published = set(txn.commit())
+            break
+        except Conflict as e:
+            if attempt == RETRIES:
+                txn.abort()
+                for path in e.paths:
+                    results[position[path]].error = str(e)
+                return results
+            for path in e.paths:
+                try:
+                    res = rebase(engine, path, rules_for(path), results[position[path]])
+                except (OSError, RuleError) as err:
+                    txn.abort()
+                    results[position[path]].error = f"rebasing onto the changed file: {err}"
+                    return results
+                results[position[path]] = res
+                if res.changed:
+                    txn.write(path, res.text, expect=content_hash(res.original))
+                else:
+                    txn.discard(path)
+
+    for res in results:
+        res.written = res.path in published
+    return results
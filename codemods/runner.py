@@ -0,0 +1,202 @@
+"""Parallel codemod runner over a tree of TS/TSX files.
+
+``Runner`` applies a set of rules to the files matched by one or more globs.
+Each file gets the rules that target it; with ``all_sources=True`` every rule
+runs on every matched file, regardless of its own target path. Globs that
+only match files no rule targets are reported as such rather than as a clean
+run. Files are sharded across a process pool; workers only compute new
+contents, and the parent writes them back once every worker has succeeded,
+so a failure in one file leaves the whole tree untouched. With ``dedup=True`` mirrored copies of a file are computed once
+(see ``codemods.mirror``).
+"""
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from . import mirror
+from .engine import Engine, FileResult
+from .rebase import publish
+from .validate import check
+
+# The app sources and the mirrored DFP---NEO copy
+DEFAULT_GLOBS = [
+    '*.ts',
+    '*.tsx',
+    'components/**/*.ts',
+    'components/**/*.tsx',
+    'data/**/*.ts',
+    'hooks/**/*.ts',
+    'types/**/*.ts',
+    'utils/**/*.ts',
+    'DFP---NEO/**/*.tsx',
+]
+
+SKIP_DIRS = {'.git', '.next', 'node_modules', 'public', '__pycache__', '.codemods-cache', '.codemods-txn'}
+
+_engine = None
+_all_sources = False
+
+
+def expand(globs, root='.'):
+    """Repo-relative files matched by ``globs``, in glob order without repeats."""
+    seen = set()
+    paths = []
+    for pattern in globs:
+        for path in sorted(glob.glob(os.path.join(root, pattern), recursive=True)):
+            rel = os.path.relpath(path, root)
+            if rel in seen or not os.path.isfile(path):
+                continue
+            if SKIP_DIRS.intersection(rel.split(os.sep)):
+                continue
+            seen.add(rel)
+            paths.append(rel)
+    return paths
+
+
+def shard(paths, count, root='.'):
+    """Split ``paths`` into ``count`` shards of roughly equal total size."""
+    count = max(1, min(count, len(paths)))
+    sizes = {p: os.path.getsize(os.path.join(root, p)) for p in paths}
+    shards = [[] for _ in range(count)]
+    totals = [0] * count
+    # Largest files first, each onto the lightest shard so far
+    for path in sorted(paths, key=sizes.get, reverse=True):
+        i = totals.index(min(totals))
+        shards[i].append(path)
+        totals[i] += sizes[path]
+    return [s for s in shards if s]
+
+
+def _init_worker(rules, root, cache, profiler, all_sources):
+    global _engine, _all_sources
+    _engine = Engine(rules, root=root, cache=cache, profiler=profiler)
+    _all_sources = all_sources
+
+
+def rules_for(rules, path, all_sources=False):
+    """The ``rules`` that run on ``path``: those targeting it, or every one with ``all_sources``."""
+    if all_sources:
+        return list(rules)
+    return [r for r in rules if r.path == path]
+
+
+def matched(rules, globs=None, root='.', all_sources=False):
+    """``(paths, skipped)``: files ``globs`` match that some rule runs on, and the others."""
+    paths = []
+    skipped = []
+    for path in expand(globs or DEFAULT_GLOBS, root):
+        (paths if rules_for(rules, path, all_sources) else skipped).append(path)
+    return paths, skipped
+
+
+def warn_untargeted(paths, skipped, out=None):
+    """Say so when the globs matched files but no rule targets any of them."""
+    if skipped and not paths:
+        print(f"{len(skipped)} files matched, none targeted by any rule (use --all-sources)",
+              file=out or sys.stdout)
+
+
+def _process(engine, paths, all_sources):
+    results = []
+    for path in paths:
+        try:
+            doc, res = engine.process(path, rules_for(engine.rules, path, all_sources))
+        except Exception as e:
+            res = FileResult(path, {}, False, 0.0, error=f"{type(e).__name__}: {e}")
+        results.append(res)
+    return results
+
+
+def _process_shard(paths):
+    return _process(_engine, paths, _all_sources)
+
+
+class Runner:
+    def __init__(self, rules, root='.', jobs=None, cache=None, profiler=None, dedup=False, all_sources=False):
+        self.rules = list(rules)
+        self.root = root
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache = cache
+        self.profiler = profiler
+        self.dedup = dedup
+        self.all_sources = all_sources
+
+    def rules_for(self, path):
+        return rules_for(self.rules, path, self.all_sources)
+
+    def compute(self, paths):
+        """Per-file results for ``paths`` in the given order, nothing written."""
+        if self.dedup:
+            return self._compute_dedup(paths)
+        return self._compute(paths)
+
+    def _compute_dedup(self, paths):
+        texts = mirror.read_all(paths, self.root)
+        groups = mirror.families(paths, texts)
+        by_path = dict(zip([g.leader for g in groups], self._compute([g.leader for g in groups])))
+        pending = []
+        for group in groups:
+            lead = by_path[group.leader]
+            for path in group.mirrors:
+                res = None
+                if not lead.error and self.rules_for(path) == self.rules_for(group.leader):
+                    old = texts[group.leader]
+                    new = lead.text if lead.changed else old
+                    res = mirror.mirrored(group, path, lead, old, new, self.rules_for(path))
+                if res is not None and res.changed and check(res.text, path) is not None:
+                    # Let the copy's own run report what broke
+                    res = None
+                if res is None:
+                    pending.append(path)
+                else:
+                    by_path[path] = res
+        by_path.update(zip(pending, self._compute(pending)))
+        return [by_path[p] for p in paths]
+
+    def _compute(self, paths):
+        if not paths:
+            return []
+        if self.jobs <= 1 or len(paths) <= 1:
+            engine = Engine(self.rules, root=self.root, cache=self.cache, profiler=self.profiler)
+            return _process(engine, paths, self.all_sources)
+
+        # A few shards per worker keeps the pool busy when file sizes vary
+        shards = shard(paths, self.jobs * 4, root=self.root)
+        by_path = {}
+        with ProcessPoolExecutor(self.jobs, initializer=_init_worker,
+                                 initargs=(self.rules, self.root, self.cache, self.profiler, self.all_sources)) as pool:
+            for results in pool.map(_process_shard, shards):
+                for res in results:
+                    by_path[res.path] = res
+                    if self.cache is not None:
+                        self.cache.update(res.cache_entries)
+                    if self.profiler is not None:
+                        self.profiler.extend(res.profile)
+        return [by_path[p] for p in paths]
+
+    def run(self, globs=None, write=True, out=None):
+        paths, skipped = matched(self.rules, globs, self.root, self.all_sources)
+        warn_untargeted(paths, skipped, out)
+        results = self.compute(paths)
+        if write and not any(res.error for res in results):
+            results = publish(Engine(self.rules, root=self.root), results, self.rules_for)
+        if self.cache is not None:
+            self.cache.save()
+        return results
+
+
+def summarize(results, out=None):
+    out = out or sys.stdout
+    failed = [res for res in results if res.error]
+    changed = [res for res in results if res.changed]
+    mirrored = [res for res in results if res.mirror]
+    elapsed = sum(res.elapsed for res in results)
+    print(f"{len(results)} files, {len(changed)} changed, {len(failed)} failed, "
+          f"{elapsed * 1000:.1f} ms of rule time", file=out)
+    if mirrored:
+        print(f"    {len(mirrored)} replayed from mirrored copies", file=out)
+    for res in failed:
+        print(f"    {res.path}: {res.error}", file=out)
+    if failed and changed:
+        print("    nothing written: every file must succeed before any write", file=out)
@@ -0,0 +1,215 @@
+"""Manifest of the Settings page sections.
+
+``SettingsView.tsx`` renders one body per ``activeSection`` id, and
+``SettingsViewWithMenu.tsx`` lists the same ids in its ``menuItems`` array
+and maps them to header titles. ``manifest`` reads both files once and
+returns, for every id, its title, menu entry and body offsets, plus whether
+the ``SettingsSection`` type and the ``activeSection`` prop declare it. The
+result is cached as JSON in ``.codemods-cache/sections.json`` and reused for
+as long as both files keep their mtime and size, or their content hash.
+
+    python3 -m codemods.sections            # the manifest as JSON
+    python3 -m codemods.sections --check    # ids missing a title, menu entry or body
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+
+from .anchors import content_hash
+from .cache import DEFAULT_DIR as CACHE_DIR
+from .dsl import balanced_end
+from .jsx import parse
+
+VIEW = 'components/SettingsView.tsx'
+MENU = 'components/SettingsViewWithMenu.tsx'
+CACHE_NAME = 'sections.json'
+# Bump when the manifest's shape or extraction changes
+VERSION = 1
+
+_ID = r"'([\w-]+)'"
+_TITLE = re.compile(r"activeSection\s*===\s*" + _ID + r"\s*&&\s*(['\"])(.*?)\2")
+_BODY = re.compile(r"activeSection\s*===\s*" + _ID + r"\s*&&\s*[(<]")
+_HIDDEN = re.compile(r"activeSection\s*!==\s*" + _ID + r"\s*\?\s*'hidden'")
+_MENU = re.compile(r"\{\s*id:\s*" + _ID + r"(?:\s+as\s+const)?\s*,\s*label:\s*'([^']*)'")
+_DECLARED = re.compile(r"(?:type\s+SettingsSection\s*=|activeSection\?\s*:)\s*((?:\s*\|?\s*'[\w-]+')+)")
+
+
+class Section:
+    __slots__ = ('id', 'title', 'menu', 'body', 'comment', 'declared')
+
+    def __init__(self, id):
+        self.id = id
+        self.title = None
+        # {'label', 'file', 'start', 'end'} of the menuItems entry
+        self.menu = None
+        # {'file', 'start', 'end', 'line'} of the element or {...} rendered for it
+        self.body = None
+        # Text of the {/* ... */} label comment just before the body
+        self.comment = None
+        # Files whose section id type lists it
+        self.declared = []
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _comment_before(tree, text, offset):
+    for comment in reversed(tree.comments):
+        if comment.end <= offset:
+            if text[comment.end:offset].strip(' \t\r\n}{'):
+                return None
+            return comment.text.strip('/* \t')
+    return None
+
+
+def extract(texts):
+    """Sections found in ``texts`` (path -> text), menu order first."""
+    sections = {}
+    order = []
+
+    def get(id):
+        if id not in sections:
+            sections[id] = Section(id)
+            order.append(id)
+        return sections[id]
+
+    menu_text = texts.get(MENU, '')
+    for m in _MENU.finditer(menu_text):
+        get(m.group(1)).menu = {'label': m.group(2), 'file': MENU, 'start': m.start(),
+                                'end': balanced_end(menu_text, m.start())}
+
+    for path in (MENU, VIEW):
+        text = texts.get(path, '')
+        for m in _DECLARED.finditer(text):
+            for id in re.findall(_ID, m.group(1)):
+                get(id).declared.append(path)
+        for m in _TITLE.finditer(text):
+            section = get(m.group(1))
+            if section.title is None:
+                section.title = m.group(3)
+
+    text = texts.get(VIEW, '')
+    if text:
+        tree = parse(text)
+        for m in _BODY.finditer(text):
+            ex = tree.enclosing_expression(m.start())
+            if ex is None:
+                continue
+            _set_body(get(m.group(1)), tree, text, ex.start, ex.end)
+        for m in _HIDDEN.finditer(text):
+            el = tree.enclosing(m.start())
+            if el is not None:
+                _set_body(get(m.group(1)), tree, text, el.start, el.end)
+    return [sections[id] for id in order]
+
+
+def _set_body(section, tree, text, start, end):
+    if section.body is not None:
+        return
+    section.body = {'file': VIEW, 'start': start, 'end': end, 'line': text.count('\n', 0, start) + 1}
+    section.comment = _comment_before(tree, text, start)
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ''
+
+
+def manifest(root='.', cache=True):
+    """The section manifest as a dict, from the cache when both files are unchanged."""
+    cache_path = os.path.join(root, CACHE_DIR, CACHE_NAME)
+    stamps = {p: _stamp(os.path.join(root, p)) for p in (VIEW, MENU)}
+    cached = None
+    if cache:
+        try:
+            with open(cache_path, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = None
+        if cached is not None and cached.get('version') != VERSION:
+            cached = None
+        if cached is not None and cached['stamps'] == stamps:
+            return cached
+
+    texts = {p: _read(os.path.join(root, p)) for p in (VIEW, MENU)}
+    hashes = {p: content_hash(text) for p, text in texts.items()}
+    if cached is not None and cached['hashes'] == hashes:
+        # Touched, not changed: refresh the stamps only
+        result = cached
+    else:
+        result = {'version': VERSION, 'hashes': hashes,
+                  'sections': [s.as_dict() for s in extract(texts)]}
+    result['stamps'] = stamps
+    if cache:
+        _save(cache_path, result)
+    return result
+
+
+def _save(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def section(id, root='.'):
+    """Manifest entry for section ``id``, or None."""
+    for entry in manifest(root)['sections']:
+        if entry['id'] == id:
+            return entry
+    return None
+
+
+def problems(data):
+    """Messages for sections that are missing from one of the places that list them."""
+    out = []
+    for s in data['sections']:
+        missing = []
+        if s['menu'] is None:
+            missing.append('menu entry')
+        if s['title'] is None:
+            missing.append('header title')
+        if s['body'] is None:
+            missing.append('body')
+        for path in (MENU, VIEW):
+            if path not in s['declared']:
+                missing.append(f"section type in {path}")
+        if missing:
+            out.append(f"{s['id']}: no {', '.join(missing)}")
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods.sections')
+    parser.add_argument('--check', action='store_true', help='list sections missing from one of the places')
+    parser.add_argument('--no-cache', action='store_true', help='extract again without reading or writing the cache')
+    args = parser.parse_args(argv)
+
+    data = manifest(cache=not args.no_cache)
+    if not args.check:
+        json.dump(data['sections'], sys.stdout, indent=2)
+        print()
+        return
+    found = problems(data)
+    for message in found:
+        print(message)
+    sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
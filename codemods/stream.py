@@ -0,0 +1,384 @@
+"""Streaming runs over memory-mapped files.
+
+``python3 -m codemods --stream`` runs rules without reading their files into
+memory. Each file is memory-mapped and its anchors are found on the raw bytes.
+Only the whole lines around a match are decoded; for a ``block`` selection
+they are widened until the block closes. The output is written by copying
+the unchanged byte ranges around the edits. Memory use therefore depends on
+the size of the edited regions, not of the file, so large generated files
+such as ``mockData.ts`` or concatenated bundles can be rewritten.
+
+Declared rules (``codemods.dsl``) with a ``match``, ``line`` or ``block``
+selector stream. Any other rule only costs a byte search for its markers.
+If a file contains one of its markers, or the rule declares none, that file
+is read whole and run through the engine as usual. Rules run one after
+another, each on the previous rule's output, which is spooled to an unnamed
+temp file beside the target. Each edit changes the depth of brackets,
+literals and tags in the lines it falls in by some amount (see
+``codemods.validate``); summed over the file, those changes must come out
+even, so a rule may close what an earlier one opened. Changed files are
+published together, and only if they are unchanged on disk and every file
+succeeded.
+
+No rule targets generated files, so name them with ``--all-sources``:
+
+    python3 -m codemods dry-run --stream --all-sources mockData.ts 'dist/*.js'
+"""
+import mmap
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+from .anchors import content_hash, file_hash
+from .dsl import Matcher
+from .engine import Document, Engine, FileResult, RuleError
+from .runner import matched, rules_for, warn_untargeted
+from .transaction import Conflict, Transaction
+from .validate import Problem, errors
+
+SELECTORS = ('match', 'line', 'block')
+# Bytes decoded past a ``block`` anchor at first; doubled while the block is open
+WINDOW = 1 << 16
+# Unchanged bytes copied per write
+_BLOCK = 1 << 20
+_OPENED_AT = re.compile(r' opened at \d+')
+_BRACKET = re.compile(r"^(unclosed|unmatched) '(.)'$")
+_MISMATCH = re.compile(r"^'(.)' closes '(.)' opened at")
+# Inside ``<>...</>``: a tag left open, or one closed that the text did not open
+_TAG = re.compile(r"^(?:</> closes <([^>]*)>|</([^>]*)> closes <>) opened at")
+_OPENERS = {')': '(', ']': '[', '}': '{'}
+
+
+class _Short(Exception):
+    """The decoded window ends before the selection does."""
+
+
+class _Whole(Exception):
+    """A rule needs the whole text of the file."""
+
+
+def streamable(rule):
+    return isinstance(rule.apply, Matcher) and rule.apply.select in SELECTORS
+
+
+def _line_end(data, offset):
+    if offset >= len(data):
+        return len(data)
+    end = data.find(b'\n', offset)
+    return len(data) if end < 0 else end + 1
+
+
+class _Window:
+    """Whole lines ``data[start:end]`` of a mapped file, decoded."""
+
+    def __init__(self, data, start, end):
+        self.data = data
+        self.start = data.rfind(b'\n', 0, start) + 1
+        self.end = _line_end(data, max(start, end - 1))
+        self.text = data[self.start:self.end].decode('utf-8')
+
+    @property
+    def complete(self):
+        return self.end >= len(self.data)
+
+    def grown(self):
+        return _Window(self.data, self.start, self.end + max(WINDOW, self.end - self.start))
+
+    def char(self, offset):
+        """Index in ``text`` of byte ``offset``."""
+        return len(self.data[self.start:offset].decode('utf-8'))
+
+    def byte(self, index):
+        """Byte offset of ``text[index]``."""
+        return self.start + len(self.text[:index].encode('utf-8'))
+
+
+def _select(matcher, window, path, pos):
+    """``(end of the match, edits in window indices)`` for the anchor at byte ``pos``.
+
+    The match end is None where the pattern does not match; the edits are
+    None where nothing is selected.
+    """
+    text = window.text
+    start = window.char(pos)
+    if matcher.pattern is None:
+        end = start + len(matcher.anchor)
+    else:
+        m = matcher.pattern.match(text, start)
+        if m is None:
+            return None, None
+        if m.end() == len(text) and not window.complete:
+            raise _Short
+        start, end = m.span()
+    doc = Document(path, text)
+    try:
+        selected = matcher.selection(doc, start, end)
+    except RuleError:
+        # An unbalanced block may close further on
+        if window.complete:
+            raise
+        raise _Short
+    if selected is None:
+        if matcher.select == 'block' and not window.complete:
+            raise _Short
+        return end, None
+    start, end_ = selected
+    if matcher.lines:
+        start, end_ = doc.line_start(start), doc.line_end(max(start, end_ - 1))
+    return end, matcher.edits(start, end_)
+
+
+def _line_number(data, offset):
+    count = 0
+    for pos in range(0, offset, _BLOCK):
+        count += data[pos:min(offset, pos + _BLOCK)].count(b'\n')
+    return count + 1
+
+
+def _depth(text, path):
+    """How deep ``text`` leaves brackets, literals and tags, as ``{kind: count}``.
+
+    Brackets and literals come from parsing the text as it is. Tags come from
+    parsing it as the children of a ``<>`` fragment, where the tags it closes
+    without opening them show up as well as the ones it leaves open.
+    """
+    depth = Counter()
+    for _, message in errors(text, path):
+        if '<' in message:
+            continue
+        bracket = _BRACKET.match(message)
+        mismatch = _MISMATCH.match(message)
+        if bracket and bracket.group(1) == 'unclosed':
+            depth[bracket.group(2)] += 1
+        elif bracket:
+            depth[_OPENERS[bracket.group(2)]] -= 1
+        elif mismatch:
+            depth[mismatch.group(2)] += 1
+            depth[_OPENERS[mismatch.group(1)]] -= 1
+        else:
+            depth[_OPENED_AT.sub('', message)] += 1
+    if not path.endswith('.ts'):
+        for _, message in errors(f"<>{text}</>", path):
+            tag = _TAG.match(message)
+            if tag and tag.group(1) is not None:
+                depth[f"<{tag.group(1)}>"] += 1
+            elif tag:
+                depth[f"<{tag.group(2)}>"] -= 1
+    return depth
+
+
+def _checked(window, edits, path, balance):
+    """Add to ``balance`` how ``edits`` change the depth of ``window``.
+
+    Line and match windows often cut through brackets and tags, so they are
+    not checked on their own; instead every change in depth is summed per
+    kind, with the first place it happened, and must come out even once
+    every rule has run (``_settle``). An edit that opens a ``<div>`` one rule
+    closes later on is therefore fine.
+    """
+    text = window.text
+    pieces = []
+    pos = 0
+    for start, end, new in sorted(edits, key=lambda edit: edit[0]):
+        pieces.append(text[pos:start])
+        pieces.append(new)
+        pos = end
+    pieces.append(text[pos:])
+    delta = _depth(''.join(pieces), path)
+    delta.subtract(_depth(text, path))
+    for kind, change in delta.items():
+        if change:
+            count, where = balance.get(kind, (0, None))
+            if where is None:
+                problem = Problem(path, text, min(edit[0] for edit in edits), '')
+                where = f"{path}:{_line_number(window.data, window.start) + problem.line - 1}:{problem.column}"
+            balance[kind] = (count + change, where)
+
+
+def _settle(balance):
+    """Raise ``RuleError`` if the edits summed in ``balance`` leave anything unbalanced."""
+    for kind, (count, where) in balance.items():
+        if count:
+            state = 'left open' if count > 0 else 'closed without being opened'
+            raise RuleError(f"rewrite breaks the file at {where}: {abs(count)} {kind} {state}")
+
+
+def matcher_edits(matcher, data, path, balance=None):
+    """``(hits, byte edits)`` that ``matcher`` makes to ``data``, as ``Matcher.__call__`` would.
+
+    How the edits change bracket and tag depth is summed into ``balance``;
+    without one, the edits must come out even by themselves.
+    """
+    own = balance is None
+    if own:
+        balance = {}
+    if matcher.unless and data.find(matcher.unless.encode('utf-8')) >= 0:
+        return 0, []
+    anchor = matcher.anchor.encode('utf-8')
+    spans = 0
+    edits = []
+    pos = data.find(anchor)
+    while pos >= 0:
+        size = WINDOW if matcher.select == 'block' or matcher.pattern is not None else 0
+        window = _Window(data, pos, pos + len(anchor) + size)
+        while True:
+            try:
+                end, found = _select(matcher, window, path, pos)
+                break
+            except _Short:
+                window = window.grown()
+        if end is None:
+            pos = data.find(anchor, pos + 1)
+            continue
+        spans += 1
+        if found:
+            _checked(window, found, path, balance)
+            edits.extend((window.byte(start), window.byte(stop), new) for start, stop, new in found)
+        if matcher.count == 'first':
+            break
+        pos = data.find(anchor, window.byte(end) if matcher.pattern is not None else pos + len(anchor))
+    if not spans and matcher.required:
+        raise RuleError(f"{path}: anchor {matcher.anchor!r} not found")
+
+    # Same order and overlap rules as ``EditBuffer``
+    edits.sort(key=lambda edit: (edit[0], edit[1] > edit[0]))
+    for before, after in zip(edits, edits[1:]):
+        if before[1] > after[0]:
+            raise ValueError(f"edit {after[0]}:{after[1]} overlaps edit {before[0]}:{before[1]}")
+    if own:
+        _settle(balance)
+    return len(edits), edits
+
+
+def chunks(data, edits=()):
+    """Bytes of ``data`` with ``edits`` applied, unchanged ranges copied a block at a time."""
+    pos = 0
+    for start, end, new in edits:
+        yield from _copy(data, pos, start)
+        yield new.encode('utf-8')
+        pos = end
+    yield from _copy(data, pos, len(data))
+
+
+def _copy(data, start, end):
+    for pos in range(start, end, _BLOCK):
+        yield data[pos:min(end, pos + _BLOCK)]
+
+
+def _map(f):
+    if os.fstat(f.fileno()).st_size == 0:
+        # Empty files cannot be mapped
+        return b''
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def stream_file(path, rules, root='.'):
+    """Run ``rules`` over ``path`` streaming; returns ``(FileResult, output)``.
+
+    ``output`` is the mapped new contents, or None if nothing changed. Raises
+    ``_Whole`` if a rule needs the file's whole text.
+    """
+    begin = time.perf_counter()
+    target = os.path.join(root, path)
+    hits = {}
+    spool = None
+    # Depth changes summed over every rule, as one rule may close what another opened
+    balance = {}
+    with open(target, 'rb') as f:
+        data = _map(f)
+    try:
+        for r in rules:
+            if not streamable(r):
+                markers = [a.encode('utf-8') for a in r.anchors]
+                if not markers or any(data.find(m) >= 0 for m in markers):
+                    raise _Whole(r.id)
+                hits[r.id] = 0
+                continue
+            hits[r.id], edits = matcher_edits(r.apply, data, path, balance)
+            if not edits:
+                continue
+            # Each rule reads the previous rule's output
+            nxt = tempfile.TemporaryFile(dir=os.path.dirname(target) or '.')
+            for chunk in chunks(data, edits):
+                nxt.write(chunk)
+            nxt.flush()
+            nxt.seek(0)
+            _close(data, spool)
+            data, spool = _map(nxt), nxt
+        _settle(balance)
+    except BaseException:
+        _close(data, spool)
+        raise
+    res = FileResult(path, hits, spool is not None, time.perf_counter() - begin)
+    if spool is None:
+        _close(data, None)
+        return res, None
+    return res, (data, spool)
+
+
+def _close(data, spool):
+    if isinstance(data, mmap.mmap):
+        data.close()
+    if spool is not None:
+        spool.close()
+
+
+def run(rules, globs=None, root='.', write=True, all_sources=False, out=None):
+    """Stream ``rules`` over the files matched by ``globs``, or each rule's own target.
+
+    Matched files get the rules that target them, or every rule with
+    ``all_sources`` (which also defaults ``globs`` to the app sources); globs
+    matching only untargeted files are reported to ``out``. Changed files are
+    written in one transaction, only if every file succeeded and none changed
+    on disk in the meantime.
+    """
+    if globs or all_sources:
+        paths, skipped = matched(rules, globs, root, all_sources)
+        warn_untargeted(paths, skipped, out)
+        targets = {path: rules_for(rules, path, all_sources) for path in paths}
+    else:
+        targets = Engine(rules, root=root).targets()
+    results = []
+    outputs = {}
+    try:
+        for path, group in targets.items():
+            try:
+                # Hashed before mapping, so a write during the run is a conflict
+                expect = file_hash(os.path.join(root, path)) if write else None
+                res, output = stream_file(path, group, root)
+                if output is not None:
+                    outputs[path] = (output, expect)
+            except _Whole:
+                try:
+                    doc, res = Engine(group, root=root).process(path, group)
+                except (OSError, RuleError) as e:
+                    res = FileResult(path, {}, False, 0.0, error=str(e))
+                else:
+                    if res.changed:
+                        outputs[path] = (res.text, content_hash(res.original))
+            except (OSError, UnicodeDecodeError, ValueError, RuleError) as e:
+                res = FileResult(path, {}, False, 0.0, error=f"{type(e).__name__}: {e}")
+            results.append(res)
+
+        if write and outputs and not any(res.error for res in results):
+            try:
+                with Transaction(root) as txn:
+                    for path, (output, expect) in outputs.items():
+                        if isinstance(output, str):
+                            txn.write(path, output, expect=expect)
+                        else:
+                            txn.write_bytes(path, chunks(output[0]), expect=expect)
+            except Conflict as e:
+                for res in results:
+                    if res.path in e.paths:
+                        res.error = 'changed on disk during the run; nothing written'
+            else:
+                for res in results:
+                    res.written = res.path in outputs
+    finally:
+        for output, _ in outputs.values():
+            if not isinstance(output, str):
+                _close(*output)
+    return results
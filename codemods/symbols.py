@@ -0,0 +1,277 @@
+"""Persistent index of identifiers, JSX element names and className tokens.
+
+Every source file is tokenized once (``codemods.jsx`` with identifiers on)
+and its symbols are stored in SQLite as ``(kind, name, file, offset)`` rows:
+
+- ``def``: a name declared by ``const``/``let``/``var`` (destructuring
+  included), ``function``, ``class``, ``interface``, ``type`` or ``enum``
+- ``ref``: any other identifier in code
+- ``element``: a JSX element name
+- ``class``: a token of a literal className value (see ``jsx.class_literals``)
+
+``refresh`` re-tokenizes only files whose size or mtime changed, and of those
+only the ones whose content hash changed, so keeping the index current costs
+a ``stat`` per file. Queries are indexed lookups:
+
+    python3 -m codemods.symbols class border-gray-700
+    python3 -m codemods.symbols def handleSaveLocations
+    python3 -m codemods.symbols element PermissionsManagerWindow --files
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from .anchors import content_hash
+from .cache import DEFAULT_DIR as CACHE_DIR
+from .jsx import class_literals, parse
+from .runner import DEFAULT_GLOBS, expand
+
+DEFAULT_PATH = os.path.join(CACHE_DIR, 'symbols.sqlite')
+KINDS = ('def', 'ref', 'element', 'class')
+# Bump when extraction changes; older indexes are rebuilt
+SCHEMA_VERSION = 1
+
+_DECLARATIONS = {'const', 'let', 'var', 'function', 'class', 'interface', 'type', 'enum'}
+_KEYWORDS = _DECLARATIONS | {
+    'as', 'async', 'await', 'break', 'case', 'catch', 'continue', 'default', 'delete', 'do',
+    'else', 'export', 'extends', 'false', 'finally', 'for', 'from', 'if', 'implements',
+    'import', 'in', 'instanceof', 'keyof', 'new', 'null', 'of', 'return', 'switch', 'this',
+    'throw', 'true', 'try', 'typeof', 'undefined', 'void', 'while', 'yield',
+}
+_TOKEN = re.compile(r'\S+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    kind INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    file INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name, kind);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file);
+"""
+
+
+def _declared(text, identifiers):
+    """Offsets of the identifiers that ``identifiers`` (from the parser) declares."""
+    declared = set()
+    for k, (offset, name) in enumerate(identifiers[:-1]):
+        if name not in _DECLARATIONS:
+            continue
+        end = offset + len(name)
+        nxt = identifiers[k + 1][0]
+        gap = text[end:nxt].strip()
+        if not gap:
+            declared.add(nxt)
+        elif gap in ('[', '{') and name in ('const', 'let', 'var'):
+            # Destructuring: every binding up to the matching bracket, not the keys of "key: name"
+            close = {'[': ']', '{': '}'}[gap]
+            depth = 0
+            i = text.index(gap, end)
+            while i < len(text):
+                if text[i] in '[{':
+                    depth += 1
+                elif text[i] in ']}':
+                    depth -= 1
+                    if not depth:
+                        break
+                i += 1
+            j = k + 1
+            while j < len(identifiers) and identifiers[j][0] < i:
+                offset2, name2 = identifiers[j]
+                if close == ']' or not text.startswith(':', offset2 + len(name2)):
+                    declared.add(offset2)
+                j += 1
+    return declared
+
+
+def extract(text, path=''):
+    """``(kind, name, offset)`` for every symbol in ``text``."""
+    tree = parse(text, jsx=not path.endswith('.ts'), identifiers=True)
+    declared = _declared(text, tree.identifiers)
+    rows = []
+    for offset, name in tree.identifiers:
+        if offset in declared:
+            rows.append((0, name, offset))
+        elif name not in _KEYWORDS:
+            rows.append((1, name, offset))
+    for el in tree.elements:
+        if el.name:
+            rows.append((2, el.name, el.start + 1))
+        attr = el.attrs.get('className')
+        if attr is not None:
+            for start, end in class_literals(text, attr):
+                for m in _TOKEN.finditer(text, start, end):
+                    rows.append((3, m.group(), m.start()))
+    return rows
+
+
+def _extract(args):
+    path, text = args
+    return extract(text, path)
+
+
+class Location:
+    __slots__ = ('kind', 'name', 'path', 'offset')
+
+    def __init__(self, kind, name, path, offset):
+        self.kind = kind
+        self.name = name
+        self.path = path
+        self.offset = offset
+
+    def __repr__(self):
+        return f"Location({self.kind}, {self.name!r}, {self.path}:{self.offset})"
+
+
+class SymbolIndex:
+    """On-disk symbol index for the files under ``root``."""
+
+    def __init__(self, path=DEFAULT_PATH, root='.'):
+        self.root = root
+        self.path = path if os.path.isabs(path) else os.path.join(root, path)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            with self.db:
+                self.db.execute('DROP TABLE IF EXISTS symbols')
+                self.db.execute('DROP TABLE IF EXISTS files')
+                self.db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def refresh(self, globs=None, jobs=None):
+        """Bring the index up to date with the files matched by ``globs``; returns the paths re-indexed.
+
+        Files no longer matched are dropped from the index.
+        """
+        paths = expand(globs or DEFAULT_GLOBS, self.root)
+        known = {path: (id, mtime_ns, size, digest) for id, path, mtime_ns, size, digest
+                 in self.db.execute('SELECT id, path, mtime_ns, size, hash FROM files')}
+        changed = []
+        with self.db:
+            for path in paths:
+                full = os.path.join(self.root, path)
+                st = os.stat(full)
+                row = known.get(path)
+                if row is not None and row[1:3] == (st.st_mtime_ns, st.st_size):
+                    continue
+                with open(full, 'r') as f:
+                    text = f.read()
+                digest = content_hash(text)
+                if row is not None and row[3] == digest:
+                    # Touched, not changed
+                    self.db.execute('UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?',
+                                    (st.st_mtime_ns, st.st_size, row[0]))
+                    continue
+                changed.append((path, text, (st.st_mtime_ns, st.st_size, digest)))
+
+        jobs = jobs or os.cpu_count() or 1
+        work = [(path, text) for path, text, _ in changed]
+        if jobs <= 1 or len(work) <= 4:
+            extracted = map(_extract, work)
+        else:
+            with ProcessPoolExecutor(jobs) as pool:
+                extracted = list(pool.map(_extract, work, chunksize=4))
+
+        with self.db:
+            for (path, _, stamp), rows in zip(changed, extracted):
+                row = known.get(path)
+                if row is not None:
+                    file_id = row[0]
+                    self.db.execute('DELETE FROM symbols WHERE file = ?', (file_id,))
+                    self.db.execute('UPDATE files SET mtime_ns = ?, size = ?, hash = ? WHERE id = ?',
+                                    stamp + (file_id,))
+                else:
+                    file_id = self.db.execute('INSERT INTO files (mtime_ns, size, hash, path) VALUES (?, ?, ?, ?)',
+                                              stamp + (path,)).lastrowid
+                self.db.executemany('INSERT INTO symbols (kind, name, file, offset) VALUES (?, ?, ?, ?)',
+                                    [(kind, name, file_id, offset) for kind, name, offset in rows])
+            for path in set(known).difference(paths):
+                self.db.execute('DELETE FROM symbols WHERE file = ?', (known[path][0],))
+                self.db.execute('DELETE FROM files WHERE id = ?', (known[path][0],))
+        return [path for path, _, _ in changed]
+
+    def find(self, name, kind=None):
+        """Every ``Location`` of ``name``, optionally of one kind, by path and offset."""
+        query = ('SELECT s.kind, f.path, s.offset FROM symbols s JOIN files f ON f.id = s.file '
+                 'WHERE s.name = ?')
+        args = [name]
+        if kind is not None:
+            query += ' AND s.kind = ?'
+            args.append(KINDS.index(kind))
+        query += ' ORDER BY f.path, s.offset'
+        return [Location(KINDS[k], name, path, offset) for k, path, offset in self.db.execute(query, args)]
+
+    def files(self, name, kind=None):
+        """Paths using ``name``, optionally as one kind of symbol."""
+        query = 'SELECT DISTINCT f.path FROM symbols s JOIN files f ON f.id = s.file WHERE s.name = ?'
+        args = [name]
+        if kind is not None:
+            query += ' AND s.kind = ?'
+            args.append(KINDS.index(kind))
+        return [path for path, in self.db.execute(query + ' ORDER BY f.path', args)]
+
+    def definitions(self, name):
+        return self.find(name, 'def')
+
+    def with_class(self, token):
+        """Paths whose className values use ``token``."""
+        return self.files(token, 'class')
+
+
+def _line(root, path, offset, texts):
+    if path not in texts:
+        with open(os.path.join(root, path), 'r') as f:
+            texts[path] = f.read()
+    return texts[path].count('\n', 0, offset) + 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods.symbols')
+    parser.add_argument('kind', choices=KINDS + ('any',), help='kind of symbol to look up')
+    parser.add_argument('name')
+    parser.add_argument('--files', action='store_true', help='list matching files only')
+    parser.add_argument('--no-refresh', action='store_true', help='query the index as it is')
+    parser.add_argument('-j', '--jobs', type=int, help='worker processes for re-indexing')
+    args = parser.parse_args(argv)
+
+    kind = None if args.kind == 'any' else args.kind
+    with SymbolIndex() as index:
+        if not args.no_refresh:
+            index.refresh(jobs=args.jobs)
+        if args.files:
+            found = index.files(args.name, kind)
+            for path in found:
+                print(path)
+        else:
+            found = index.find(args.name, kind)
+            texts = {}
+            for loc in found:
+                print(f"{loc.path}:{_line(index.root, loc.path, loc.offset, texts)}: {loc.kind}")
+    sys.exit(0 if found else 1)
+
+
+if __name__ == '__main__':
+    main()
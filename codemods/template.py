@@ -0,0 +1,156 @@
+"""Compiled text templates for generated TSX.
+
+Templates use ``[[...]]`` tags, which never occur in TSX, so the JSX braces
+and template literals around them need no escaping::
+
+    [[for source in sources]]
+    <h4>[[source.label]] Data Source</h4>
+    [[if not last]]<hr />[[end]]
+    [[end]]
+
+``[[name.attr]]`` inserts a value (attributes, then keys, are looked up on each
+dotted step). ``[[for x in name]]`` repeats its body with ``first`` and
+``last`` set for the current item of the innermost loop; ``[[if name]]``/
+``[[if not name]]`` and an optional ``[[else]]`` select text. Each block
+closes with ``[[end]]``. A line holding nothing but a block tag is dropped
+entirely.
+
+A template is compiled once into a Python function that appends literal
+chunks and values to a list; ``template(source)`` caches the compiled form by
+source text, and ``render_all`` renders many contexts with it in one go.
+"""
+import re
+
+_TAG = re.compile(r'\[\[\s*(.*?)\s*\]\]')
+_NAME = re.compile(r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*$')
+_FOR = re.compile(r'for\s+([A-Za-z_]\w*)\s+in\s+(\S+)$')
+_IF = re.compile(r'if\s+(not\s+)?(\S+)$')
+
+_compiled = {}
+
+
+class TemplateError(ValueError):
+    """A template could not be compiled."""
+
+
+def _lookup(obj, attr):
+    try:
+        return getattr(obj, attr)
+    except AttributeError:
+        return obj[attr]
+
+
+def _tokens(source):
+    """``(kind, value)`` pairs: ``text`` chunks and the stripped body of each tag."""
+    pos = 0
+    for m in _TAG.finditer(source):
+        start, end = m.span()
+        body = m.group(1)
+        if body in ('else', 'end') or not _NAME.match(body):
+            # Block tags alone on their line take the whole line with them
+            line_start = source.rfind('\n', 0, start) + 1
+            line_end = source.find('\n', end)
+            line_end = len(source) if line_end < 0 else line_end + 1
+            if line_start >= pos and not source[line_start:start].strip() and not source[end:line_end].strip():
+                start, end = line_start, line_end
+        if start > pos:
+            yield 'text', source[pos:start]
+        yield 'tag', body
+        pos = end
+    if pos < len(source):
+        yield 'text', source[pos:]
+
+
+class Template:
+    def __init__(self, source, name='<template>'):
+        self.source = source
+        self.name = name
+        namespace = {'_lookup': _lookup}
+        exec(compile(self._codegen(), name, 'exec'), namespace)
+        self._render = namespace['render']
+
+    def _codegen(self):
+        lines = ['def render(ctx):', '    out = []', '    append = out.append']
+        # Template name -> local variable, innermost loop last. Locals are
+        # numbered per loop, so nested loops keep their own first/last and a
+        # loop variable cannot shadow out, append, ctx or a builtin
+        scopes = []
+        blocks = []
+        depth = 1
+        counter = 0
+
+        def expr(name):
+            head, *rest = name.split('.')
+            code = next((s[head] for s in reversed(scopes) if head in s), f"ctx[{head!r}]")
+            for attr in rest:
+                code = f"_lookup({code}, {attr!r})"
+            return code
+
+        def emit(code):
+            lines.append('    ' * depth + code)
+
+        for kind, value in _tokens(self.source):
+            if kind == 'text':
+                emit(f"append({value!r})")
+                continue
+            m = _FOR.match(value)
+            if m:
+                var, seq = m.groups()
+                counter += 1
+                items = f"_items{counter}"
+                emit(f"{items} = list({expr(seq)})")
+                emit(f"for _i{counter}, _v{counter} in enumerate({items}):")
+                depth += 1
+                emit(f"_first{counter} = _i{counter} == 0")
+                emit(f"_last{counter} = _i{counter} == len({items}) - 1")
+                scopes.append({'first': f"_first{counter}", 'last': f"_last{counter}", var: f"_v{counter}"})
+                blocks.append('for')
+                continue
+            m = _IF.match(value)
+            if m:
+                negate, name = m.groups()
+                emit(f"if {'not ' if negate else ''}{expr(name)}:")
+                depth += 1
+                emit('pass')
+                blocks.append('if')
+                continue
+            if value == 'else':
+                if not blocks or blocks[-1] != 'if':
+                    raise TemplateError(f"{self.name}: [[else]] outside [[if]]")
+                depth -= 1
+                emit('else:')
+                depth += 1
+                emit('pass')
+                blocks[-1] = 'else'
+                continue
+            if value == 'end':
+                if not blocks:
+                    raise TemplateError(f"{self.name}: unmatched [[end]]")
+                if blocks.pop() == 'for':
+                    scopes.pop()
+                depth -= 1
+                continue
+            if _NAME.match(value):
+                emit(f"append(str({expr(value)}))")
+                continue
+            raise TemplateError(f"{self.name}: cannot parse tag [[{value}]]")
+        if blocks:
+            raise TemplateError(f"{self.name}: [[{blocks[-1]}]] is never closed")
+        lines.append("    return ''.join(out)")
+        return '\n'.join(lines) + '\n'
+
+    def render(self, **context):
+        return self._render(context)
+
+    def render_all(self, contexts):
+        """Render each context dict, in order."""
+        render = self._render
+        return [render(c) for c in contexts]
+
+
+def template(source, name='<template>'):
+    """Compiled ``Template`` for ``source``, shared between calls with the same text."""
+    compiled = _compiled.get(source)
+    if compiled is None:
+        compiled = _compiled[source] = Template(source, name)
+    return compiled
@@ -0,0 +1,287 @@
+"""All-or-nothing writes of several files.
+
+A ``Transaction`` stages each new file in a temp file next to its target (so
+the final rename never crosses a filesystem), fsyncs them all, then publishes
+them with ``os.replace``. Before publishing, it snapshots every target it is
+about to replace as a hard link under ``.codemods-txn/<id>/`` and fsyncs a
+journal listing them. Renaming a staged file over the target leaves the old
+inode, and so the snapshot, untouched, which makes rollback a rename back.
+A hard link costs no copying; a copy is made only where linking fails.
+
+If the process dies while publishing, ``recover`` (run at the start of every
+commit) finds its journal and restores the snapshots. Transaction directories
+are named after the owning process, so a live run is never rolled back.
+
+Writes are optimistic: a file staged with ``expect=<content hash>`` is only
+published if the target still has that content, checked against the snapshot
+and again just before the rename. No lock is taken, so concurrent runs and
+``git-sync.sh`` never wait on each other. A changed target raises
+``Conflict`` with nothing published.
+"""
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+from .anchors import file_hash
+
+TXN_DIR = '.codemods-txn'
+
+
+class Conflict(Exception):
+    """Targets changed on disk after they were read; nothing was published."""
+
+    def __init__(self, paths):
+        super().__init__(f"changed on disk since they were read: {', '.join(paths)}")
+        self.paths = paths
+
+
+def _digest(path):
+    try:
+        return file_hash(path)
+    except FileNotFoundError:
+        return None
+
+
+def _identity(st):
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _snapshot(path, snap):
+    os.makedirs(os.path.dirname(snap), exist_ok=True)
+    try:
+        os.link(path, snap)
+    except OSError:
+        shutil.copy2(path, snap)
+
+
+def _restore(root, directory, journal):
+    """Put every journalled target back as it was; returns the paths touched."""
+    restored = []
+    for path, existed in journal:
+        target = os.path.join(root, path)
+        snap = os.path.join(directory, 'snap', path)
+        if existed and os.path.exists(snap):
+            os.replace(snap, target)
+            restored.append(path)
+        elif not existed and os.path.exists(target):
+            os.unlink(target)
+            restored.append(path)
+    return restored
+
+
+def _alive(pid):
+    try:
+        pid = int(pid)
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def recover(root='.'):
+    """Roll back transactions left half-published by a crash; returns the restored paths."""
+    base = os.path.join(root, TXN_DIR)
+    restored = []
+    try:
+        names = sorted(os.listdir(base))
+    except OSError:
+        return restored
+    for name in names:
+        if _alive(name.split('-', 1)[0]):
+            # Another run is publishing right now
+            continue
+        directory = os.path.join(base, name)
+        try:
+            with open(os.path.join(directory, 'journal.json'), 'r') as f:
+                journal = json.load(f)
+        except (OSError, ValueError):
+            # No journal: it never started publishing
+            journal = []
+        restored.extend(_restore(root, directory, journal))
+        shutil.rmtree(directory, ignore_errors=True)
+    return restored
+
+
+class Transaction:
+    """Stage files with ``write``; ``commit`` publishes all of them or none.
+
+    As a context manager it commits on success and discards staged files if
+    the block raises.
+    """
+
+    def __init__(self, root='.'):
+        self.root = root
+        self.staged = {}
+        # Content hash each target must still have at commit, where given
+        self.expected = {}
+        self.published = []
+        self.directory = None
+        self.journal = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                self.commit()
+            except BaseException:
+                self.abort()
+                raise
+        else:
+            self.abort()
+        return False
+
+    def write(self, path, text, expect=None):
+        """Stage ``text`` as the new contents of ``path``; nothing is visible until commit.
+
+        With ``expect``, the commit is a compare-and-swap: it raises ``Conflict``
+        unless ``path`` still hashes to ``expect`` (``content_hash`` of its text).
+        """
+        self._stage(path, 'w', (text,), expect)
+
+    def write_bytes(self, path, chunks, expect=None):
+        """Stage the concatenated byte ``chunks`` as ``path``, without holding them all at once."""
+        self._stage(path, 'wb', chunks, expect)
+
+    def _stage(self, path, mode, chunks, expect):
+        target = os.path.join(self.root, path)
+        directory = os.path.dirname(target) or '.'
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, mode) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            try:
+                # Keep the target's permissions rather than mkstemp's 0600
+                os.chmod(tmp, os.stat(target).st_mode & 0o7777)
+            except FileNotFoundError:
+                os.chmod(tmp, 0o644)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        old = self.staged.pop(path, None)
+        if old is not None:
+            os.unlink(old)
+        self.staged[path] = tmp
+        self.expected[path] = expect
+
+    def discard(self, path):
+        """Unstage ``path``."""
+        tmp = self.staged.pop(path, None)
+        self.expected.pop(path, None)
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+
+    def abort(self):
+        """Discard everything staged; targets are untouched."""
+        for path in list(self.staged):
+            self.discard(path)
+
+    def commit(self):
+        """Publish every staged file, rolling all of them back if any rename fails.
+
+        Raises ``Conflict`` if a target no longer has its expected content; the
+        staged files are kept, so the caller can restage those paths and retry.
+        """
+        if not self.staged:
+            return []
+        recover(self.root)
+        changed = [p for p, digest in self.expected.items()
+                   if digest is not None and _digest(os.path.join(self.root, p)) != digest]
+        if changed:
+            raise Conflict(changed)
+        # Durable contents first, in one sweep, before any target changes
+        for tmp in self.staged.values():
+            fd = os.open(tmp, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        self.directory = os.path.join(self.root, TXN_DIR, f"{os.getpid()}-{uuid.uuid4().hex}")
+        os.makedirs(self.directory)
+        identities = {}
+        try:
+            for path in self.staged:
+                target = os.path.join(self.root, path)
+                existed = os.path.exists(target)
+                if existed:
+                    identities[path] = _identity(os.stat(target))
+                    snap = os.path.join(self.directory, 'snap', path)
+                    _snapshot(target, snap)
+                    expect = self.expected.get(path)
+                    if expect is not None and _digest(snap) != expect:
+                        raise Conflict([path])
+                self.journal.append((path, existed))
+            journal = os.path.join(self.directory, 'journal.json')
+            with open(journal, 'w') as f:
+                json.dump(self.journal, f)
+                f.flush()
+                os.fsync(f.fileno())
+            _fsync_dir(self.directory)
+
+            for path, tmp in self.staged.items():
+                target = os.path.join(self.root, path)
+                # Last look before the swap: replaced or rewritten since the snapshot?
+                if path in identities and _identity(os.stat(target)) != identities[path]:
+                    raise Conflict([path])
+                os.replace(tmp, target)
+                self.published.append(path)
+        except BaseException:
+            self.rollback()
+            raise
+
+        for directory in {os.path.dirname(os.path.join(self.root, p)) for p in self.published}:
+            _fsync_dir(directory)
+        # Removing the journal is the commit point
+        self._cleanup()
+        self.staged = {}
+        return list(self.published)
+
+    def _cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(self.directory))
+        except OSError:
+            # Other transactions are still in there
+            pass
+
+    def rollback(self):
+        """Undo a partly published commit; every file stays staged for a retry."""
+        published = set(self.published)
+        for path, existed in self.journal:
+            if path not in published:
+                continue
+            target = os.path.join(self.root, path)
+            os.replace(target, self.staged[path])
+            if existed:
+                os.replace(os.path.join(self.directory, 'snap', path), target)
+        self.published = []
+        self.journal = []
+        self._cleanup()
@@ -0,0 +1,222 @@
+"""Watch mode: re-run the rules affected by each save of a target file.
+
+``Watcher`` keeps every target's text, anchor index and, once a rule has
+needed it, element tree resident. When a file changes it finds the edited
+span (common prefix and suffix with the text it knew), patches the anchor
+index by rescanning only around that span, reparses only the elements the
+span falls in, and re-runs just the rules whose markers were added, removed
+or touched by the edit, plus rules that declare no markers. The rules run on
+a document that starts from the patched index and tree. Its own writes are
+recognised and skipped.
+
+Changes come from inotify on Linux, with a stat-polling fallback elsewhere:
+
+    python3 -m codemods.watch
+    python3 -m codemods.watch -n --poll 1.0
+"""
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from .anchors import content_hash, index as anchor_index, update as anchor_update
+from .buffer import changed_span
+from .engine import Document, Engine, FileResult, RuleError, load_plugins, report
+from .jsx import update as tree_update
+from .transaction import Conflict
+
+# inotify(7) event masks
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+_EVENT = struct.Struct('iIII')
+
+
+class Inotify:
+    """Changed files under a set of directories, from the kernel's inotify API."""
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs = {}
+        # Watch directories, not files: editors often save by renaming over the file
+        for directory in sorted({os.path.dirname(p) or '.' for p in paths}):
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory),
+                                        IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self.dirs[wd] = directory
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        changed = set()
+        while ready:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                wd, _, _, size = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size:pos + _EVENT.size + size].rstrip(b'\0')
+                pos += _EVENT.size + size
+                if name and wd in self.dirs:
+                    changed.add(os.path.normpath(os.path.join(self.dirs[wd], os.fsdecode(name))))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Poller:
+    """Changed files found by comparing ``stat`` results every ``interval`` seconds."""
+
+    def __init__(self, paths, interval=0.5):
+        self.paths = list(paths)
+        self.interval = interval
+        self.stats = {p: self._stat(p) for p in self.paths}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        changed = set()
+        for path in self.paths:
+            stat = self._stat(path)
+            if stat != self.stats[path]:
+                self.stats[path] = stat
+                changed.add(os.path.normpath(path))
+        return changed
+
+    def close(self):
+        pass
+
+
+class Watcher:
+    def __init__(self, rules, root='.', write=True):
+        self.engine = Engine(rules, root=root)
+        self.targets = self.engine.targets()
+        self.write = write
+        # path -> (text, anchor index, element tree or None) as last read or written
+        self.files = {}
+
+    def affected(self, path, old, new, span):
+        """Rules for ``path`` whose markers the edit ``span`` could have changed."""
+        start, old_end, new_end = span
+        rules = []
+        for r in self.targets[path]:
+            if not r.anchors or any(old.touches(m, start, old_end) or new.touches(m, start, new_end)
+                                    for m in r.anchors):
+                rules.append(r)
+        return rules
+
+    def refresh(self, path):
+        """Re-run the rules affected since ``path`` was last seen; None if nothing changed."""
+        engine = self.engine
+        text = engine.read(path)
+        known = self.files.get(path)
+        if known is not None and known[0] == text:
+            return None
+        started = time.perf_counter()
+        if known is None:
+            rules = self.targets[path]
+            anchors, tree = anchor_index(text, engine.anchors), None
+        else:
+            old, old_anchors, tree = known
+            span = changed_span(old, text)
+            start, old_end, new_end = span
+            edits = [(start, old_end, text[start:new_end])]
+            anchors = anchor_update(old_anchors, text, edits, engine.anchors)
+            if tree is not None:
+                tree = tree_update(tree, text, edits, jsx=not path.endswith('.ts'))
+            rules = self.affected(path, old_anchors, anchors, span)
+
+        doc = Document(path, text, anchors=engine.anchors, index=anchors, tree=tree)
+        hits = engine.apply(doc, rules)
+        engine.check(doc)
+        res = FileResult(path, hits, doc.changed, time.perf_counter() - started)
+        if res.changed and self.write:
+            engine.write(path, doc.text, expect=content_hash(text))
+            res.written = True
+        if res.written or not res.changed:
+            self.files[path] = (doc.text,) + doc.resident()
+        else:
+            # The tree was moved on to edits that were not written
+            self.files[path] = (text, anchors, None)
+        return res
+
+    def run(self, source=None, timeout=1.0, out=None):
+        """Process every target once, then each change ``source`` reports until interrupted."""
+        root = self.engine.root
+        paths = {os.path.normpath(os.path.join(root, p)): p for p in self.targets}
+        if source is None:
+            source = watch_source(list(paths))
+        try:
+            self._report([self._refresh(p) for p in self.targets], out)
+            while True:
+                changed = sorted(paths[p] for p in source.wait(timeout) if p in paths)
+                results = [self._refresh(p) for p in changed]
+                self._report([res for res in results if res is not None], out)
+        finally:
+            source.close()
+
+    def _refresh(self, path):
+        try:
+            return self.refresh(path)
+        except (OSError, RuleError, Conflict) as e:
+            # Keep watching: the next save may fix it, and a conflicting write
+            # is reported as a change of its own
+            self.files.pop(path, None)
+            return FileResult(path, {}, False, 0.0, error=str(e))
+
+    def _report(self, results, out):
+        results = [res for res in results if res is not None]
+        if results:
+            report(results, out=out)
+            (out or sys.stdout).flush()
+
+
+def watch_source(paths, interval=None):
+    """inotify when available, else polling every ``interval`` (default 0.5 s)."""
+    if interval is None and sys.platform.startswith('linux'):
+        try:
+            return Inotify(paths)
+        except (OSError, AttributeError):
+            pass
+    return Poller(paths, interval or 0.5)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m codemods.watch')
+    parser.add_argument('-r', '--rule', action='append', dest='rules', help='rule id to run (repeatable)')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='report edits without writing')
+    parser.add_argument('--poll', type=float, metavar='SECONDS', help='poll instead of using inotify')
+    args = parser.parse_args(argv)
+
+    rules = load_plugins()
+    if args.rules:
+        rules = [r for r in rules if r.id in args.rules]
+    watcher = Watcher(rules, write=not args.dry_run)
+    paths = [os.path.normpath(p) for p in watcher.targets]
+    try:
+        watcher.run(watch_source(paths, args.poll))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
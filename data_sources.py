@@ -0,0 +1,125 @@
+"""Data sources offered on the Settings "Data Source" page, and the section that toggles them.
+
+Each source is one spec line; ``data_source_section`` renders the whole
+section from the compiled template, so adding a source needs no new JSX and
+no rule version bump: cached results are keyed by a digest of the plugin and
+the modules it imports, this one included.
+"""
+from collections import namedtuple
+
+from codemods.template import template
+
+DataSource = namedtuple('DataSource', 'key label description')
+
+# localStorage holds each toggle as dataSource_<key>
+DATA_SOURCES = [
+    DataSource('staff', 'Staff', 'instructors and staff'),
+    DataSource('trainees', 'Trainees', 'trainees and students'),
+    DataSource('courses', 'Courses', 'courses and syllabi'),
+]
+
+SECTION = '''
+                      {/* Data Source Settings */}
+                      {activeSection === 'data-source' && (
+                          <div className="space-y-6">
+                              {/* Error Tracking Log */}
+                              <div className="bg-gray-800 rounded-lg p-4 border border-gray-700">
+                                  <h3 className="text-lg font-semibold text-white mb-3">Data Source Configuration</h3>
+                                  <p className="text-sm text-gray-400 mb-4">
+                                      Configure which data sources to use for different data types. 
+                                      Toggle switches to enable/disable database sources.
+                                  </p>
+                                  
+[[for source in sources]]
+                                  {/* [[source.label]] Toggle */}
+                                  <div className="[[if last]]flex justify-between items-center[[else]]flex justify-between items-center mb-4 pb-4 border-b border-gray-700[[end]]">
+                                      <div>
+                                          <h4 className="text-white font-medium">[[source.label]] Data Source</h4>
+                                          <p className="text-sm text-gray-400">Use database for [[source.description]]</p>
+                                      </div>
+                                      <button
+                                          onClick={() => {
+                                              try {
+                                                  console.log('[Data Source] Toggling [[source.key]] data source');
+                                                  const newValue = !localStorage.getItem('dataSource_[[source.key]]');
+                                                  localStorage.setItem('dataSource_[[source.key]]', newValue ? 'true' : 'false');
+                                                  console.log('[Data Source] [[source.label]] data source set to:', newValue);
+                                                  onShowSuccess(`[[source.label]] data source ${newValue ? 'enabled' : 'disabled'}`);
+                                                  // Force re-render
+                                                  window.dispatchEvent(new Event('storage'));
+                                              } catch (error) {
+                                                  console.error('[Data Source ERROR] Failed to toggle [[source.key]] data source:', error);
+                                                  alert('Failed to update [[source.key]] data source: ' + error.message);
+                                              }
+                                          }}
+                                          className={`relative inline-flex h-6 w-11 items-center rounded-full transition-colors focus:outline-none focus:ring-2 focus:ring-sky-500 focus:ring-offset-2 ${
+                                              localStorage.getItem('dataSource_[[source.key]]') === 'true' ? 'bg-green-600' : 'bg-gray-600'
+                                          }`}
+                                      >
+                                          <span
+                                              className={`inline-block h-4 w-4 transform rounded-full bg-white transition-transform ${
+                                                  localStorage.getItem('dataSource_[[source.key]]') === 'true' ? 'translate-x-6' : 'translate-x-1'
+                                              }`}
+                                          />
+                                      </button>
+                                  </div>
+
+[[end]]
+                                  {/* Current State Display */}
+                                  <div className="mt-6 p-4 bg-gray-900 rounded-lg border border-gray-700">
+                                      <h5 className="text-sm font-semibold text-gray-300 mb-3">Current Configuration</h5>
+                                      <div className="space-y-2 text-sm">
+[[for source in sources]]
+                                          <div className="flex justify-between">
+                                              <span className="text-gray-400">[[source.label]]:</span>
+                                              <span className={localStorage.getItem('dataSource_[[source.key]]') === 'true' ? 'text-green-400' : 'text-gray-500'}>
+                                                  {localStorage.getItem('dataSource_[[source.key]]') === 'true' ? 'Database (Enabled)' : 'Mock (Disabled)'}
+                                              </span>
+                                          </div>
+[[end]]
+                                      </div>
+                                  </div>
+
+                                  {/* Reset Button */}
+                                  <div className="mt-6">
+                                      <button
+                                          onClick={() => {
+                                              try {
+                                                  console.log('[Data Source] Resetting all data sources to database');
+[[for source in sources]]
+                                                  localStorage.setItem('dataSource_[[source.key]]', 'true');
+[[end]]
+                                                  console.log('[Data Source] All data sources reset to database');
+                                                  onShowSuccess('All data sources reset to database');
+                                                  // Force re-render
+                                                  window.dispatchEvent(new Event('storage'));
+                                              } catch (error) {
+                                                  console.error('[Data Source ERROR] Failed to reset data sources:', error);
+                                                  alert('Failed to reset data sources: ' + error.message);
+                                              }
+                                          }}
+                                          className="w-full px-4 py-2 bg-sky-600 hover:bg-sky-700 text-white rounded-lg transition-colors font-medium"
+                                      >
+                                          Reset All to Database
+                                      </button>
+                                  </div>
+
+                                  {/* Debug Info */}
+                                  <div className="mt-6 p-4 bg-yellow-900/20 rounded-lg border border-yellow-600/30">
+                                      <h5 className="text-sm font-semibold text-yellow-400 mb-2">Debug Information</h5>
+                                      <div className="text-xs text-yellow-200/80 space-y-1 font-mono">
+                                          <div>Active Section: {activeSection || 'N/A'}</div>
+                                          <div>LocalStorage Available: {typeof localStorage !== 'undefined' ? 'Yes' : 'No'}</div>
+[[for source in sources]]
+                                          <div>[[source.label]] Value: {localStorage.getItem('dataSource_[[source.key]]') || 'null'}</div>
+[[end]]
+                                      </div>
+                                  </div>
+                              </div>
+                          </div>
+                      )}
+'''
+
+
+def data_source_section(sources=DATA_SOURCES):
+    return template(SECTION, 'data_source_section').render(sources=sources)
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
+from codemods import define, run
+from codemods.sections import VIEW, manifest
 
-with open('components/SettingsView.tsx', 'r') as f:
-    content = f.read()
+# One title line for each section SettingsView declares, in menu order
+titles = ''.join(f"                              {{activeSection === '{s['id']}' && '{s['title']}'}}\n"
+                 for s in manifest()['sections'] if s['title'] and VIEW in s['declared'])
 
 # Find and replace the return statement structure
 old_structure = '''    return (
@@ -21,17 +24,7 @@ new_structure = '''    return (
                   <header className="flex justify-between items-start mb-6">
                       <div>
                           <h2 className="text-2xl font-bold text-white mb-2">
-                              {activeSection === 'scoring-matrix' && 'Scoring Matrix'}
-                              {activeSection === 'location' && 'Location'}
-                              {activeSection === 'units' && 'Units'}
-                              {activeSection === 'sct-events' && 'SCT Events'}
-                              {activeSection === 'currencies' && 'Currencies'}
-                              {activeSection === 'data-loaders' && 'Data Loaders'}
-                              {activeSection === 'event-limits' && 'Event Limits'}
-                              {activeSection === 'permissions' && 'Permissions Manager'}
-                          </h2>'''
-
-content = content.replace(old_structure, new_structure)
+''' + titles + '''                          </h2>'''
 
 # Fix the closing of the permission warning and header
 old_header_close = '''                       )}
@@ -43,12 +36,18 @@ new_header_close = '''                       )}
                       <AuditButton pageName="Settings" />
                   </header>'''
 
-content = content.replace(old_header_close, new_header_close)
-
 # Remove duplicate h2 headers inside each section
-content = content.replace('<div className="p-4 flex justify-between items-center border-b border-gray-700">\n                               <h2 className="text-lg font-semibold text-gray-200">Scoring Matrix</h2>\n                           </div>\n                           <div className="p-4 grid grid-cols-2 gap-3">', '<div className="grid grid-cols-2 gap-4">')
+old_scoring_header = '<div className="p-4 flex justify-between items-center border-b border-gray-700">\n                               <h2 className="text-lg font-semibold text-gray-200">Scoring Matrix</h2>\n                           </div>\n                           <div className="p-4 grid grid-cols-2 gap-3">'
+new_scoring_header = '<div className="grid grid-cols-2 gap-4">'
+
+
+define('components/SettingsView.tsx', 'fix_settings_header', anchor=old_structure, text=new_structure)
+# The new close adds the </div> of the <div> opened by new_structure: skip it
+# while the old bare <header> is still there
+define('components/SettingsView.tsx', 'fix_settings_header_close', version=2, anchor=old_header_close,
+       text=new_header_close, unless='                <header>\n')
+define('components/SettingsView.tsx', 'remove_scoring_matrix_header', anchor=old_scoring_header, text=new_scoring_header)
 
-with open('components/SettingsView.tsx', 'w') as f:
-    f.write(content)
 
-print("Layout fixed successfully")
\ No newline at end of file
+if __name__ == '__main__':
+    run(__name__)
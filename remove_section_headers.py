@@ -1,62 +1,39 @@
 #!/usr/bin/env python3
-import re
+from codemods import rule, run
+from codemods.classes import ClassRewrite, rewrite_elements
 
-with open('components/SettingsView.tsx', 'r') as f:
-    content = f.read()
+# Same header and title as clean_all_headers, which runs after this and
+# removes every header that still starts with its title
+HEADER_CLASSES = ('p-4', 'flex', 'justify-between', 'items-center', 'border-b', 'border-gray-700')
+TITLE_CLASSES = 'text-lg font-semibold text-gray-200'
 
-# Remove Location section header but keep the edit buttons
-location_old = '''                       {/* Location Window */}
-                       <div className={`bg-gray-800 rounded-lg shadow-lg border border-gray-700 p-6 ${activeSection !== 'location' ? 'hidden' : ''}`}>
-                           <div className="p-4 flex justify-between items-center border-b border-gray-700">
-                               <h2 className="text-lg font-semibold text-gray-200">Location</h2>
-                               {isEditingLocations ? (
-                                   <div className="flex space-x-2">
-                                       <button onClick={handleSaveLocations} className="px-3 py-1 bg-sky-600 text-white rounded-md hover:bg-sky-700 text-xs font-semibold">Save</button>
-                                       <button onClick={handleCancelLocations} className="px-3 py-1 bg-gray-600 text-white rounded-md hover:bg-gray-700 text-xs font-semibold">Cancel</button>
-                                   </div>
-                               ) : (
-                                   <button 
-                                      onClick={handleEditLocations} 
-                                      disabled={!canEditSettings}
-                                      className={`px-3 py-1 rounded-md text-xs font-semibold ${
-                                          canEditSettings 
-                                              ? 'bg-gray-600 text-white hover:bg-gray-700 cursor-pointer' 
-                                              : 'bg-gray-700 text-gray-500 cursor-not-allowed'
-                                      }`}
-                                  >
-                                      Edit
-                                  </button>
-                               )}
-                           </div>
-                           <div className="p-4 space-y-4">'''
+# The header keeps only its edit buttons, spaced from the body instead of bordered
+header = ClassRewrite(element='div', when=HEADER_CLASSES, remove=('p-4', 'border-b', 'border-gray-700'),
+                      add=('mb-4',))
 
-location_new = '''                       {/* Location Window */}
-                       <div className={`bg-gray-800 rounded-lg shadow-lg border border-gray-700 p-6 ${activeSection !== 'location' ? 'hidden' : ''}`}>
-                           <div className="flex justify-between items-center mb-4">
-                               {isEditingLocations ? (
-                                   <div className="flex space-x-2">
-                                       <button onClick={handleSaveLocations} className="px-3 py-1 bg-sky-600 text-white rounded-md hover:bg-sky-700 text-xs font-semibold">Save</button>
-                                       <button onClick={handleCancelLocations} className="px-3 py-1 bg-gray-600 text-white rounded-md hover:bg-gray-700 text-xs font-semibold">Cancel</button>
-                                   </div>
-                               ) : (
-                                   <button 
-                                      onClick={handleEditLocations} 
-                                      disabled={!canEditSettings}
-                                      className={`px-3 py-1 rounded-md text-xs font-semibold ${
-                                          canEditSettings 
-                                              ? 'bg-gray-600 text-white hover:bg-gray-700 cursor-pointer' 
-                                              : 'bg-gray-700 text-gray-500 cursor-not-allowed'
-                                      }`}
-                                  >
-                                      Edit
-                                  </button>
-                               )}
-                           </div>
-                           <div className="space-y-4">'''
 
-content = content.replace(location_old, location_new)
+@rule('components/SettingsView.tsx', anchors=['>Location</h2>'], version=2)
+def remove_location_header(doc):
+    """Remove the Location section's title but keep the edit buttons beside it."""
+    if '>Location</h2>' not in doc.anchors:
+        return 0
+    edits = []
+    headers = []
+    for el in doc.tree.with_class(*HEADER_CLASSES):
+        if el.name != 'div' or not el.children:
+            continue
+        title = el.children[0]
+        if (title.name != 'h2' or title.class_name != TITLE_CLASSES
+                or doc.text[title.open_end:title.close_start] != 'Location'):
+            continue
+        edits.append((doc.line_start(title.start), doc.line_end(title.end), ''))
+        headers.append(el)
 
-with open('components/SettingsView.tsx', 'w') as f:
-    f.write(content)
+    # The inner "p-4 space-y-4" body loses its padding in clean_inner_padding
+    class_edits, _ = rewrite_elements(doc.text, headers, [header])
+    doc.splice(edits + class_edits)
+    return len(headers)
 
-print("Location section header removed")
\ No newline at end of file
+
+if __name__ == '__main__':
+    run(__name__)
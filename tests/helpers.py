@@ -0,0 +1,13 @@
+"""Shared by the tests; pytest puts this directory on ``sys.path``."""
+
+
+def splice(text, edits):
+    """``text`` with sorted, non-overlapping ``(start, end, new)`` edits applied."""
+    out = []
+    pos = 0
+    for start, end, new in edits:
+        out.append(text[pos:start])
+        out.append(new)
+        pos = end
+    out.append(text[pos:])
+    return ''.join(out)
@@ -0,0 +1,60 @@
+import random
+
+from codemods.anchors import index, scanner, update
+from codemods.profiling import counters
+
+from helpers import splice
+
+PATTERNS = ['ab', 'aba', 'b', '// MARK', 'MA']
+
+
+def test_scan_finds_overlapping_occurrences():
+    found = scanner(['aa', 'a']).scan('aaaa')
+    assert found == {'a': [0, 1, 2, 3], 'aa': [0, 1, 2]}
+    assert scanner(['aa']).scan('aaaa', 1, 3) == {'aa': [1]}
+
+
+def test_index_lookups():
+    anchors = index('x // MARK y // MARK', PATTERNS)
+    assert anchors.find('// MARK') == [2, 12]
+    assert anchors.first('// MARK', after=3) == 12
+    assert anchors.first('// MARK', after=13) == -1
+    assert '// MARK' in anchors and 'ab' not in anchors
+    # Markers that were not registered are searched for directly
+    assert anchors.find('y') == [10]
+    assert index('aaaa', ['aa']).distinct('aa') == [0, 2]
+
+
+def test_touches():
+    anchors = index('..MARK..', ['MARK'])
+    assert anchors.touches('MARK', 3, 4)
+    assert anchors.touches('MARK', 4, 4)
+    assert not anchors.touches('MARK', 1, 1)
+    assert not anchors.touches('MARK', 6, 6)
+    assert not anchors.touches('MARK', 6, 8)
+
+
+def test_update_matches_a_full_index():
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = ''.join(rng.choice('ab/ MARK\n') for _ in range(rng.randint(0, 60)))
+        points = sorted(rng.randint(0, len(text)) for _ in range(2 * rng.randint(0, 4)))
+        edits = []
+        for start, end in zip(points[::2], points[1::2]):
+            if not edits or start > edits[-1][1]:
+                edits.append((start, end, ''.join(rng.choice('ab/ MARK') for _ in range(rng.randint(0, 6)))))
+        new = splice(text, edits)
+        moved = update(index(text, PATTERNS), new, edits, PATTERNS)
+        full = index(new, PATTERNS)
+        for p in PATTERNS:
+            assert moved.find(p) == full.find(p), (text, edits, p)
+
+
+def test_lookups_count_the_occurrences_they_return():
+    anchors = index('MARK MARK', ['MARK'])
+    counters.clear()
+    anchors.find('MARK')
+    anchors.first('MARK', after=1)
+    anchors.first('MARK', after=6)
+    assert not anchors.touches('MARK', 4, 5)
+    assert counters['probes'] == 4 and counters['matches'] == 3
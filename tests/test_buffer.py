@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from codemods.buffer import EditBuffer, changed_span, compose
+
+from helpers import splice
+
+
+def test_edits_are_kept_in_order():
+    buffer = EditBuffer('hello world')
+    buffer.replace(6, 11, 'there')
+    buffer.insert(0, '> ')
+    assert buffer.edits == [(0, 0, '> '), (6, 11, 'there')]
+    assert buffer.materialize() == '> hello there'
+    assert len(buffer) == len('> hello there')
+
+
+def test_insert_sorts_before_replacement_at_same_offset():
+    buffer = EditBuffer('abc')
+    buffer.replace(1, 2, 'B')
+    buffer.insert(1, '[')
+    buffer.insert(1, '(')
+    assert buffer.materialize() == 'a[(Bc'
+
+
+def test_overlapping_edits_are_refused():
+    buffer = EditBuffer('abcdef')
+    buffer.replace(1, 4, 'x')
+    with pytest.raises(ValueError):
+        buffer.replace(3, 5, 'y')
+    with pytest.raises(ValueError):
+        buffer.replace(0, 2, 'y')
+    with pytest.raises(ValueError):
+        buffer.replace(4, 9, 'y')
+
+
+def test_positions_and_lines_follow_pending_edits():
+    buffer = EditBuffer('one\ntwo\nthree\n')
+    buffer.insert(4, 'new\n')
+    buffer.replace(8, 13, 'THREE')
+    assert buffer.position(4) == 8
+    assert buffer.position(10) == 12
+    assert buffer.base_line(8) == 2
+    assert buffer.line(8) == 3
+    assert buffer.line_offset(2) == 8
+
+
+def test_commit_folds_edits_into_the_base():
+    buffer = EditBuffer('abc')
+    buffer.delete(0, 1)
+    assert buffer.dirty
+    assert buffer.commit() == 'bc'
+    assert not buffer.dirty
+    assert buffer.base == 'bc'
+
+
+def test_changed_span():
+    assert changed_span('abcdef', 'abXYef') == (2, 4, 4)
+    assert changed_span('abc', 'abc') == (3, 3, 3)
+    assert changed_span('', 'new') == (0, 0, 3)
+    old = 'x' * 5000 + 'middle' + 'y' * 5000
+    new = 'x' * 5000 + 'MID' + 'y' * 5000
+    start, old_end, new_end = changed_span(old, new)
+    assert old[:start] + new[start:new_end] + old[old_end:] == new
+
+
+def test_compose_matches_applying_both():
+    rng = random.Random(0)
+    for _ in range(500):
+        text = ''.join(rng.choice('ab\n') for _ in range(rng.randint(0, 30)))
+        first = _random_edits(rng, text)
+        middle = splice(text, first)
+        second = _random_edits(rng, middle)
+        composed = compose(first, second, middle)
+        assert splice(text, composed) == splice(middle, second)
+        assert all(a[1] <= b[0] for a, b in zip(composed, composed[1:]))
+
+
+def _random_edits(rng, text):
+    points = sorted(rng.randint(0, len(text)) for _ in range(2 * rng.randint(0, 3)))
+    edits = []
+    for start, end in zip(points[::2], points[1::2]):
+        if not edits or start > edits[-1][1]:
+            edits.append((start, end, rng.choice(['', 'x', 'yz\n'])))
+    return edits
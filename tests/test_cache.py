@@ -0,0 +1,102 @@
+import importlib
+import sys
+
+from codemods.anchors import content_hash
+from codemods.cache import ResultCache, replay, rule_key
+from codemods.dsl import Matcher
+from codemods.engine import Engine, Rule, fingerprint
+
+PATH = 'view.tsx'
+RENAME = Rule('rename', PATH, Matcher(anchor='oldName', text='newName'), anchors=['oldName'])
+# Not idempotent: inserts its line again on every run
+APPEND = Rule('append', PATH, Matcher(anchor='// MARK', select='line', action='insert_after', text='// ADDED\n'),
+              anchors=['// MARK'])
+
+
+def _run(tmp_path, rules):
+    cache = ResultCache(str(tmp_path / '.codemods-cache'))
+    [res] = Engine(rules, root=str(tmp_path), cache=cache).run()
+    return res, ResultCache(cache.directory)
+
+
+def test_entries_and_blobs_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put('a' * 40, RENAME, 2, 'b' * 40)
+    cache.store_blob('b' * 40, 'text')
+    cache.save()
+    again = ResultCache(str(tmp_path))
+    assert again.get('a' * 40, RENAME) == (2, 'b' * 40)
+    assert again.load_blob('b' * 40) == 'text'
+    assert again.load_blob('c' * 40) is None
+    assert replay(again, 'a' * 40, [RENAME]) == ({'rename': 2}, 'b' * 40, 1)
+
+
+def test_rewritten_file_is_a_cache_hit(tmp_path):
+    (tmp_path / PATH).write_text('const oldName = 1;\n')
+    res, cache = _run(tmp_path, [RENAME])
+    assert res.written and res.cached == 0
+    digest = content_hash('const newName = 1;\n')
+    assert cache.settled(digest, [RENAME])
+
+    res, _ = _run(tmp_path, [RENAME])
+    assert not res.changed and res.cached == 1
+
+
+def test_unchanged_input_replays_without_running(tmp_path):
+    (tmp_path / PATH).write_text('const oldName = 1;\n')
+    _run(tmp_path, [RENAME])
+    (tmp_path / PATH).write_text('const oldName = 1;\n')
+    res, _ = _run(tmp_path, [RENAME])
+    assert res.cached == 1
+    assert (tmp_path / PATH).read_text() == 'const newName = 1;\n'
+
+
+def test_fixed_point_is_only_recorded_when_true(tmp_path):
+    (tmp_path / PATH).write_text('// MARK\n')
+    res, cache = _run(tmp_path, [APPEND])
+    assert res.hits == {'append': 1}
+    output = content_hash('// MARK\n// ADDED\n')
+    assert not cache.settled(output, [APPEND])
+    assert cache.get(output, APPEND) == (1, content_hash('// MARK\n// ADDED\n// ADDED\n'))
+
+    res, _ = _run(tmp_path, [APPEND])
+    assert res.changed and res.hits == {'append': 1}
+    assert (tmp_path / PATH).read_text() == '// MARK\n// ADDED\n// ADDED\n'
+
+
+def test_editing_a_module_the_plugin_imports_is_a_cache_miss(tmp_path, monkeypatch):
+    (tmp_path / 'cached_names.py').write_text("NAMES = ['one']\n")
+    (tmp_path / 'cached_plugin.py').write_text(
+        "from codemods.dsl import Matcher\n"
+        "from codemods.engine import Rule\n"
+        "from cached_names import NAMES\n\n"
+        "RULE = Rule('names', 'view.tsx', Matcher(anchor='// LIST', text=' '.join(NAMES)), plugin=__name__)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ('cached_names', 'cached_plugin'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    plugin = importlib.import_module('cached_plugin')
+
+    def run():
+        fingerprint([plugin.RULE], str(tmp_path))
+        (tmp_path / PATH).write_text('// LIST\n')
+        return _run(tmp_path, [plugin.RULE])[0]
+
+    assert run().cached == 0
+    assert run().cached == 1
+    key = rule_key(plugin.RULE)
+
+    (tmp_path / 'cached_names.py').write_text("NAMES = ['one', 'two']\n")
+    importlib.reload(sys.modules['cached_names'])
+    importlib.reload(plugin)
+    res = run()
+    assert rule_key(plugin.RULE) != key
+    assert res.cached == 0
+    assert (tmp_path / PATH).read_text() == 'one two\n'
+
+
+def test_a_declared_rule_is_keyed_by_its_spec():
+    # Plugins may build a spec from data, e.g. the sections manifest
+    rules = [Rule('titles', PATH, Matcher(anchor='// LIST', text=text), plugin='missing_plugin')
+             for text in ('one', 'two')]
+    fingerprint(rules)
+    assert rule_key(rules[0]) != rule_key(rules[1])
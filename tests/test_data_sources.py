@@ -0,0 +1,57 @@
+import importlib
+import os
+import shutil
+import sys
+
+from codemods import engine
+from codemods.cache import ResultCache
+from codemods.engine import Engine, fingerprint
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ('data_sources', 'insert_data_source')
+VIEW = '''const View = () => (
+    <div>
+        {activeSection === 'permissions' && (
+            <PermissionsManagerWindow onShowSuccess={onShowSuccess} />
+        )}
+    </div>
+);
+'''
+
+
+def test_a_new_source_is_not_answered_from_the_cache(tmp_path, monkeypatch):
+    for name in MODULES:
+        shutil.copy(os.path.join(ROOT, f"{name}.py"), tmp_path)
+    (tmp_path / 'components').mkdir()
+    target = tmp_path / 'components' / 'SettingsView.tsx'
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(engine, '_registry', [])
+    saved = {name: sys.modules.pop(name, None) for name in MODULES}
+    try:
+        importlib.import_module('insert_data_source')
+
+        def run():
+            rules = engine.registry()[-1:]
+            fingerprint(rules, str(tmp_path))
+            target.write_text(VIEW)
+            cache = ResultCache(str(tmp_path / '.codemods-cache'))
+            [res] = Engine(rules, root=str(tmp_path), cache=cache).run()
+            return res
+
+        assert run().cached == 0
+        assert run().cached == 1
+
+        # One spec line, no version bump
+        path = tmp_path / 'data_sources.py'
+        spec = "    DataSource('courses', 'Courses', 'courses and syllabi'),\n"
+        path.write_text(path.read_text().replace(spec, spec + "    DataSource('aircraft', 'Aircraft', 'aircraft'),\n"))
+        importlib.reload(sys.modules['data_sources'])
+        importlib.reload(sys.modules['insert_data_source'])
+        res = run()
+        assert res.cached == 0 and res.hits == {'insert_data_source': 1}
+        assert 'Aircraft Data Source' in target.read_text()
+    finally:
+        for name, module in saved.items():
+            sys.modules.pop(name, None)
+            if module is not None:
+                sys.modules[name] = module
@@ -0,0 +1,116 @@
+import random
+
+from codemods.jsx import parse, update
+
+from helpers import splice
+
+SOURCE = '''export const View = () => {
+    // Settings
+    return (
+        <div className="p-4 flex">
+            <header className="border-b">
+                <h2 className="text-lg">Title</h2>
+            </header>
+            {open && (
+                <section id="a">
+                    <span>{count}</span>
+                    {/* note */}
+                </section>
+            )}
+            <ul>
+                {items.map(item => <li key={item}>{item}</li>)}
+            </ul>
+            <br />
+        </div>
+    );
+};
+'''
+
+SNIPPETS = ['<div className="p-4 x">hi</div>', '{a && <b/>}', '<span>{x}</span>', '', 'text ',
+            '{/* c */}', '<br />', ' ', '<', '}', '</div>', 'className="q"', '\n']
+
+
+def _shape(tree):
+    def at(x):
+        return None if x is None else x.start
+    elements = [(el.name, el.start, el.open_end, el.close_start, el.end, el.self_closing, at(el.parent),
+                 at(el.expr), [c.start for c in el.children],
+                 sorted((a.name, a.start, a.end, a.static, a.dynamic) for a in el.attrs.values()))
+                for el in tree.elements]
+    expressions = [(ex.start, ex.end, at(ex.parent), at(ex.outer)) for ex in tree.expressions]
+    comments = [(c.start, c.end, c.text) for c in tree.comments]
+    classes = sorted((token, [el.start for el in els]) for token, els in tree.by_class.items())
+    return elements, expressions, comments, tree.errors, [el.start for el in tree.roots], classes
+
+
+def test_lookups():
+    tree = parse(SOURCE)
+    [header] = tree.named('header')
+    assert SOURCE[header.start:header.end].startswith('<header className="border-b">')
+    assert SOURCE[header.end - len('</header>'):header.end] == '</header>'
+    assert tree.matching_close(header.start) == (header.close_start, header.end)
+    assert [el.name for el in tree.with_class('p-4', 'flex')] == ['div']
+    span = tree.named('span')[0]
+    assert tree.enclosing(span.start + 2) is span
+    assert SOURCE[span.expr.start:span.expr.start + 7] == '{open &'
+    assert tree.comments_matching('note')[0].text == '/* note */'
+    assert not tree.errors
+
+
+def test_errors():
+    assert parse('const a = <div><span></div>;').errors
+    assert parse('const a = (1;').errors
+    assert not parse('const f = <T,>(x: T) => x;').errors
+
+
+def test_update_reparses_only_the_edited_children():
+    tree = parse(SOURCE)
+    h2 = tree.named('h2')[0]
+    start = SOURCE.index('Title')
+    edits = [(start, start + len('Title'), '<em>New</em> title')]
+    text = splice(SOURCE, edits)
+    updated = update(tree, text, edits)
+    assert updated is tree
+    # Elements outside the edited children are the same objects, shifted
+    assert tree.named('h2')[0] is h2
+    assert _shape(tree) == _shape(parse(text))
+
+
+def test_update_matches_a_full_parse():
+    rng = random.Random(0)
+    for _ in range(300):
+        text = SOURCE
+        tree = parse(text)
+        for _ in range(4):
+            edits = _random_edits(rng, text, tree)
+            new = splice(text, edits)
+            tree = update(tree, new, edits)
+            full = parse(new)
+            assert _shape(tree) == _shape(full), edits
+            text = new
+            if full.errors:
+                break
+
+
+def _random_edits(rng, text, tree):
+    picked = []
+    for _ in range(rng.randint(1, 4)):
+        roll = rng.random()
+        if roll < 0.4 and tree.elements:
+            el = rng.choice(tree.elements)
+            if rng.random() < 0.5:
+                start, end = el.start, el.end
+            else:
+                start = end = rng.choice([el.start, el.open_end or el.start, el.end or el.start])
+        elif roll < 0.6 and tree.expressions:
+            ex = rng.choice(tree.expressions)
+            start, end = (ex.start, ex.end) if rng.random() < 0.5 else (ex.start + 1, ex.start + 1)
+        else:
+            start = rng.randint(0, len(text))
+            end = min(len(text), start + rng.randint(0, 30))
+        picked.append((start, end, rng.choice(SNIPPETS)))
+    edits = []
+    for start, end, new in sorted(picked):
+        if not edits or start > edits[-1][1]:
+            edits.append((start, end, new))
+    return edits
@@ -0,0 +1,43 @@
+import os
+
+from codemods.dsl import Matcher
+from codemods.engine import Engine, Rule
+from codemods.rebase import rebase
+
+PATH = 'components/View.tsx'
+MARK = Rule('mark', PATH, Matcher(anchor='// MARK', select='line', action='insert_after', text='// ADDED\n'),
+            anchors=['// MARK'])
+RENAME = Rule('rename', PATH, Matcher(anchor='oldName', text='newName'), anchors=['oldName'])
+
+
+def _setup(tmp_path, text, rules):
+    os.makedirs(tmp_path / 'components')
+    (tmp_path / PATH).write_text(text)
+    engine = Engine(rules, root=str(tmp_path))
+    _, res = engine.process(PATH, rules)
+    return engine, res
+
+
+def test_untouched_markers_replay_edits(tmp_path):
+    engine, res = _setup(tmp_path, 'const oldName = 1;\n', [RENAME])
+    (tmp_path / PATH).write_text('// header\nconst oldName = 1;\n')
+    out = rebase(engine, PATH, [RENAME], res)
+    assert out.text == '// header\nconst newName = 1;\n'
+    assert out.original == '// header\nconst oldName = 1;\n'
+
+
+def test_rules_are_not_applied_twice(tmp_path):
+    engine, res = _setup(tmp_path, 'a\n// MARK\nb\n', [MARK])
+    assert res.text == 'a\n// MARK\n// ADDED\nb\n'
+    # Another writer adds a second marker while the run is in flight
+    (tmp_path / PATH).write_text('a\n// MARK\nb\n// MARK\n')
+    out = rebase(engine, PATH, [MARK], res)
+    assert out.text == 'a\n// MARK\n// ADDED\nb\n// MARK\n// ADDED\n'
+    assert out.hits == {'mark': 2}
+
+
+def test_overlapping_change_runs_every_rule(tmp_path):
+    engine, res = _setup(tmp_path, 'const oldName = 1;\n', [RENAME])
+    (tmp_path / PATH).write_text('let oldName = 2;\n')
+    out = rebase(engine, PATH, [RENAME], res)
+    assert out.text == 'let newName = 2;\n'
@@ -0,0 +1,28 @@
+from codemods.dsl import Matcher
+from codemods.engine import Rule
+from codemods.runner import Runner, matched
+
+RENAME = Rule('rename', 'src/view.tsx', Matcher(anchor='oldName', text='newName'), anchors=['oldName'])
+
+
+def _tree(tmp_path):
+    (tmp_path / 'src').mkdir()
+    for name in ('view.tsx', 'other.tsx'):
+        (tmp_path / 'src' / name).write_text('const oldName = 1;\n')
+
+
+def test_globbed_files_get_only_their_rules(tmp_path):
+    _tree(tmp_path)
+    assert matched([RENAME], ['src/*.tsx'], str(tmp_path)) == (['src/view.tsx'], ['src/other.tsx'])
+    assert matched([RENAME], ['src/*.tsx'], str(tmp_path), all_sources=True) == (
+        ['src/other.tsx', 'src/view.tsx'], [])
+
+
+def test_globs_matching_only_untargeted_files_are_reported(tmp_path, capsys):
+    _tree(tmp_path)
+    results = Runner([RENAME], root=str(tmp_path), jobs=1).run(['src/other.tsx'], write=False)
+    assert results == []
+    assert capsys.readouterr().out == '1 files matched, none targeted by any rule (use --all-sources)\n'
+
+    [res] = Runner([RENAME], root=str(tmp_path), jobs=1, all_sources=True).run(['src/other.tsx'], write=False)
+    assert res.changed and capsys.readouterr().out == ''
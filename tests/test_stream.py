@@ -0,0 +1,46 @@
+import pytest
+
+from codemods.dsl import Matcher
+from codemods.engine import Rule, RuleError
+from codemods.stream import matcher_edits, run
+
+SOURCE = b'''const view = (
+    <div className="p-4 space-y-4">
+        <h2>Title</h2>
+    </div>
+);
+'''
+
+
+def test_line_edits_inside_an_open_element_are_allowed():
+    matcher = Matcher(anchor='<div className="p-4 space-y-4">', select='line',
+                      text='    <div className="space-y-4">\n')
+    hits, edits = matcher_edits(matcher, SOURCE, 'view.tsx')
+    assert hits == 1 and edits == [(15, 51, '    <div className="space-y-4">\n')]
+
+
+def test_edits_that_change_the_balance_of_a_cut_window_fail():
+    # The line holds the ')' closing code before it
+    with pytest.raises(RuleError, match=r"view.tsx:5:1: 1 \( left open"):
+        matcher_edits(Matcher(anchor=');', select='line', action='remove'), SOURCE, 'view.tsx')
+    with pytest.raises(RuleError, match='view.tsx:3:9: 1 <div> left open'):
+        matcher_edits(Matcher(anchor='<h2>', text='<div><h2>'), SOURCE, 'view.tsx')
+
+
+def test_one_rule_may_close_what_another_opened(tmp_path):
+    (tmp_path / 'view.tsx').write_bytes(SOURCE)
+    opens = Rule('opens', 'view.tsx', Matcher(anchor='<h2>', text='<section><h2>'), anchors=['<h2>'])
+    closes = Rule('closes', 'view.tsx', Matcher(anchor='</h2>', text='</h2></section>'), anchors=['</h2>'])
+    [res] = run([opens, closes], root=str(tmp_path), write=False)
+    assert not res.error and res.hits == {'opens': 1, 'closes': 1}
+    [res] = run([opens], root=str(tmp_path), write=False)
+    assert res.error == 'RuleError: rewrite breaks the file at view.tsx:3:9: 1 <section> left open'
+
+
+def test_globs_matching_only_untargeted_files_are_reported(tmp_path, capsys):
+    (tmp_path / 'mockData.ts').write_text('export const a = 1;\n')
+    rule = Rule('rename', 'view.tsx', Matcher(anchor='const a', text='const b'), anchors=['const a'])
+    assert run([rule], ['mockData.ts'], root=str(tmp_path), write=False) == []
+    assert capsys.readouterr().out == '1 files matched, none targeted by any rule (use --all-sources)\n'
+    [res] = run([rule], ['mockData.ts'], root=str(tmp_path), write=False, all_sources=True)
+    assert res.changed
@@ -0,0 +1,12 @@
+from codemods.template import Template
+
+
+def test_nested_loops_keep_their_own_first_and_last():
+    t = Template('[[for row in rows]][[for cell in row]][[cell]][[if not last]],[[end]][[end]]'
+                 '[[if not last]];[[end]][[end]]')
+    assert t.render(rows=[[1, 2], [3]]) == '1,2;3'
+
+
+def test_loop_variables_may_reuse_generated_names():
+    t = Template('[[for out in items]][[for ctx in out]][[ctx]][[end]][[end]]|[[append]]')
+    assert t.render(items=['ab', 'c'], append='x') == 'abc|x'
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from codemods.anchors import content_hash
+from codemods.transaction import TXN_DIR, Conflict, Transaction, recover
+
+
+def _files(tmp_path, **texts):
+    for name, text in texts.items():
+        (tmp_path / name).write_text(text)
+
+
+def test_commit_publishes_every_file(tmp_path):
+    _files(tmp_path, a='old a', b='old b')
+    with Transaction(str(tmp_path)) as txn:
+        txn.write('a', 'new a')
+        txn.write('b', 'new b')
+        txn.write('c', 'new c')
+    assert (tmp_path / 'a').read_text() == 'new a'
+    assert (tmp_path / 'b').read_text() == 'new b'
+    assert (tmp_path / 'c').read_text() == 'new c'
+    assert not (tmp_path / TXN_DIR).exists()
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b', 'c']
+
+
+def test_nothing_is_visible_before_commit(tmp_path):
+    _files(tmp_path, a='old')
+    txn = Transaction(str(tmp_path))
+    txn.write('a', 'new')
+    assert (tmp_path / 'a').read_text() == 'old'
+    txn.abort()
+    assert (tmp_path / 'a').read_text() == 'old'
+    assert os.listdir(tmp_path) == ['a']
+
+
+def test_changed_target_raises_conflict_and_publishes_nothing(tmp_path):
+    _files(tmp_path, a='old a', b='old b')
+    txn = Transaction(str(tmp_path))
+    txn.write('a', 'new a', expect=content_hash('old a'))
+    txn.write('b', 'new b', expect=content_hash('old b'))
+    (tmp_path / 'b').write_text('theirs')
+    with pytest.raises(Conflict) as e:
+        txn.commit()
+    assert e.value.paths == ['b']
+    assert (tmp_path / 'a').read_text() == 'old a'
+    assert (tmp_path / 'b').read_text() == 'theirs'
+
+    # The staged files survive, so the conflicting one can be restaged
+    txn.write('b', 'rebased b', expect=content_hash('theirs'))
+    assert txn.commit() == ['a', 'b']
+    assert (tmp_path / 'a').read_text() == 'new a'
+    assert (tmp_path / 'b').read_text() == 'rebased b'
+
+
+def test_failed_rename_rolls_back(tmp_path, monkeypatch):
+    _files(tmp_path, a='old a', b='old b')
+    txn = Transaction(str(tmp_path))
+    txn.write('a', 'new a')
+    txn.write('b', 'new b')
+    replace = os.replace
+    calls = []
+
+    def failing(src, dst):
+        calls.append(dst)
+        if len(calls) == 2:
+            raise OSError('disk full')
+        replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', failing)
+    with pytest.raises(OSError):
+        txn.commit()
+    monkeypatch.setattr(os, 'replace', replace)
+    assert (tmp_path / 'a').read_text() == 'old a'
+    assert (tmp_path / 'b').read_text() == 'old b'
+
+
+def test_recover_restores_a_crashed_commit(tmp_path):
+    _files(tmp_path, a='old a')
+    txn = Transaction(str(tmp_path))
+    txn.write('a', 'new a')
+    txn.write('c', 'new c')
+    # Stop right after publishing, before the journal is removed
+    txn._cleanup = lambda: None
+    txn.commit()
+    os.rename(txn.directory, os.path.join(os.path.dirname(txn.directory), '999999999-crashed'))
+    assert (tmp_path / 'a').read_text() == 'new a'
+
+    assert sorted(recover(str(tmp_path))) == ['a', 'c']
+    assert (tmp_path / 'a').read_text() == 'old a'
+    assert not (tmp_path / 'c').exists()
@@ -0,0 +1,41 @@
+from codemods.dsl import Matcher
+from codemods.engine import Rule
+from codemods.profiling import counters
+from codemods.watch import Watcher
+
+PATH = 'view.tsx'
+TEXT = 'const a = <div>\n    <span>one</span>\n    <span>two</span>\n</div>;\n'
+RENAME = Rule('rename', PATH, Matcher(anchor='oldName', text='newName'), anchors=['oldName'])
+
+
+def _spans(doc):
+    # Structural rule: reads the element tree, edits nothing
+    doc.tree.named('span')
+    return 0
+
+
+SPANS = Rule('spans', PATH, _spans)
+
+
+def test_saves_reuse_the_resident_index_and_tree(tmp_path):
+    (tmp_path / PATH).write_text(TEXT)
+    watcher = Watcher([RENAME, SPANS], root=str(tmp_path))
+    assert watcher.refresh(PATH).hits == {'rename': 0, 'spans': 0}
+    _, _, tree = watcher.files[PATH]
+    assert tree is not None
+    assert watcher.refresh(PATH) is None
+
+    text = TEXT.replace('two', 'oldName')
+    (tmp_path / PATH).write_text(text)
+    counters.clear()
+    res = watcher.refresh(PATH)
+    assert res.hits == {'rename': 1, 'spans': 0}
+    assert 0 <= res.elapsed < 1
+    assert res.written
+    # Only the edited element was read again, twice: for the save and for the rename
+    assert 0 < counters['parsed'] < len(text)
+    assert counters['scanned'] < len(text)
+    new, anchors, moved = watcher.files[PATH]
+    assert new == (tmp_path / PATH).read_text() == TEXT.replace('two', 'newName')
+    assert moved is tree
+    assert anchors.text == new and not anchors.find('oldName')